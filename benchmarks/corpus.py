@@ -0,0 +1,93 @@
+"""
+Generates synthetic html tables in the shape of the ones in `documents/`, at any scale and with any rate of defects,
+for the benchmarks.
+
+    python -m benchmarks.corpus output_dir [--files 1000] [--rows 10] [--columns 5] [--missing-caption-rate 0.05] ...
+"""
+import argparse
+import random
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+
+import pycountry
+
+FIRST_NAMES = ['Daniel', 'Shane', 'Nicole', 'Kristin', 'Laurie', 'Kelly', 'Matthew', 'Susan', 'Kenneth', 'Benjamin']
+LAST_NAMES = ['Brown', 'Barnes', 'Carpenter', 'Duarte', 'Wade', 'Thomas', 'Hart', 'Miller', 'Decker', 'Newman']
+COMPANY_SUFFIXES = ['LLC', 'PLC', 'Inc', 'and Sons', 'Group']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+COUNTRY_NAMES = [country.name for country in pycountry.countries]
+
+
+@dataclass
+class CorpusConfig:
+    files: int = 1000
+    rows: int = 10
+    columns: int = 5
+    # the share of the files that have each of the defects
+    missing_caption_rate: float = 0.05
+    missing_thead_rate: float = 0.0
+    missing_tfoot_rate: float = 0.02
+    missing_date_rate: float = 0.03
+    # the share of the cells that aren't plain numbers (e.g. '846%')
+    non_numeric_cell_rate: float = 0.2
+    seed: int = 0
+
+
+def generate_table(rng: random.Random, index: int, config: CorpusConfig) -> str:
+    lines = [f'<table id="Table{index}Synthetic{rng.randrange(10 ** 6)}">']
+    if rng.random() >= config.missing_caption_rate:
+        lines.append(f'<caption>Table {index} {rng.choice(LAST_NAMES)} report</caption>')
+    if rng.random() >= config.missing_thead_rate:
+        lines += ['<thead>', '<tr>', '<th> </th>']
+        lines += [f'<th> {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} </th>' for _ in range(config.columns)]
+        lines += ['</tr>', '</thead>']
+    lines.append('<tbody>')
+    for _ in range(config.rows):
+        lines += ['<tr>', f'<td align="left" style="font-weight:bold"> '
+                          f'{rng.choice(LAST_NAMES)} {rng.choice(COMPANY_SUFFIXES)} </td>']
+        for _ in range(config.columns):
+            cell = rng.randrange(2000)
+            cell_text = f'{cell}%' if rng.random() < config.non_numeric_cell_rate else str(cell)
+            lines.append(f'<td align="left" style="font-style:italic"> {cell_text} </td>')
+        lines.append('</tr>')
+    lines.append('</tbody>')
+    if rng.random() >= config.missing_tfoot_rate:
+        date_str = '' if rng.random() < config.missing_date_rate else \
+            f'{rng.randint(1, 28)}{rng.choice(MONTHS)}{rng.randint(2000, 2023)} '
+        lines[-1] += f'<tfoot><tr><td>Creation: {date_str}{rng.choice(COUNTRY_NAMES)}</td></tr></tfoot>'
+    lines.append('</table>')
+    return '\n'.join(lines) + '\n'
+
+
+def generate_corpus(output_dir: str | Path, config: CorpusConfig) -> list[Path]:
+    """
+    :return: the generated files, the same config (and seed) always generates the same files
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(config.seed)
+    files = []
+    for index in range(config.files):
+        file_path = output_dir / f'{index}_table.html'
+        file_path.write_text(generate_table(rng, index, config), encoding='utf-8')
+        files.append(file_path)
+    return files
+
+
+def add_corpus_arguments(arg_parser: argparse.ArgumentParser):
+    for field in fields(CorpusConfig):
+        arg_parser.add_argument(f'--{field.name.replace("_", "-")}', type=field.type, default=field.default)
+
+
+def corpus_config_from_args(args: argparse.Namespace) -> CorpusConfig:
+    return CorpusConfig(**{field.name: getattr(args, field.name) for field in fields(CorpusConfig)})
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Generates synthetic html tables')
+    arg_parser.add_argument('output_dir')
+    add_corpus_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    corpus_config = corpus_config_from_args(args)
+    generate_corpus(args.output_dir, corpus_config)
+    print(f'Generated {corpus_config.files} files in {args.output_dir} with {asdict(corpus_config)}')
@@ -0,0 +1,176 @@
+"""
+Benchmarks the ingest over a synthetic corpus (see `corpus.py`) and writes the results as json,
+so they can be compared between versions.
+It measures the parsing throughput, the time spent in each of the parser's stages, the memory it takes,
+and the whole ingest, into memory (`InMemorySink`) or, with --mongo, into the local db's test collections.
+
+    python -m benchmarks.ingest [--files 1000] [--rows 10] ... [--workers 1] [--mongo] [--output results.json]
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+from functools import wraps
+from pathlib import Path
+
+from benchmarks.corpus import CorpusConfig, add_corpus_arguments, corpus_config_from_args, generate_corpus
+from data_utils.html_backends import DEFAULT_HTML_BACKEND, HTML_BACKENDS
+from data_utils.parser import Parser
+from data_utils.sinks import InMemorySink, MongoSink
+from db_utils.config_loader import load_local_env_config
+from db_utils.discrepancy_db_connector import DiscrepancyDBConnector
+from db_utils.mongo_db_tables_connector import MongoDBTablesConnector
+
+# the parser's stages that are timed on their own
+PARSER_STAGES = ['_get_document_id', '_get_title', '_get_headers', '_get_compact_body', '_get_stats', '_get_footer',
+                 '_get_country_of_creation', '_get_date_of_creation']
+
+
+def _timed(method, stage_seconds: dict[str, float], stage: str):
+    @wraps(method)
+    def timed_method(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stage_seconds[stage] += time.perf_counter() - start
+
+    return timed_method
+
+
+def measure_parse_throughput(files: list[Path], html_backend: str) -> dict:
+    parser = Parser(connect_to_db=False, html_backend=html_backend)
+    total_bytes = sum(file_path.stat().st_size for file_path in files)
+    start = time.perf_counter()
+    for file_path in files:
+        parser._parse_file(file_path)
+    seconds = time.perf_counter() - start
+    return {'seconds': seconds,
+            'files_per_second': len(files) / seconds,
+            'megabytes_per_second': total_bytes / seconds / 2 ** 20}
+
+
+def measure_parser_stages(files: list[Path], html_backend: str) -> dict:
+    """
+    The stages are wrapped with timers on a parser of their own, so the throughput isn't measured with the timers on.
+    The rest of the time, `unaccounted`, is mostly parsing the html itself.
+    """
+    parser = Parser(connect_to_db=False, html_backend=html_backend)
+    stage_seconds = dict.fromkeys(PARSER_STAGES, 0.)
+    for stage in PARSER_STAGES:
+        setattr(parser, stage, _timed(getattr(parser, stage), stage_seconds, stage))
+    start = time.perf_counter()
+    for file_path in files:
+        parser._parse_file(file_path)
+    total_seconds = time.perf_counter() - start
+    # the footer is also read inside the country and date stages, so the shares may add up to a bit more than 1
+    return {'total_seconds': total_seconds,
+            'stages': {stage: {'seconds': seconds, 'share': seconds / total_seconds}
+                       for stage, seconds in stage_seconds.items()},
+            'unaccounted_seconds': total_seconds - sum(stage_seconds.values())}
+
+
+def measure_memory(corpus_dir: Path, html_backend: str) -> dict:
+    parser = Parser(connect_to_db=False, html_backend=html_backend)
+    tracemalloc.start()
+    try:
+        for _ in parser.iter_parse(str(corpus_dir)):
+            pass
+        streaming_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        sink = InMemorySink()
+        parser.parse_to_sink(str(corpus_dir), sink)
+        in_memory_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {'streaming_peak_bytes': streaming_peak, 'in_memory_sink_peak_bytes': in_memory_peak}
+
+
+def measure_ingest(corpus_dir: Path, html_backend: str, workers: int, mongo: bool, batch_size: int | None) -> dict:
+    parser = Parser(connect_to_db=False, html_backend=html_backend)
+    if mongo:
+        local_env_conf = load_local_env_config()
+        tables_connector = MongoDBTablesConnector(host=local_env_conf['HOST'], port=int(local_env_conf['PORT']),
+                                                  db_name=local_env_conf['TABLES_DB_NAME_TEST'],
+                                                  collection_name=local_env_conf['TABLES_COLLECTION_NAME_TEST'])
+        discrepancies_connector = DiscrepancyDBConnector(
+            host=local_env_conf['HOST'], port=int(local_env_conf['PORT']),
+            db_name=local_env_conf['TABLES_DB_NAME_TEST'],
+            collection_name=local_env_conf['DISCREPANCIES_COLLECTION_NAME_TEST'])
+        for connector in [tables_connector, discrepancies_connector]:
+            connector.drop_collection()
+            connector.ensure_indexes()
+        sink = MongoSink(tables_connector, discrepancies_connector, batch_size)
+    else:
+        sink = InMemorySink()
+    start = time.perf_counter()
+    parser.parse_to_sink(str(corpus_dir), sink, workers)
+    seconds = time.perf_counter() - start
+    result = {'backend': 'mongo' if mongo else 'memory', 'workers': workers, 'seconds': seconds}
+    if mongo:
+        result['write_errors'] = len(sink.write_errors)
+        result['documents'] = tables_connector.collection.count_documents({})
+        result['discrepancies'] = discrepancies_connector.collection.count_documents({})
+        tables_connector.drop_collection()
+        discrepancies_connector.drop_collection()
+    else:
+        result['documents'] = len(sink.table_documents)
+        result['discrepancies'] = len(sink.discrepancies)
+    result['files_per_second'] = result['documents'] / seconds
+    return result
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(corpus_config: CorpusConfig, corpus_dir: Path, html_backend: str = DEFAULT_HTML_BACKEND,
+                   workers: int = 1, mongo: bool = False, batch_size: int | None = None) -> dict:
+    files = generate_corpus(corpus_dir, corpus_config)
+    return {
+        'environment': {'commit': git_commit(),
+                        'python': sys.version.split()[0],
+                        'platform': platform.platform(),
+                        'html_backend': html_backend},
+        'corpus': asdict(corpus_config),
+        'parse_throughput': measure_parse_throughput(files, html_backend),
+        'parser_stages': measure_parser_stages(files, html_backend),
+        'memory': measure_memory(corpus_dir, html_backend),
+        'ingest': measure_ingest(corpus_dir, html_backend, workers, mongo, batch_size),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Benchmarks the ingest over a synthetic corpus')
+    add_corpus_arguments(arg_parser)
+    arg_parser.add_argument('--html-backend', choices=HTML_BACKENDS, default=DEFAULT_HTML_BACKEND)
+    arg_parser.add_argument('--workers', type=int, default=1)
+    arg_parser.add_argument('--mongo', action='store_true', help="ingest into the local db's test collections")
+    arg_parser.add_argument('--batch-size', type=int, default=None)
+    arg_parser.add_argument('--corpus-dir', help='where to generate the corpus, a temporary directory by default')
+    arg_parser.add_argument('--output', help='a json file to write the results to, stdout by default')
+    args = arg_parser.parse_args()
+
+    corpus_config = corpus_config_from_args(args)
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        corpus_dir = Path(args.corpus_dir or temporary_dir)
+        results = run_benchmarks(corpus_config, corpus_dir, args.html_backend, args.workers, args.mongo,
+                                 args.batch_size)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output, encoding='utf-8')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
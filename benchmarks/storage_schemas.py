@@ -0,0 +1,88 @@
+"""
+Compares the full and the compact storage schemas of the tables (see `CompactTableBody`):
+the size of the stored documents, and how long it takes to encode them and to read them back as `TableDocument`s.
+With --mongo, the documents are also written to and read back from a scratch collection in the local db.
+
+    python -m benchmarks.storage_schemas [documents_dir] [--repeat 20] [--mongo]
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import bson
+
+from data_classes.table_document import TableDocument
+from data_utils.parser import Parser
+from db_utils.client_registry import get_client, release_client
+from db_utils.config_loader import load_local_env_config
+
+DEFAULT_DOCUMENTS_DIR = Path(__file__).parent.parent / 'documents'
+SCRATCH_COLLECTION_NAME = 'storage_schemas_benchmark'
+
+
+def measure_schema(table_documents: list[TableDocument], compact: bool, repeat: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encoded_documents = [bson.encode(table_document.to_mongo(compact)) for table_document in table_documents]
+    encode_seconds = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for encoded_document in encoded_documents:
+            TableDocument.from_mongo(bson.decode(encoded_document))
+    decode_seconds = (time.perf_counter() - start) / repeat
+
+    sizes = [len(encoded_document) for encoded_document in encoded_documents]
+    return {'documents': len(sizes),
+            'total_bytes': sum(sizes),
+            'max_document_bytes': max(sizes),
+            'encode_ms_per_document': 1000 * encode_seconds / len(sizes),
+            'decode_ms_per_document': 1000 * decode_seconds / len(sizes)}
+
+
+def measure_mongo_round_trip(table_documents: list[TableDocument], compact: bool, repeat: int) -> dict:
+    local_env_conf = load_local_env_config()
+    client = get_client(local_env_conf['HOST'], int(local_env_conf['PORT']))
+    collection = client[local_env_conf['TABLES_DB_NAME_TEST']][SCRATCH_COLLECTION_NAME]
+    try:
+        write_seconds = read_seconds = 0.
+        for _ in range(repeat):
+            collection.drop()
+            start = time.perf_counter()
+            collection.insert_many([table_document.to_mongo(compact) for table_document in table_documents])
+            write_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            for document in collection.find({}):
+                TableDocument.from_mongo(document)
+            read_seconds += time.perf_counter() - start
+        storage_size = client[collection.database.name].command('collStats', collection.name)['size']
+    finally:
+        collection.drop()
+        release_client(client)
+    return {'write_ms': 1000 * write_seconds / repeat,
+            'read_ms': 1000 * read_seconds / repeat,
+            'collection_bytes': storage_size}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compares the full and the compact storage schemas')
+    arg_parser.add_argument('documents_dir', nargs='?', default=str(DEFAULT_DOCUMENTS_DIR))
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    arg_parser.add_argument('--mongo', action='store_true', help='also write and read the documents in the local db')
+    args = arg_parser.parse_args()
+
+    parser = Parser(connect_to_db=False)
+    table_documents = [table_document for table_document, _ in parser.iter_parse(args.documents_dir)
+                       if table_document is not None]
+    report = {}
+    for schema, compact in [('full', False), ('compact', True)]:
+        report[schema] = measure_schema(table_documents, compact, args.repeat)
+        if args.mongo:
+            report[schema]['mongo'] = measure_mongo_round_trip(table_documents, compact, args.repeat)
+    report['compact_size_ratio'] = report['compact']['total_bytes'] / report['full']['total_bytes']
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from functools import cached_property
+
+
+@dataclass
+class CompactTableBody:
+    """
+    The table's body, kept once: the column names, the label of every row and the values of every row.
+    The other views of the body (by columns, by rows and the list of rows) are built from it when they're first used,
+    so storing just this one takes about a third of the space the three views take.
+    """
+    columns: list[str]
+    row_labels: list[str]
+    rows: list[list]  # the values of each row, without its label (rows may be shorter than the columns)
+
+    @classmethod
+    def from_rows_list(cls, rows_list: list[list], columns: list[str]) -> 'CompactTableBody':
+        return cls(columns=list(columns), row_labels=[row[0] for row in rows_list], rows=[row[1:] for row in rows_list])
+
+    @cached_property
+    def rows_list(self) -> list[list]:
+        return [[row_label, *row] for row_label, row in zip(self.row_labels, self.rows)]
+
+    @cached_property
+    def body_by_columns(self) -> dict:
+        columns = defaultdict(dict)
+        for row_label, row in zip(self.row_labels, self.rows):
+            for column, cell in zip(self.columns, row):
+                columns[column][row_label] = cell
+        return dict(columns)
+
+    @cached_property
+    def body_by_rows(self) -> dict:
+        rows = defaultdict(dict)
+        for row_label, row in zip(self.row_labels, self.rows):
+            for column, cell in zip(self.columns, row):
+                rows[row_label][column] = cell
+        return dict(rows)
+
+    def dict(self):
+        return {
+            "columns": self.columns,
+            "row_labels": self.row_labels,
+            "rows": self.rows
+        }
@@ -2,6 +2,11 @@ from dataclasses import dataclass
 from enum import Enum
 
 
+class DiscrepancyCategory(Enum):
+    NOT_FOUND = 'NOT_FOUND'  # a part of the table is missing
+    INVALID = 'INVALID'  # it's there, but it's wrong
+
+
 class DiscrepancyType(Enum):
     MISSING_DOCUMENT_ID = 'MISSING_DOCUMENT_ID'
     MISSING_TITLE = 'MISSING_TITLE'
@@ -13,6 +18,17 @@ class DiscrepancyType(Enum):
     INCORRECT_CREATION_DATE = 'INCORRECT_CREATION_DATE'
     INVALID_SUM = 'INVALID_SUM'
 
+    @property
+    def category(self) -> DiscrepancyCategory:
+        return DiscrepancyCategory.NOT_FOUND if self in NOT_FOUND_DISCREPANCY_TYPES else DiscrepancyCategory.INVALID
+
+
+# computed once, rather than going over the enum every time a discrepancy is classified
+NOT_FOUND_DISCREPANCY_TYPES = frozenset(member for name, member in DiscrepancyType.__members__.items()
+                                        if name.startswith('MISSING'))
+# the way they're saved in the db
+NOT_FOUND_DISCREPANCY_TYPE_VALUES = frozenset(member.value for member in NOT_FOUND_DISCREPANCY_TYPES)
+
 
 @dataclass  # Why dataclass and not pydantic? Because we don't need to validate the data, we just need to store it.
 class Discrepancy:
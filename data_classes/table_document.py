@@ -1,12 +1,20 @@
+import json
 from datetime import datetime
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from data_classes.compact_table_body import CompactTableBody
+from data_classes.table_stats import TableStats
+
+# the views of the body that aren't stored in the compact schema
+BODY_VIEW_FIELDS = ('body_by_columns', 'body_by_rows', 'rows_list')
 
 
 class TableDocument(BaseModel):
     document_id: str | None
     title: str | None
     headers: list[str] | None
+    headers_length: int | None = None
     body_by_columns: dict | None
     body_by_rows: dict | None
     rows_list: list | None
@@ -14,3 +22,47 @@ class TableDocument(BaseModel):
     footer: str | None
     country_of_creation: str | None
     date_of_creation: datetime | None
+    file_name: str | None = None  # the source file, the same as its discrepancies have
+    stats: TableStats | None = None
+    # what the compact schema stores instead of the three views, it's never dumped with them
+    body: CompactTableBody | None = Field(default=None, exclude=True, repr=False)
+
+    def to_mongo(self, compact: bool = False) -> dict:
+        """
+        :param compact: store the body only once (see `CompactTableBody`), rather than its three views
+        """
+        if not compact:
+            return self.model_dump()
+        document = self.model_dump(exclude=set(BODY_VIEW_FIELDS))
+        body = self.compact_body()
+        document['body'] = body.dict() if body else None
+        return document
+
+    @classmethod
+    def from_mongo(cls, document: dict) -> 'TableDocument':
+        """
+        Builds the document from either of the schemas, a compact document gets its views of the body built here.
+        """
+        document = {key: value for key, value in document.items() if key != '_id'}
+        if 'body' in document:
+            body = CompactTableBody(**document['body']) if document['body'] else None
+            for field in BODY_VIEW_FIELDS:
+                document[field] = getattr(body, field) if body else None
+            document['body'] = body
+        return cls(**document)
+
+    def compact_body(self) -> CompactTableBody | None:
+        if self.body is not None or self.rows_list is None:
+            return self.body
+        # a document that wasn't parsed here (or read from the full schema) has no compact body,
+        # its columns are the ones that have cells
+        return CompactTableBody.from_rows_list(self.rows_list, list(self.body_by_columns or {}))
+
+
+def get_headers_length(headers: list[str] | None) -> int:
+    """
+    The length of the headers serialized the way `JSON.stringify` does it (no spaces, counted in UTF-16 units),
+    so it's stored at ingest and the short headers can be found with an indexed range query rather than $where.
+    """
+    serialized_headers = json.dumps(headers, separators=(',', ':'), ensure_ascii=False)
+    return len(serialized_headers.encode('utf-16-le')) // 2
@@ -0,0 +1,61 @@
+from pydantic import BaseModel
+
+from data_classes.compact_table_body import CompactTableBody
+
+Number = int | float
+
+
+def is_number(cell) -> bool:
+    # bool is an int too, but it's never a number of the table
+    return isinstance(cell, (int, float)) and not isinstance(cell, bool)
+
+
+class TableStats(BaseModel):
+    """
+    Numbers about the table that are calculated once at ingest and stored (and indexed) with it,
+    so checking them is an indexed lookup rather than going over the bodies of all the tables.
+    The sums are of the numeric cells only, the rest are counted in `non_numeric_count` (or `empty_count`).
+    A query on a list (e.g. `row_sums`) matches a table if any of its items matches.
+    """
+    row_count: int
+    column_count: int
+    row_sums: list[Number]
+    column_sums: list[Number]
+    min_value: Number | None
+    max_value: Number | None
+    non_numeric_count: int
+    empty_count: int
+    header_lengths: list[int]
+
+    @classmethod
+    def from_body(cls, body: CompactTableBody, headers: list[str] | None) -> 'TableStats':
+        column_sums = [0] * len(body.columns)
+        row_sums = []
+        numbers = []
+        non_numeric_count = empty_count = 0
+        for row in body.rows:
+            row_sum = 0
+            for column_index, cell in enumerate(row):
+                if is_number(cell):
+                    row_sum += cell
+                    numbers.append(cell)
+                    if column_index < len(column_sums):
+                        column_sums[column_index] += cell
+                elif cell is None:
+                    empty_count += 1
+                else:
+                    non_numeric_count += 1
+            row_sums.append(row_sum)
+        return cls(row_count=len(body.rows),
+                   column_count=len(body.columns),
+                   row_sums=row_sums,
+                   column_sums=column_sums,
+                   min_value=min(numbers, default=None),
+                   max_value=max(numbers, default=None),
+                   non_numeric_count=non_numeric_count,
+                   empty_count=empty_count,
+                   header_lengths=[len(header) for header in headers or []])
+
+
+# the stats that can be queried by, i.e. all of them
+STAT_FIELDS = tuple(TableStats.model_fields)
@@ -0,0 +1,27 @@
+from dataclasses import dataclass
+
+from bson import ObjectId
+
+# the order a streamed validation goes in: the rules over the tables first, then the saved discrepancies,
+# which are fetched by category (the missing parts first)
+VALIDATION_STAGES = ('rules', 'not_found_discrepancies', 'invalid_discrepancies')
+
+
+@dataclass
+class ValidationCheckpoint:
+    """
+    How far a streamed validation got: the stage, and the `_id` of the last document it went over in that stage.
+    """
+    stage: str = VALIDATION_STAGES[0]
+    last_id: ObjectId | None = None
+
+    def dict(self):
+        return {
+            "stage": self.stage,
+            "last_id": str(self.last_id) if self.last_id else None
+        }
+
+    @classmethod
+    def from_dict(cls, checkpoint_dict: dict) -> 'ValidationCheckpoint':
+        last_id = checkpoint_dict.get('last_id')
+        return cls(stage=checkpoint_dict['stage'], last_id=ObjectId(last_id) if last_id else None)
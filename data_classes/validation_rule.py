@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass
+class ValidationRule:
+    """
+    A check the validator runs over the tables.
+    The same check is written twice: as a db query, so all the rules can be sent in a single query,
+    and as a predicate over a single document, to tell which of the rules the returned document broke.
+    """
+    name: str
+    query: dict
+    predicate: Callable[[dict], bool]
+    details: Callable[[dict], dict]  # what's reported about a document that broke the rule
+    fields: tuple[str, ...] = ()  # the fields the predicate and the details read, only those are fetched
@@ -0,0 +1,139 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+from loguru import logger
+
+from data_classes.discrepancy import Discrepancy
+from data_classes.table_document import TableDocument
+from data_utils.parser import Parser, _init_worker, _parse_markup_in_worker, count_parsed, record_cache_metrics
+from db_utils.async_connectors import AsyncDiscrepancyDBConnector, AsyncMongoDBTablesConnector
+from monitoring.metrics import METRICS
+
+# the number of files that were read (and are being parsed) ahead of the writes
+DEFAULT_QUEUE_SIZE = 16
+
+
+class AsyncDocumentSink:
+    """
+    The async counterpart of `DocumentSink`, where the async pipeline puts the parsed documents.
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def write(self, table_document: TableDocument | None, discrepancies: list[Discrepancy]):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class AsyncMongoSink(AsyncDocumentSink):
+    """
+    Upserts the documents and the discrepancies in async bulk writes, see `AsyncBatchWriter`.
+    """
+
+    def __init__(self, tables_connector: AsyncMongoDBTablesConnector,
+                 discrepancies_connector: AsyncDiscrepancyDBConnector, batch_size: int | None = None):
+        self.tables_writer = tables_connector.batch_writer(batch_size)
+        self.discrepancies_writer = discrepancies_connector.batch_writer(batch_size)
+
+    async def write(self, table_document: TableDocument | None, discrepancies: list[Discrepancy]):
+        if table_document:
+            await self.tables_writer.upsert(table_document)
+        for discrepancy in discrepancies:
+            await self.discrepancies_writer.upsert(discrepancy)
+
+    @property
+    def write_errors(self) -> list[dict]:
+        return self.tables_writer.write_errors + self.discrepancies_writer.write_errors
+
+    async def close(self):
+        await self.tables_writer.close()
+        await self.discrepancies_writer.close()
+
+
+async def parse_to_async_sink(parser: Parser, files: Iterable[Path], sink: AsyncDocumentSink, workers: int = 1,
+                              queue_size: int = DEFAULT_QUEUE_SIZE) -> int:
+    """
+    The files are read without blocking the event loop, parsed in an executor (a process pool if there are
+    several workers), and written to the sink as they're done, in their order.
+    So a file is read and parsed while the previous ones are being written, rather than one after the other.
+    The queue between the reading and the writing is bounded, so a slow db holds back the reading,
+    and no more than `queue_size` files are in memory at once.
+    :return: the number of files written
+    """
+    loop = asyncio.get_running_loop()
+    if workers > 1:
+        executor: Executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                 initargs=(parser.html_backend,
+                                                           parser.country_resolver.cache_path))
+        parse = _parse_markup_in_worker
+    else:
+        # a single thread, since the parser isn't thread safe, it still leaves the event loop free for the writes
+        executor = ThreadPoolExecutor(max_workers=1)
+        parse = parser._parse_markup
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def read_and_parse():
+        for file_path in files:
+            markup = await asyncio.to_thread(file_path.read_text, encoding='utf-8')
+            await queue.put((file_path, loop.run_in_executor(executor, parse, markup, file_path.name)))
+        await queue.put(None)
+
+    async def write() -> int:
+        files_written = 0
+        while (item := await queue.get()) is not None:
+            file_path, parsed = item
+            table_document, file_discrepancies = await parsed
+            count_parsed(table_document, file_discrepancies)
+            if file_discrepancies:
+                logger.warning(f'Saving discrepancies for file: {file_path.name}')
+            await sink.write(table_document, file_discrepancies)
+            files_written += 1
+        return files_written
+
+    with executor:
+        async with sink:
+            # if either of them fails, the other one is cancelled rather than left waiting on the queue
+            async with asyncio.TaskGroup() as task_group:
+                task_group.create_task(read_and_parse())
+                writing = task_group.create_task(write())
+    return writing.result()
+
+
+async def parse_async(parser: Parser, path_str: str, workers: int = 1, batch_size: int | None = None,
+                      queue_size: int = DEFAULT_QUEUE_SIZE) -> int:
+    """
+    The async counterpart of `Parser.parse` (without the incremental mode), writing with the async connectors.
+    :return: the number of files written
+    """
+    tables_connector = AsyncMongoDBTablesConnector.get_local_connector()
+    discrepancies_connector = AsyncDiscrepancyDBConnector.get_local_connector()
+    try:
+        await tables_connector.ensure_indexes()
+        await discrepancies_connector.ensure_indexes()
+        sink = AsyncMongoSink(tables_connector, discrepancies_connector, batch_size)
+        files_written = await parse_to_async_sink(parser, parser._get_valid_files(Path(path_str)), sink, workers,
+                                                  queue_size)
+        logger.info(f'Parsed {files_written} files, discrepancies saved: '
+                    f'{sink.discrepancies_writer.upserted_count} new, '
+                    f'{sink.discrepancies_writer.matched_count} already existed')
+        if sink.write_errors:
+            logger.error(f'Failed to write {len(sink.write_errors)} documents and discrepancies')
+    finally:
+        await tables_connector.close()
+        await discrepancies_connector.close()
+    parser.country_resolver.save()
+    record_cache_metrics(parser.country_resolver)
+    METRICS.write()
+    return files_written
+
+
+if __name__ == '__main__':
+    asyncio.run(parse_async(Parser(connect_to_db=False), '../documents/'))
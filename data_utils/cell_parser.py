@@ -0,0 +1,30 @@
+import re
+
+INT_PATTERN = re.compile(r'[+-]?\d+')
+FLOAT_PATTERN = re.compile(r'[+-]?(\d+\.\d*|\.\d+)([eE][+-]?\d+)?')
+# BSON integers are 64 bit, a longer number is kept as its text rather than failing the whole document
+MAX_BSON_INT = 2 ** 63 - 1
+
+
+def parse_cell(cell_text: str) -> int | float | str | None:
+    """
+    Types a (stripped) cell of the table's body, so the numbers are stored as numbers and the db can sum/compare them.
+    An empty cell is None, and a cell that isn't a plain number (e.g. '846%') is kept as it's written.
+    """
+    if not cell_text:
+        return None
+    if INT_PATTERN.fullmatch(cell_text):
+        number = int(cell_text)
+        return number if -MAX_BSON_INT - 1 <= number <= MAX_BSON_INT else cell_text
+    if FLOAT_PATTERN.fullmatch(cell_text):
+        return float(cell_text)
+    return cell_text
+
+
+def sum_of_first_row(row: list) -> int | None:
+    """
+    The sum of a typed row's cells (after its label), only a row of whole numbers has one.
+    """
+    if not all(type(cell) is int for cell in row[1:]):
+        return None
+    return sum(row[1:])
@@ -0,0 +1,70 @@
+import json
+from collections import OrderedDict
+from pathlib import Path
+
+import pycountry
+
+DEFAULT_CACHE_SIZE = 1024
+# the names a country can be looked up by exactly, other than its name
+COUNTRY_ALIAS_FIELDS = ['common_name', 'official_name']
+
+
+class CountryResolver:
+    """
+    Resolves the country name written in a footer to its pycountry name.
+    `pycountry.countries.search_fuzzy` goes over every country, subdivision and historic name, so it's slow,
+    but the footers repeat a small set of countries, so the results are kept in a bounded LRU cache,
+    including the names that weren't found at all.
+    Exact names (and common/official names) are looked up by pycountry's index before falling back to the fuzzy search,
+    the fuzzy search would have ranked an exact match first anyway.
+    The cache can be kept in a json file between runs.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE, cache_path: str | Path | None = None):
+        self.max_size = max_size
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.cache: OrderedDict[str, str | None] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if self.cache_path and self.cache_path.exists():
+            with open(self.cache_path, encoding='utf-8') as f:
+                self.cache.update(json.load(f))
+
+    def resolve(self, country_str: str) -> str | None:
+        """
+        :return: the country's name, or None if there's no such country
+        """
+        key = self._normalize(country_str)
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        self.misses += 1
+        country_name = self._lookup(key)
+        self.cache[key] = country_name
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        return country_name
+
+    def save(self):
+        if not self.cache_path:
+            return
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f, indent=2)
+
+    @staticmethod
+    def _lookup(key: str) -> str | None:
+        if country := pycountry.countries.get(name=key):
+            return country.name
+        for field in COUNTRY_ALIAS_FIELDS:
+            if country := pycountry.countries.get(**{field: key}):
+                return country.name
+        try:
+            countries = pycountry.countries.search_fuzzy(key)
+        except LookupError:
+            return None
+        return countries[0].name if countries else None
+
+    @staticmethod
+    def _normalize(country_str: str) -> str:
+        return ' '.join(country_str.split()).lower()
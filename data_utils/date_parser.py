@@ -0,0 +1,42 @@
+import datetime
+import re
+from functools import lru_cache
+
+from dateutil.parser import parse, ParserError
+
+FOOTER_DATE_PATTERN = re.compile(r'(\d{1,2})([A-Za-z]{3,9})(\d{4})')  # the usual shape of the footer date: 3Feb2013
+MONTHS = {'jan': 1, 'january': 1,
+          'feb': 2, 'february': 2,
+          'mar': 3, 'march': 3,
+          'apr': 4, 'april': 4,
+          'may': 5,
+          'jun': 6, 'june': 6,
+          'jul': 7, 'july': 7,
+          'aug': 8, 'august': 8,
+          'sep': 9, 'sept': 9, 'september': 9,
+          'oct': 10, 'october': 10,
+          'nov': 11, 'november': 11,
+          'dec': 12, 'december': 12}
+
+
+@lru_cache(maxsize=4096)
+def parse_footer_date(date_str: str) -> datetime.datetime | None:
+    """
+    Parses the date taken from a footer (e.g. 3Feb2013), or returns None if it isn't a valid date.
+    `dateutil` can parse anything, which makes it slow, so the usual shape is parsed here,
+    and anything else (2 digit years, unknown month names, invalid dates) is left to `dateutil`,
+    so the results are exactly the same.
+    The footers repeat the same dates, so the results are cached.
+    """
+    if match := FOOTER_DATE_PATTERN.fullmatch(date_str):
+        day, month_name, year = match.groups()
+        # dateutil treats years below 100 as 2 digit years (0001 is 2001), so they're left to it
+        if (month := MONTHS.get(month_name.lower())) and int(year) >= 100:
+            try:
+                return datetime.datetime(int(year), month, int(day))
+            except ValueError:
+                pass
+    try:
+        return parse(date_str)
+    except (ValueError, ParserError, OverflowError):
+        return None
@@ -1,22 +1,37 @@
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
-from data_classes.discrepancy import DiscrepancyType
+from data_classes.discrepancy import Discrepancy, DiscrepancyCategory, DiscrepancyType, \
+    NOT_FOUND_DISCREPANCY_TYPE_VALUES
+from data_classes.table_document import TableDocument
+from data_classes.validation_checkpoint import VALIDATION_STAGES, ValidationCheckpoint
+from data_classes.validation_rule import ValidationRule
 from data_classes.validation_status import ValidationStatus
 from db_utils.discrepancy_db_connector import DiscrepancyDBConnector
-from db_utils.validation_connector import ValidationConnector
+from db_utils.base_mongo_db_connector import DEFAULT_PAGE_SIZE
+from db_utils.validation_connector import STAT_OPERATORS, ValidationConnector
 from db_utils.default_db_config import DEFAULT_DB_CONFIG_LOCAL, DISCREPANCIES_DB_CONFIG_LOCAL
 
 
 class DocumentValidator:
     def __init__(self, max_headers_length: Optional[int] = None,
                  late_date: Optional[str] = None,
-                 high_sum: Optional[int] = None):
+                 high_sum: Optional[int] = None,
+                 stat_thresholds: Optional[list[tuple[str, str, int | float]]] = None,
+                 connect_to_db: bool = True):
+        """
+        :param stat_thresholds: more rules over the tables' stats, as (stat, operator, value),
+                                e.g. ('max_value', '$gt', 1000), see `TableStats`
+        :param connect_to_db: without the db, only the parsed documents can be validated, see `validate_documents`
+        """
         self.max_headers_length = max_headers_length
         self.late_date = late_date
         self.high_sum = high_sum
-        self.validation_connector = ValidationConnector.get_local_connector()
-        self.discrepancies_connector = DiscrepancyDBConnector.get_local_connector()
+        self.stat_thresholds = stat_thresholds or []
+        self.validation_connector = ValidationConnector.get_local_connector() if connect_to_db else None
+        self.discrepancies_connector = DiscrepancyDBConnector.get_local_connector() if connect_to_db else None
         self.all_discrepancies: list[tuple[ValidationStatus, dict]] = []
+        self.discrepancies_by_rule: dict[str, list[tuple[ValidationStatus, dict]]] = {}
+        self.checkpoint = ValidationCheckpoint()
 
     def main(self):
         self.validate()
@@ -26,54 +41,243 @@ class DocumentValidator:
         # should this method receive a document and validate it, or just... run and look for issues.
         # So I'm going to look for the predefined issues and return a list of documents that have issues.
         # Which also means that there are no NOT_PROCESSED issues, since this validation is supposed to run after the parser
+        #
+        # All the rules are checked in a single pass over the tables (rather than a query per rule),
+        # and each finding has the id of the document it was found in.
 
-        self.collect_short_header_discrepancies()
-        self.collect_late_date_discrepancies()
-        self.collect_high_sum_discrepancies()
+        self.collect_rule_discrepancies()
         self.collect_saved_discrepancies()
 
         return self.all_discrepancies
 
+    def get_rules(self) -> list[ValidationRule]:
+        rules = []
+        if self.max_headers_length is not None:
+            rules.append(self.short_headers_rule(self.max_headers_length))
+        if self.late_date is not None:
+            rules.append(self.late_date_rule(self.late_date))
+        if self.high_sum is not None:
+            rules.append(self.high_sum_rule(self.high_sum))
+        for stat, operator_name, value in self.stat_thresholds:
+            rules.append(self.stat_rule(stat, operator_name, value))
+        return rules
+
+    def collect_rule_discrepancies(self) -> dict[str, list[tuple[ValidationStatus, dict]]]:
+        """
+        A single query finds the documents that broke any of the rules, and each rule's predicate tells which.
+        :return: the discrepancies grouped by the rule they broke (also kept in `discrepancies_by_rule`)
+        """
+        rules = self.get_rules()
+        self.discrepancies_by_rule = {rule.name: [] for rule in rules}
+        if not rules:
+            return self.discrepancies_by_rule
+        for doc in self.validation_connector.find_any([rule.query for rule in rules], self.rules_projection(rules)):
+            for rule, details in self._broken_rules(rules, doc):
+                self.discrepancies_by_rule[rule.name].append((ValidationStatus.INVALID, details))
+        for rule_discrepancies in self.discrepancies_by_rule.values():
+            self.all_discrepancies.extend(rule_discrepancies)
+        return self.discrepancies_by_rule
+
+    @staticmethod
+    def _broken_rules(rules: list[ValidationRule], doc: dict) -> Iterator[tuple[ValidationRule, dict]]:
+        for rule in rules:
+            if rule.predicate(doc):
+                yield rule, {"document_id": doc.get('document_id'), **rule.details(doc)}
+
+    @staticmethod
+    def rules_projection(rules: list[ValidationRule]) -> list[str]:
+        # the document_id is always there, so each finding can be traced back to its table
+        return sorted({'document_id'}.union(*[rule.fields for rule in rules]))
+
     def collect_short_header_discrepancies(self) -> None:
         if self.max_headers_length is None:
             return
-        documents_with_short_headers = self.validation_connector.find_short_headers(self.max_headers_length)
+        rule = self.short_headers_rule(self.max_headers_length)
+        documents_with_short_headers = self.validation_connector.find_short_headers(self.max_headers_length,
+                                                                                    list(rule.fields))
         for doc in documents_with_short_headers:
-            discrepancy = (ValidationStatus.INVALID, {
-                "headers": doc['headers'],
-                "length": len(str(doc['headers']))
-            })
-            self.all_discrepancies.append(discrepancy)
+            self.all_discrepancies.append((ValidationStatus.INVALID, rule.details(doc)))
 
     def collect_late_date_discrepancies(self) -> None:
         if self.late_date is None:
             return
-        documents_with_late_date = self.validation_connector.find_late_date_of_creation(self.late_date)
+        rule = self.late_date_rule(self.late_date)
+        documents_with_late_date = self.validation_connector.find_late_date_of_creation(self.late_date,
+                                                                                        list(rule.fields))
         for doc in documents_with_late_date:
-            discrepancy = (ValidationStatus.INVALID, {
-                "date_of_creation": doc['date_of_creation']
-            })
-            self.all_discrepancies.append(discrepancy)
+            self.all_discrepancies.append((ValidationStatus.INVALID, rule.details(doc)))
 
     def collect_high_sum_discrepancies(self) -> None:
         if self.high_sum is None:
             return
-        documents_with_high_sum = self.validation_connector.find_high_sum_by_precalculated_value(self.high_sum)
+        rule = self.high_sum_rule(self.high_sum)
+        documents_with_high_sum = self.validation_connector.find_high_sum_by_precalculated_value(self.high_sum,
+                                                                                              list(rule.fields))
         for doc in documents_with_high_sum:
-            discrepancy = (ValidationStatus.INVALID, {
-                "sum_of_first_row": doc['sum_of_first_row']
-            })
-            self.all_discrepancies.append(discrepancy)
+            self.all_discrepancies.append((ValidationStatus.INVALID, rule.details(doc)))
+
+    @staticmethod
+    def short_headers_rule(max_headers_length: int) -> ValidationRule:
+        return ValidationRule(
+            name='short_headers',
+            query=ValidationConnector.short_headers_query(max_headers_length),
+            predicate=lambda doc: doc.get('headers_length') is not None and doc['headers_length'] < max_headers_length,
+            details=lambda doc: {"headers": doc['headers'], "length": len(str(doc['headers']))},
+            fields=('headers', 'headers_length'))
+
+    @staticmethod
+    def late_date_rule(late_date: str) -> ValidationRule:
+        query = ValidationConnector.late_date_of_creation_query(late_date)
+        date = query['date_of_creation']['$gt']
+        return ValidationRule(
+            name='late_date',
+            query=query,
+            predicate=lambda doc: doc.get('date_of_creation') is not None and doc['date_of_creation'] > date,
+            details=lambda doc: {"date_of_creation": doc['date_of_creation']},
+            fields=('date_of_creation',))
+
+    @staticmethod
+    def high_sum_rule(high_sum: int) -> ValidationRule:
+        return ValidationRule(
+            name='high_sum',
+            query=ValidationConnector.high_sum_by_precalculated_value_query(high_sum),
+            predicate=lambda doc: doc.get('sum_of_first_row') is not None and doc['sum_of_first_row'] > high_sum,
+            details=lambda doc: {"sum_of_first_row": doc['sum_of_first_row']},
+            fields=('sum_of_first_row',))
+
+    @staticmethod
+    def stat_rule(stat: str, operator_name: str, value: int | float) -> ValidationRule:
+        query = ValidationConnector.stat_query(stat, operator_name, value)
+
+        def predicate(doc: dict) -> bool:
+            # the same as mongo compares them: a list matches if any of its items does, and a missing value is
+            # only ever not equal
+            stat_value = (doc.get('stats') or {}).get(stat)
+            items = stat_value if isinstance(stat_value, list) else [stat_value]
+            items = [item for item in items if item is not None]
+            if operator_name == '$ne':
+                return not any(item == value for item in items)
+            return any(STAT_OPERATORS[operator_name](item, value) for item in items)
+
+        return ValidationRule(
+            name=f'{stat}_{operator_name.lstrip("$")}_{value}',
+            query=query,
+            predicate=predicate,
+            details=lambda doc: {stat: (doc.get('stats') or {}).get(stat)},
+            fields=(f'stats.{stat}',))
 
     def collect_saved_discrepancies(self) -> None:
-        saved_discrepancies = self.discrepancies_connector.find({})
-        for discrepancy in saved_discrepancies:
-            if discrepancy.get('discrepancy_type') in [member.value for name, member in vars(DiscrepancyType).items() if
-                                                       name.startswith('MISSING')]:
-                self.all_discrepancies.append((ValidationStatus.NOT_FOUND, discrepancy))
+        # the discrepancies are classified by the db, by their (indexed) type
+        for status, query in self._saved_discrepancies_queries().values():
+            for discrepancy in self.discrepancies_connector.find(query):
+                self.all_discrepancies.append((status, discrepancy))
+
+    @staticmethod
+    def _saved_discrepancies_queries() -> dict[str, tuple[ValidationStatus, dict]]:
+        # both are $in queries, the index on the type is used for either of them, which $nin can't do well
+        not_found_types = sorted(NOT_FOUND_DISCREPANCY_TYPE_VALUES)
+        invalid_types = sorted(member.value for member in DiscrepancyType
+                               if member.value not in NOT_FOUND_DISCREPANCY_TYPE_VALUES)
+        return {'not_found_discrepancies': (ValidationStatus.NOT_FOUND, {'discrepancy_type': {'$in': not_found_types}}),
+                'invalid_discrepancies': (ValidationStatus.INVALID, {'discrepancy_type': {'$in': invalid_types}})}
+
+    def iter_validate(self, batch_size: int = DEFAULT_PAGE_SIZE,
+                      file_name: Optional[str] = None,
+                      discrepancy_types: Optional[Iterable[DiscrepancyType | str]] = None,
+                      checkpoint: Optional[ValidationCheckpoint] = None) -> Iterator[tuple[ValidationStatus, dict]]:
+        """
+        The same findings as `validate`, but streamed a page at a time, so nothing is kept in memory.
+        The rules' findings also have the name of the rule they broke under "rule".
+        `self.checkpoint` is moved past a document right before its last finding is yielded, so passing it back
+        resumes the validation right after the last document that was fully handled
+        (a document that was stopped in the middle of is gone over again).
+        :param batch_size: the number of documents fetched per page
+        :param file_name: only the tables and discrepancies of this file
+        :param discrepancy_types: only these saved discrepancy types and rule names
+        :param checkpoint: where to resume from
+        """
+        self.checkpoint = checkpoint or ValidationCheckpoint()
+        kinds = None
+        if discrepancy_types is not None:
+            kinds = {kind.value if isinstance(kind, DiscrepancyType) else kind for kind in discrepancy_types}
+        file_query = {'file_name': file_name} if file_name is not None else {}
+
+        for stage in VALIDATION_STAGES[VALIDATION_STAGES.index(self.checkpoint.stage):]:
+            if stage != self.checkpoint.stage:
+                self.checkpoint = ValidationCheckpoint(stage=stage)
+            if stage == 'rules':
+                rules = [rule for rule in self.get_rules() if kinds is None or rule.name in kinds]
+                if not rules:
+                    continue
+                query = {'$or': [rule.query for rule in rules]}
+                for doc in self._iter_pages(self.validation_connector, {**file_query, **query},
+                                            self.rules_projection(rules), batch_size):
+                    yield from self._checkpointed(doc['_id'], [
+                        (ValidationStatus.INVALID, {"rule": rule.name, **details})
+                        for rule, details in self._broken_rules(rules, doc)])
             else:
-                self.all_discrepancies.append((ValidationStatus.INVALID, discrepancy))
+                status, query = self._saved_discrepancies_queries()[stage]
+                if kinds is not None:
+                    query = {'$and': [query, {'discrepancy_type': {'$in': sorted(kinds)}}]}
+                for discrepancy in self._iter_pages(self.discrepancies_connector, {**file_query, **query},
+                                                    None, batch_size):
+                    yield from self._checkpointed(discrepancy['_id'], [(status, discrepancy)])
+
+    def _checkpointed(self, document_id, findings: list[tuple[ValidationStatus, dict]]
+                      ) -> Iterator[tuple[ValidationStatus, dict]]:
+        # the checkpoint has to be moved before the last finding is handed over, since the consumer may never
+        # come back for the next one, and the finding would be found again on resume
+        if not findings:
+            self.checkpoint.last_id = document_id
+        for index, finding in enumerate(findings):
+            if index == len(findings) - 1:
+                self.checkpoint.last_id = document_id
+            yield finding
+
+    def validate_document(self, table_document: TableDocument | None,
+                          discrepancies: Iterable[Discrepancy] = ()) -> list[tuple[ValidationStatus, dict]]:
+        """
+        The findings of a single parsed document and its discrepancies, see `validate_documents`.
+        """
+        return list(self._document_findings(self.get_rules(), table_document, discrepancies))
+
+    def validate_documents(self, parsed_documents: Iterable[tuple[TableDocument | None, list[Discrepancy]]]
+                           ) -> Iterator[tuple[ValidationStatus, dict]]:
+        """
+        The same findings as `iter_validate` (and the rules' ones have the file name too), but of the documents
+        as they're parsed (e.g. `Parser.iter_parse`) rather than of the ones in the db, so a drop of files can be checked before it's ingested,
+        in the same single pass that parses it.
+        The rules' predicates are the ones the db's findings are told apart with, so they're checked on the dumped
+        documents, and the discrepancies are classified by their category, the way the db's queries classify them.
+        """
+        rules = self.get_rules()
+        for table_document, discrepancies in parsed_documents:
+            yield from self._document_findings(rules, table_document, discrepancies)
+
+    def _document_findings(self, rules: list[ValidationRule], table_document: TableDocument | None,
+                           discrepancies: Iterable[Discrepancy]) -> Iterator[tuple[ValidationStatus, dict]]:
+        if table_document is not None and rules:
+            # only the fields the rules look at are dumped, the same as they're projected from the db
+            doc = table_document.model_dump(include={field.split('.')[0] for field in self.rules_projection(rules)})
+            for rule, details in self._broken_rules(rules, doc):
+                yield ValidationStatus.INVALID, {"rule": rule.name, "file_name": table_document.file_name, **details}
+        for discrepancy in discrepancies:
+            yield self._discrepancy_status(discrepancy), discrepancy.dict()
+
+    @staticmethod
+    def _discrepancy_status(discrepancy: Discrepancy) -> ValidationStatus:
+        if discrepancy.discrepancy_type.category == DiscrepancyCategory.NOT_FOUND:
+            return ValidationStatus.NOT_FOUND
+        return ValidationStatus.INVALID
 
+    def _iter_pages(self, connector, query: dict, projection: list[str] | None, batch_size: int) -> Iterator[dict]:
+        after_id = self.checkpoint.last_id
+        while True:
+            page = connector.find_page(query, projection, after_id=after_id, limit=batch_size)
+            yield from page
+            if len(page) < batch_size:
+                return
+            after_id = page[-1]['_id']
 
 if __name__ == "__main__":
     dv = DocumentValidator(max_headers_length=22, late_date="2020-01-01", high_sum=1000)
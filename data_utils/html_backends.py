@@ -0,0 +1,67 @@
+from typing import IO
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional, only the 'lxml' backend needs it
+    lxml = None
+
+# BeautifulSoup's own tree builders, 'html.parser' is the slowest, but it's in the standard library
+SOUP_BACKENDS = ['html.parser', 'html5lib']
+LXML_BACKEND = 'lxml'
+HTML_BACKENDS = SOUP_BACKENDS + [LXML_BACKEND]
+DEFAULT_HTML_BACKEND = 'html.parser'
+
+
+class LxmlTag:
+    """
+    Wraps an lxml element with the part of BeautifulSoup's `Tag` interface the parser uses,
+    so all the parsing helpers work the same with both.
+    BeautifulSoup's own lxml tree builder is fast too, but it doesn't keep the source lines of the tags,
+    which are the locations of the discrepancies, while lxml's elements do.
+    """
+    __slots__ = ['element']
+
+    def __init__(self, element):
+        self.element = element
+
+    @property
+    def name(self) -> str:
+        return self.element.tag
+
+    @property
+    def text(self) -> str:
+        return self.element.text_content()
+
+    @property
+    def sourceline(self) -> int | None:
+        return self.element.sourceline
+
+    def get(self, attribute: str, default=None):
+        return self.element.get(attribute, default)
+
+    def find_all(self, name: str | list[str]) -> list['LxmlTag']:
+        names = [name] if isinstance(name, str) else name
+        return [LxmlTag(element) for element in self.element.iterdescendants(*names)]
+
+    def __str__(self):
+        return lxml.html.tostring(self.element, encoding='unicode', with_tail=False)
+
+    def __repr__(self):
+        return str(self)
+
+
+def parse_html(markup: str | IO, backend: str = DEFAULT_HTML_BACKEND) -> BeautifulSoup | LxmlTag:
+    """
+    :return: the root of the parsed document, which can be searched with `find_all`
+    """
+    if backend in SOUP_BACKENDS:
+        return BeautifulSoup(markup, backend)
+    if backend == LXML_BACKEND:
+        if lxml is None:
+            raise ImportError("The 'lxml' html backend requires lxml to be installed")
+        if not isinstance(markup, str):
+            markup = markup.read()
+        return LxmlTag(lxml.html.document_fromstring(markup))
+    raise ValueError(f'Unknown html backend: {backend}, expected one of {HTML_BACKENDS}')
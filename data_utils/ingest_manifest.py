@@ -0,0 +1,84 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from loguru import logger
+
+MANIFEST_FILE_NAME = '.ingest_manifest.json'
+
+
+class IngestManifest:
+    """
+    A sidecar file that remembers what every ingested source file looked like (size, mtime and content hash),
+    so an incremental run can skip the files that haven't changed before they're even read by BeautifulSoup.
+    The size and mtime are checked first, the file is hashed only if they changed
+    (touching a file without changing it won't make it parsed again).
+    Files are identified by name, the same as the discrepancies are.
+    """
+
+    def __init__(self, manifest_path: Path):
+        self.manifest_path = manifest_path
+        self.entries: dict[str, dict] = {}
+        if manifest_path.exists():
+            with open(manifest_path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+        self.seen_file_names: set[str] = set()
+        self.pending_hashes: dict[str, str] = {}
+
+    def changed_files(self, files: Iterable[Path]) -> Iterator[Path]:
+        for file_path in files:
+            self.seen_file_names.add(file_path.name)
+            if self.is_unchanged(file_path):
+                logger.debug(f'Skipping unchanged file: {file_path.name}')
+                continue
+            yield file_path
+
+    def is_unchanged(self, file_path: Path) -> bool:
+        entry = self.entries.get(file_path.name)
+        if not entry:
+            return False
+        stat = file_path.stat()
+        if entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return True
+        content_hash = self._hash_file(file_path)
+        if content_hash == entry['sha256']:
+            entry['size'], entry['mtime_ns'] = stat.st_size, stat.st_mtime_ns
+            return True
+        self.pending_hashes[file_path.name] = content_hash
+        return False
+
+    def record(self, file_path: Path, document_id: str | None) -> str | None:
+        """
+        :return: the document id the file had before, if it's a different one (so the old document can be removed)
+        """
+        stat = file_path.stat()
+        content_hash = self.pending_hashes.pop(file_path.name, None) or self._hash_file(file_path)
+        previous_entry = self.entries.get(file_path.name)
+        self.entries[file_path.name] = {'size': stat.st_size,
+                                        'mtime_ns': stat.st_mtime_ns,
+                                        'sha256': content_hash,
+                                        'document_id': document_id}
+        if previous_entry and previous_entry.get('document_id') != document_id:
+            return previous_entry.get('document_id')
+        return None
+
+    def pop_removed(self) -> dict[str, dict]:
+        """
+        Removes and returns the entries of the files that weren't seen in this run, since they were deleted.
+        Should be called only after all the files were iterated over.
+        """
+        removed_file_names = [file_name for file_name in self.entries if file_name not in self.seen_file_names]
+        return {file_name: self.entries.pop(file_name) for file_name in removed_file_names}
+
+    def document_ids(self) -> set[str]:
+        return {entry['document_id'] for entry in self.entries.values() if entry.get('document_id')}
+
+    def save(self):
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+    @staticmethod
+    def _hash_file(file_path: Path) -> str:
+        with open(file_path, 'rb') as f:
+            return hashlib.file_digest(f, 'sha256').hexdigest()
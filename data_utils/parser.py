@@ -1,100 +1,247 @@
+import argparse
 import datetime
-import inspect
+import json
 import re
-from collections import defaultdict
+import sys
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Optional
+from typing import IO, Iterable, Iterator, List, Optional
 
-import pycountry
 from bs4 import BeautifulSoup
-from dateutil.parser import parse, ParserError
 from loguru import logger
 
+from data_classes.compact_table_body import CompactTableBody
 from data_classes.discrepancy import Discrepancy, DiscrepancyType
-from data_classes.table_document import TableDocument
+from data_classes.table_document import TableDocument, get_headers_length
+from data_classes.table_stats import TableStats
+from data_utils.cell_parser import parse_cell, sum_of_first_row
+from data_utils.country_resolver import CountryResolver
+from data_utils.date_parser import parse_footer_date
+from data_utils.document_validator import DocumentValidator
+from data_utils.html_backends import DEFAULT_HTML_BACKEND, HTML_BACKENDS, parse_html
+from data_utils.ingest_manifest import IngestManifest, MANIFEST_FILE_NAME
 from data_utils.parsing_config import TableParseTags
+from data_utils.sinks import DocumentSink, MongoSink
+from data_utils.table_parts import TableParts
 from db_utils.default_db_config import DEFAULT_DB_CONFIG_LOCAL, DISCREPANCIES_DB_CONFIG_LOCAL
 from db_utils.discrepancy_db_connector import DiscrepancyDBConnector
 from db_utils.mongo_db_tables_connector import MongoDBTablesConnector
+from monitoring.metrics import METRICS
 
 VALID_FILE_TYPES = [".html", ".htm"]
+DATE_PATTERN = re.compile(r'(\d{1,2}[A-Za-z]{3,9}\d{2,4})')  # 1-2 digits, 3-9 letters, 2-4 digits
+MAX_PENDING_FILES_PER_WORKER = 4
 
 
 class Parser:
-    def __init__(self):
+    def __init__(self, connect_to_db: bool = True, country_cache_path: Optional[str] = None,
+                 html_backend: str = DEFAULT_HTML_BACKEND):
+        """
+        :param country_cache_path: a json file to keep the resolved countries in between runs
+        :param html_backend: which html parser to use, one of `HTML_BACKENDS`, 'lxml' is the fastest
+        """
+        if html_backend not in HTML_BACKENDS:
+            raise ValueError(f'Unknown html backend: {html_backend}, expected one of {HTML_BACKENDS}')
+        self.html_backend = html_backend
         self.all_discrepancies = defaultdict(list)
         self.file_discrepancies = []
+        self.country_resolver = CountryResolver(cache_path=country_cache_path)
 
-        self.tables_db_client = MongoDBTablesConnector.get_local_connector()
-        self.discrepancies_db_client = DiscrepancyDBConnector.get_local_connector()
+        # the worker processes only parse, so they don't need their own db clients
+        self.tables_db_client = MongoDBTablesConnector.get_local_connector() if connect_to_db else None
+        self.discrepancies_db_client = DiscrepancyDBConnector.get_local_connector() if connect_to_db else None
 
     def main(self):
         self.parse('../documents/')
 
-    def parse(self, path_str: str):
+    def parse(self, path_str: str, workers: int = 1, batch_size: Optional[int] = None, incremental: bool = False,
+              manifest_path: Optional[str] = None):
+        """
+        :param workers: number of processes to parse the files with, 1 (the default) parses them in this process.
+        :param batch_size: number of documents per bulk write, defaults to the local env config.
+        :param incremental: parse only the files that changed since the last incremental run,
+        and remove the documents and discrepancies of the files that were deleted since.
+        :param manifest_path: where the incremental runs keep track of the files, defaults to a file in the given path.
+        All the db writes are made here, in the parent process, in the order of the files.
+        The documents and their discrepancies are streamed to the db, so they aren't kept in `all_discrepancies`.
+        """
         path = Path(path_str)
-        # A simple and naive approach is to parse each document and then insert it into the database, one by one.
-        # This approach is simple and easy to implement, but it's not efficient since it will open a new connection to the database for each document.
-        #
-        # A more efficient approach would be to parse all the documents and then insert them all at once.
-        # Or batch them in groups and then insert them in batches.
-        # But then I may be required to handle cases like huge documents or other unexpected cases.
-        #
-        # Since I insert these documents once, and I don't expect to have a large number of documents,
-        # I've decided to go with the simple and naive approach.
+        # At first, I parsed each document and then inserted it into the database, one by one.
+        # That's a round trip per document, which is fine for a few documents on a local db, but not for a remote one.
+        # So now the documents are buffered and written in batches, which are flushed by count and by size,
+        # so huge documents won't make a single huge request.
         files_in_path = self._get_valid_files(path)
-        for file in files_in_path:
-            if table_document := self.parse_file(file):
+        manifest = None
+        if incremental:
+            manifest = IngestManifest(Path(manifest_path) if manifest_path else path / MANIFEST_FILE_NAME)
+            files_in_path = manifest.changed_files(files_in_path)
+        replaced_document_ids = []
+        # upserting by document id and file name is a collection scan without their indexes
+        self.tables_db_client.ensure_indexes()
+        self.discrepancies_db_client.ensure_indexes()
+        with MongoSink(self.tables_db_client, self.discrepancies_db_client, batch_size) as sink:
+            for file, table_document, file_discrepancies in self._iter_parsed_files(files_in_path, workers):
+                if manifest:
+                    # the file was parsed before, and its old discrepancies may not be there anymore
+                    sink.replace_file_discrepancies(file.name)
+                    document_id = table_document.document_id if table_document else None
+                    if previous_document_id := manifest.record(file, document_id):
+                        replaced_document_ids.append(previous_document_id)
+                if file_discrepancies:
+                    logger.warning(f'Saving discrepancies for file: {file.name}')
                 logger.debug(f'Inserting document: {file.name}')
-                self.tables_db_client.upsert(table_document)
+                sink.write(table_document, file_discrepancies)
+        discrepancies_writer = sink.discrepancies_writer
+        logger.info(f'Discrepancies saved: {discrepancies_writer.upserted_count} new, '
+                    f'{discrepancies_writer.matched_count} already existed')
+        if sink.write_errors:
+            logger.error(f'Failed to write {len(sink.write_errors)} documents and discrepancies')
 
-        if self.all_discrepancies:
-            for file_name, discrepancies in self.all_discrepancies.items():
-                logger.warning(f'Saving discrepancies for file: {file_name}')
-                self.discrepancies_db_client.insert_many(discrepancies)
+        self.country_resolver.save()
+        record_cache_metrics(self.country_resolver)
+        METRICS.write()
+
+        if manifest:
+            self._remove_stale_data(manifest, replaced_document_ids)
+            if sink.write_errors:
+                # the manifest isn't saved, so the next run will try the changed files again
+                logger.error('Not saving the ingest manifest, since some of the documents failed to be written')
+            else:
+                manifest.save()
+
+    def iter_parse(self, path_str: str, workers: int = 1) -> Iterator[tuple[TableDocument | None, list[Discrepancy]]]:
+        """
+        Yields each file's document and discrepancies as soon as it's parsed, and keeps nothing,
+        so it can go over any number of files, and whoever consumes it can start working right away.
+        """
+        for _, table_document, file_discrepancies in self._iter_parsed_files(self._get_valid_files(Path(path_str)),
+                                                                             workers):
+            yield table_document, file_discrepancies
+
+    def parse_to_sink(self, path_str: str, sink: DocumentSink, workers: int = 1):
+        with sink:
+            for table_document, file_discrepancies in self.iter_parse(path_str, workers):
+                sink.write(table_document, file_discrepancies)
+        record_cache_metrics(self.country_resolver)
+
+    def _remove_stale_data(self, manifest: IngestManifest, replaced_document_ids: List[str]):
+        """
+        The documents and the discrepancies of files that were removed are deleted,
+        and so are the documents whose file now has a different document id.
+        """
+        removed_entries = manifest.pop_removed()
+        # documents without an id can't be told apart, so they're left alone,
+        # and an id that a file still has (e.g. a renamed file, or one that took another file's id) isn't stale,
+        # the manifest's entries have the ids of all the files that are left, including the ones written in this run
+        live_document_ids = manifest.document_ids()
+        stale_document_ids = [document_id for document_id in
+                              replaced_document_ids + [entry.get('document_id') for entry in removed_entries.values()]
+                              if document_id and document_id not in live_document_ids]
+        if removed_entries:
+            self.discrepancies_db_client.delete_many({'file_name': {'$in': list(removed_entries)}})
+        if stale_document_ids:
+            logger.info(f'Deleting {len(stale_document_ids)} documents of removed or replaced files')
+            self.tables_db_client.delete_many({'document_id': {'$in': stale_document_ids}})
 
     def parse_file(self, file_path: Path) -> TableDocument | None:
+        table_document, file_discrepancies = self._parse_file(file_path)
+        if file_discrepancies:
+            self.all_discrepancies[file_path.name] = file_discrepancies
+        return table_document
+
+    def _iter_parsed_files(self, files: Iterable[Path], workers: int = 1) -> Iterator[
+        tuple[Path, TableDocument | None, list[Discrepancy]]]:
+        """
+        Yields the parsed files in the order they were given, whether they're parsed here or in a process pool.
+        The pool gets only a few files per worker ahead of the consumer, so the results don't pile up in memory.
+        """
+        if workers <= 1:
+            for file_path in files:
+                parsed = self._parse_file(file_path)
+                count_parsed(*parsed)
+                yield file_path, *parsed
+            return
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.html_backend, self.country_resolver.cache_path)) as executor:
+            pending = deque()
+            for file_path in files:
+                pending.append((file_path, executor.submit(_parse_file_in_worker, file_path)))
+                if len(pending) >= workers * MAX_PENDING_FILES_PER_WORKER:
+                    yield self._collect_parsed(*pending.popleft())
+            while pending:
+                yield self._collect_parsed(*pending.popleft())
+
+    @staticmethod
+    def _collect_parsed(file_path: Path, future) -> tuple[Path, TableDocument | None, list[Discrepancy]]:
+        table_document, file_discrepancies = future.result()
+        count_parsed(table_document, file_discrepancies)
+        return file_path, table_document, file_discrepancies
+
+    def _parse_file(self, file_path: Path) -> tuple[TableDocument | None, list[Discrepancy]]:
         with open(file_path, encoding='utf-8') as f:
-            self.file_discrepancies = []
-            soup = BeautifulSoup(f, 'html.parser')
-            # I could use some kind of complex single helper function to parse the whole document,
-            # bud I've decided to use a simple and straightforward approach to parse each part of the document separately.
-            document_id = self._get_document_id(soup)
-            title = self._get_title(soup)
-            headers = self._get_headers(soup)
-            body_by_columns, body_by_rows, rows_list = self._get_body(soup)
-            if rows_list:
-                sum_of_first_row = self._get_sum_of_first_row(rows_list[0])
-            footer = self._get_footer(soup)
-            country_of_creation = self._get_country_of_creation(soup)
-            date_of_creation = self._get_date_of_creation(soup)
-
-            for discrepancy in self.file_discrepancies:
-                discrepancy.file_name = file_path.name
-            if self.file_discrepancies:
-                self.all_discrepancies[file_path.name] = self.file_discrepancies
-            return TableDocument(document_id=document_id,
-                                 title=title,
-                                 headers=headers,
-                                 body_by_columns=body_by_columns,
-                                 body_by_rows=body_by_rows,
-                                 rows_list=rows_list,
-                                 sum_of_first_row=sum_of_first_row,
-                                 footer=footer,
-                                 country_of_creation=country_of_creation,
-                                 date_of_creation=date_of_creation)
+            return self._parse_markup(f, file_path.name)
+
+    @METRICS.timed('parse_file_seconds')
+    def _parse_markup(self, markup: str | IO, file_name: str) -> tuple[TableDocument | None, list[Discrepancy]]:
+        """
+        Parses a single file's content, whoever read it (the async pipeline reads the files on its own).
+        """
+        self.file_discrepancies = []
+        with METRICS.timer('parser_stage_seconds', stage='parse_html'):
+            soup = parse_html(markup, self.html_backend)
+        # I could use some kind of complex single helper function to parse the whole document,
+        # bud I've decided to use a simple and straightforward approach to parse each part of the document separately.
+        # The table is walked only once though, and each helper gets the parts it needs from `TableParts`.
+        table = TableParts.from_soup(soup)
+        document_id = self._get_document_id(table)
+        title = self._get_title(table)
+        headers = self._get_headers(table)
+        headers_length = get_headers_length(headers)
+        # `_get_compact_body` fills the missing headers in place, so it gets its own copy
+        body = self._get_compact_body(table, headers=list(headers) if headers else None)
+        body_by_columns, body_by_rows, rows_list = self._body_views(body)
+        sum_of_first_row = None
+        if rows_list:
+            sum_of_first_row = self._get_sum_of_first_row(rows_list[0])
+        stats = self._get_stats(body, headers)
+        footer = self._get_footer(table, report_discrepancies=True)
+        country_of_creation = self._get_country_of_creation(table, footer)
+        date_of_creation = self._get_date_of_creation(table, footer)
+
+        for discrepancy in self.file_discrepancies:
+            discrepancy.file_name = file_name
+        table_document = TableDocument(document_id=document_id,
+                                       title=title,
+                                       headers=headers,
+                                       headers_length=headers_length,
+                                       body_by_columns=body_by_columns,
+                                       body_by_rows=body_by_rows,
+                                       rows_list=rows_list,
+                                       sum_of_first_row=sum_of_first_row,
+                                       footer=footer,
+                                       country_of_creation=country_of_creation,
+                                       date_of_creation=date_of_creation,
+                                       file_name=file_name,
+                                       stats=stats,
+                                       body=body)
+        return table_document, self.file_discrepancies
 
     @staticmethod
     def _get_valid_files(path: Path):
         if not path.exists() or not path.is_dir():
             raise FileNotFoundError(f'Invalid path: {path}')
         # yield a file only if it's a html file
-        for file_path in path.iterdir():
+        # sorted, so the files (and their discrepancies) are always handled in the same order
+        for file_path in sorted(path.iterdir()):
             if file_path.is_file() and file_path.suffix in VALID_FILE_TYPES:
                 yield file_path
 
-    def _get_document_id(self, soup: BeautifulSoup) -> Optional[str]:
-        table_tag = soup.find(TableParseTags.table)
+    @METRICS.timed('parser_stage_seconds', stage='document_id')
+    def _get_document_id(self, table: TableParts | BeautifulSoup) -> Optional[str]:
+        table_tag = TableParts.of(table).table
         if document_id := table_tag and table_tag.get('id'):
             return str(document_id)
         else:
@@ -104,8 +251,9 @@ class Parser:
             self.file_discrepancies.append(discrepancy)
             return None
 
-    def _get_title(self, soup: BeautifulSoup) -> str | None:
-        title_tag = soup.find(TableParseTags.caption)
+    @METRICS.timed('parser_stage_seconds', stage='title')
+    def _get_title(self, table: TableParts | BeautifulSoup) -> str | None:
+        title_tag = TableParts.of(table).caption
         if not title_tag:
             discrepancy = Discrepancy(DiscrepancyType.MISSING_TITLE, description='No title tag found')
             self.file_discrepancies.append(discrepancy)
@@ -119,8 +267,9 @@ class Parser:
             self.file_discrepancies.append(discrepancy)
             return None
 
-    def _get_headers(self, soup: BeautifulSoup) -> List[str] | None:
-        head_tag = soup.find(TableParseTags.table_head)
+    @METRICS.timed('parser_stage_seconds', stage='headers')
+    def _get_headers(self, table: TableParts | BeautifulSoup) -> List[str] | None:
+        head_tag = TableParts.of(table).table_head
         if not head_tag:
             discrepancy = Discrepancy(DiscrepancyType.MISSING_HEADERS, description='No thead tag found')
             self.file_discrepancies.append(discrepancy)
@@ -135,77 +284,104 @@ class Parser:
             self.file_discrepancies.append(discrepancy)
             return None
 
-    def _get_body(self, soup: BeautifulSoup, fill_missing_headers=True) -> tuple[
-        Optional[dict], Optional[dict], Optional[list]]:
+    def _get_body(self, table: TableParts | BeautifulSoup, fill_missing_headers=True,
+                  headers: Optional[List[str]] = None) -> tuple[Optional[dict], Optional[dict], Optional[list]]:
         """
         So I wasn't sure how I'd want to a approach this
         My intuition told me to that we may later want to access the data by columns or by rows
         So I've decided to parse the data in both ways and return them both.
         But the assignment requires the first row to be summed, so I've decided to return the rows as a list as well.
+        `headers` may be passed by the caller that has already parsed them, they will be filled in place.
         """
+        return self._body_views(self._get_compact_body(table, fill_missing_headers, headers))
 
-        headers = self._get_headers(soup) or []
-        tbody_tag = soup.find(TableParseTags.table_body)
+    @METRICS.timed('parser_stage_seconds', stage='body')
+    def _get_compact_body(self, table: TableParts | BeautifulSoup, fill_missing_headers=True,
+                          headers: Optional[List[str]] = None) -> CompactTableBody | None:
+        """
+        The body is parsed once into a `CompactTableBody`, and the three views of `_get_body` are built from it
+        (which is also what the compact storage schema keeps).
+        """
+        table = TableParts.of(table)
+        if headers is None:
+            headers = self._get_headers(table) or []
+        tbody_tag = table.table_body
         if not tbody_tag:
             discrepancy = Discrepancy(DiscrepancyType.MISSING_BODY, description='No tbody tag found')
             self.file_discrepancies.append(discrepancy)
-            return None, None, None
-        raw_rows = tbody_tag.find_all('tr')
-        columns_parsed = defaultdict(dict)
-        rows_parsed = defaultdict(dict)
+            return None
+        # the first cell of a row is its label, the rest are typed (see `parse_cell`)
         rows_list = []
+        for raw_row in tbody_tag.find_all('tr'):
+            row_label, *cells = [cell.text.strip() for cell in raw_row.find_all('td')]
+            rows_list.append([row_label, *[parse_cell(cell) for cell in cells]])
         if fill_missing_headers:
-            self._fill_missing_headers(headers, raw_rows[0])
-        for raw_row in raw_rows:
-            all_cells = raw_row.find_all('td')
-            row_name = all_cells[0].text.strip()
-            rows_list.append([cell.text.strip() for cell in all_cells])
-            data_cells = all_cells[1:] if fill_missing_headers else all_cells[1:len(headers) + 1]
-            for column_index, data_cell in enumerate(data_cells):
-                columns_parsed[headers[column_index]][row_name] = data_cell.text.strip()
-                rows_parsed[row_name][headers[column_index]] = data_cell.text.strip()
-
-        return dict(columns_parsed), dict(rows_parsed), rows_list
+            self._fill_missing_headers(headers, rows_list[0])
+        # without filling the headers, the cells that have no header are left out of the views by columns and by rows
+        return CompactTableBody.from_rows_list(rows_list, headers)
 
+    @staticmethod
+    def _body_views(body: CompactTableBody | None) -> tuple[Optional[dict], Optional[dict], Optional[list]]:
+        if body is None:
+            return None, None, None
+        return body.body_by_columns, body.body_by_rows, body.rows_list
+
+    @METRICS.timed('parser_stage_seconds', stage='sum_of_first_row')
     def _get_sum_of_first_row(self, row):
         """
         The assignment requires a sum of the first row
         If it's REALLY useful, I may want to precalculate it beforehand and store it in the database
         So that's what I did here
+        The cells are already typed, so only a row of whole numbers has a sum.
+        Unlike the `isdigit` check it replaced, a signed number (e.g. '-5' or '+5') is a whole number too,
+        so it's summed rather than reported as an INVALID_SUM.
         """
-        if not all([cell.isdigit() for cell in row[1:]]):
+        row_sum = sum_of_first_row(row)
+        if row_sum is None:
             discrepancy = Discrepancy(DiscrepancyType.INVALID_SUM, raw_data=row,
                                       description="First row doesn't contain only numbers")
             self.file_discrepancies.append(discrepancy)
+        return row_sum
+
+    @staticmethod
+    @METRICS.timed('parser_stage_seconds', stage='stats')
+    def _get_stats(body: CompactTableBody | None, headers: List[str] | None) -> TableStats | None:
+        """
+        The sum of the first row was the only number calculated at ingest, the rest of the numbers about the table
+        (sums, min/max, counts, see `TableStats`) are calculated here too, so new checks won't need to re-parse it.
+        """
+        if body is None:
             return None
-        return sum([int(cell) for cell in row[1:] if cell.isdigit()])
+        return TableStats.from_body(body, headers)
 
-    def _get_footer(self, soup: BeautifulSoup) -> str | None:
-        footer_tag = soup.find(TableParseTags.table_footer)
+    @METRICS.timed('parser_stage_seconds', stage='footer')
+    def _get_footer(self, table: TableParts | BeautifulSoup, report_discrepancies: bool = False) -> str | None:
+        """
+        The footer is also read by other helpers (country, date), but its discrepancies should be reported only once,
+        so only the caller that owns the footer (`parse_file`) asks for them with `report_discrepancies`.
+        """
+        footer_tag = TableParts.of(table).table_footer
         if not footer_tag:
-            if self._is_called_by_parse_file():
+            if report_discrepancies:
                 discrepancy = Discrepancy(DiscrepancyType.MISSING_FOOTER, description='No tfoot tag found')
                 self.file_discrepancies.append(discrepancy)
             return None
         if footer_text := footer_tag.text.strip():
             return footer_text
         else:
-            if self._is_called_by_parse_file():
-                discrepancy = Discrepancy(DiscrepancyType.MISSING_FOOTER, raw_data=footer_tag,
+            if report_discrepancies:
+                discrepancy = Discrepancy(DiscrepancyType.MISSING_FOOTER, raw_data=str(footer_tag),
                                           description='Empty footer tag',
                                           location=footer_tag.sourceline)
                 self.file_discrepancies.append(discrepancy)
             return None
 
-    @staticmethod
-    def _is_called_by_parse_file() -> bool:
-        current_frame = inspect.currentframe()
-        outer_frame = inspect.getouterframes(current_frame, 2)
-        called_by_parse_file = outer_frame[2][3] == 'parse_file'
-        return called_by_parse_file
-
-    def _get_country_of_creation(self, soup: BeautifulSoup) -> str | None:
-        footer_str = self._get_footer(soup)
+    @METRICS.timed('parser_stage_seconds', stage='country_of_creation')
+    def _get_country_of_creation(self, table: TableParts | BeautifulSoup,
+                                 footer_str: Optional[str] = None) -> str | None:
+        table = TableParts.of(table)
+        if footer_str is None:
+            footer_str = self._get_footer(table)
         if not footer_str:
             return None
         date_of_creation_str = self._get_date_str(footer_str)
@@ -217,48 +393,44 @@ class Parser:
             # If we're already digging into it, let's do some validation and refinement
             # Of course, none of this is necessary, we could simply return `footer_str`
             # but I've decided to take some liberty here and do some validation and refinement
-            try:
-                country = pycountry.countries.search_fuzzy(footer_str)
-                return country[0].name if country else footer_str
-            except LookupError:
-                # that's not a discrapency, it's just a warning
-                logger.warning(f'Failed to find country: {footer_str}')
+            if country_name := self.country_resolver.resolve(footer_str):
+                return country_name
+            # that's not a discrapency, it's just a warning
+            logger.warning(f'Failed to find country: {footer_str}')
             return footer_str
         else:
             discrepancy = Discrepancy(discrepancy_type=DiscrepancyType.MISSING_COUNTRY,
                                       raw_data=footer_str,
                                       description="Didn't find country in footer",
-                                      location=footer_tag.sourceline if (
-                                          footer_tag := soup.find(TableParseTags.table_footer)) else None)
-            footer_tag = soup.find(TableParseTags.table_footer)
-            discrepancy.location = footer_tag.sourceline
+                                      location=table.table_footer.sourceline)
             self.file_discrepancies.append(discrepancy)
             return None
 
-    def _get_date_of_creation(self, soup: BeautifulSoup) -> datetime.datetime | None:
-        footer_str = self._get_footer(soup)
+    @METRICS.timed('parser_stage_seconds', stage='date_of_creation')
+    def _get_date_of_creation(self, table: TableParts | BeautifulSoup,
+                              footer_str: Optional[str] = None) -> datetime.datetime | None:
+        table = TableParts.of(table)
+        if footer_str is None:
+            footer_str = self._get_footer(table)
         if not footer_str:
             return None
         # date_str = footer_str.split(' ', 2)[1]  # to simple
         if date_str := self._get_date_str(footer_str):
-            try:
-                res = parse(date_str)
+            if res := parse_footer_date(date_str):
                 logger.debug(f'Date parsed: {date_str} -> {res}')
                 return res
-            except (ValueError, ParserError):
+            else:
                 # Taking some liberty here and decided to log the error and return None for a bad date.
                 logger.warning(f'Failed to parse date from footer: {footer_str}')
                 discrepancy = Discrepancy(DiscrepancyType.INCORRECT_CREATION_DATE, raw_data=footer_str,
                                           description='Failed to parse date from footer')
-                footer_tag = soup.find(TableParseTags.table_footer)
-                discrepancy.location = footer_tag.sourceline
+                discrepancy.location = table.table_footer.sourceline
                 return None
 
         else:
             discrepancy = Discrepancy(DiscrepancyType.MISSING_CREATION_DATE, raw_data=footer_str,
                                       description="Didn't find date in footer")
-            footer_tag = soup.find(TableParseTags.table_footer)
-            discrepancy.location = footer_tag.sourceline
+            discrepancy.location = table.table_footer.sourceline
             self.file_discrepancies.append(discrepancy)
             return None
 
@@ -270,20 +442,113 @@ class Parser:
         Normally I would have consulted with the product owner or the client to see if this is a valid case or an error,
         But since at the time I was working on it, there was no such person, I've decided to take this liberty.
         '''
-        number_of_columns = len(row.find_all('td')) - 1
+        number_of_columns = len(row) - 1
         if len(headers) == number_of_columns:
             return
         for i in range(number_of_columns - len(headers)):
             headers.append(f'empty_header_{i}')
 
     @staticmethod
+    @lru_cache(maxsize=1024)
     def _get_date_str(footer_str: str) -> str | None:
-        re_pattern = r'(\d{1,2}[A-Za-z]{3,9}\d{2,4})'  # 1-2 digits, 3-9 letters, 2-4 digits
-        if match := re.search(re_pattern, footer_str):
+        # both the country and the date are taken from the same footer, so the search result is cached
+        if match := DATE_PATTERN.search(footer_str):
             return match.group(0)
         return None
 
 
+def count_parsed(table_document: TableDocument | None, file_discrepancies: list[Discrepancy]):
+    # counted where the files are collected, so the files parsed in worker processes are counted too
+    METRICS.increment('documents_parsed_total')
+    for discrepancy in file_discrepancies:
+        METRICS.increment('discrepancies_total', type=discrepancy.discrepancy_type.value)
+
+
+def record_cache_metrics(country_resolver: CountryResolver):
+    # all the caches are reported the same way, as their hits and misses so far
+    for cache_name, (hits, misses) in [('parse_footer_date', parse_footer_date.cache_info()[:2]),
+                                       ('footer_date_str', Parser._get_date_str.cache_info()[:2]),
+                                       ('country', (country_resolver.hits, country_resolver.misses))]:
+        METRICS.set('cache_hits', hits, cache=cache_name)
+        METRICS.set('cache_misses', misses, cache=cache_name)
+
+
+_worker_parser: Parser | None = None
+
+
+def _init_worker(html_backend: str, country_cache_path: Path | None = None):
+    # the workers start from the saved countries, but only the main process saves them,
+    # so they never write the cache file at the same time (the countries first resolved in a worker aren't saved)
+    global _worker_parser
+    _worker_parser = Parser(connect_to_db=False, country_cache_path=country_cache_path, html_backend=html_backend)
+
+
+def _parse_file_in_worker(file_path: Path) -> tuple[TableDocument | None, list[Discrepancy]]:
+    # runs in the pool's processes, both the document and the discrepancies are plain picklable objects
+    return _worker_parser._parse_file(file_path)
+
+
+def _parse_markup_in_worker(markup: str, file_name: str) -> tuple[TableDocument | None, list[Discrepancy]]:
+    return _worker_parser._parse_markup(markup, file_name)
+
+
+def _number(value: str) -> int | float:
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f'The value of a stat rule should be a number: {value}') from None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Parses the files into the db, or with --validate, only validates them as they're parsed (see
+    `DocumentValidator.validate_documents`), and prints the findings as json lines, without a db.
+    :return: the exit code, with --validate it's 1 if anything was found, so it can gate an ingest
+    """
+    arg_parser = argparse.ArgumentParser(description='Parses the html tables into the db, or only validates them')
+    arg_parser.add_argument('path', nargs='?', default='../documents/')
+    arg_parser.add_argument('--workers', type=int, default=1)
+    arg_parser.add_argument('--batch-size', type=int, default=None)
+    arg_parser.add_argument('--incremental', action='store_true')
+    arg_parser.add_argument('--manifest-path')
+    arg_parser.add_argument('--html-backend', choices=HTML_BACKENDS, default=DEFAULT_HTML_BACKEND)
+    arg_parser.add_argument('--country-cache-path')
+    arg_parser.add_argument('--validate', action='store_true',
+                            help='validate the parsed documents instead of writing them to the db')
+    arg_parser.add_argument('--max-headers-length', type=int)
+    arg_parser.add_argument('--late-date')
+    arg_parser.add_argument('--high-sum', type=int)
+    arg_parser.add_argument('--stat', nargs=3, action='append', default=[], metavar=('STAT', 'OPERATOR', 'VALUE'),
+                            help="a rule over the tables' stats, e.g. --stat max_value '$gt' 1000")
+    args = arg_parser.parse_args(argv)
+
+    if not args.validate:
+        parser = Parser(country_cache_path=args.country_cache_path, html_backend=args.html_backend)
+        parser.parse(args.path, args.workers, args.batch_size, args.incremental, args.manifest_path)
+        return 0
+
+    parser = Parser(connect_to_db=False, country_cache_path=args.country_cache_path, html_backend=args.html_backend)
+    # a bad rule (e.g. an unknown stat, or a value that isn't a number) is a usage error rather than a traceback
+    try:
+        document_validator = DocumentValidator(args.max_headers_length, args.late_date, args.high_sum,
+                                               [(stat, operator_name, _number(value))
+                                                for stat, operator_name, value in args.stat],
+                                               connect_to_db=False)
+        document_validator.get_rules()
+    except ValueError as e:
+        arg_parser.error(str(e))
+    findings = 0
+    for status, details in document_validator.validate_documents(parser.iter_parse(args.path, args.workers)):
+        print(json.dumps({'status': status.value, **details}, default=str), flush=True)
+        findings += 1
+    parser.country_resolver.save()
+    logger.info(f'Validated {args.path}: {findings} findings')
+    return 1 if findings else 0
+
+
 if __name__ == '__main__':
-    parser = Parser()
-    parser.main()
+    sys.exit(main())
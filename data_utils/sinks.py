@@ -0,0 +1,86 @@
+import json
+from pathlib import Path
+
+from data_classes.discrepancy import Discrepancy
+from data_classes.table_document import TableDocument
+from db_utils.discrepancy_db_connector import DiscrepancyDBConnector
+from db_utils.mongo_db_tables_connector import MongoDBTablesConnector
+
+
+class DocumentSink:
+    """
+    Where the parsed documents go, one file at a time.
+    A sink shouldn't keep more than it has to, so streaming a huge directory into it won't grow the memory.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def write(self, table_document: TableDocument | None, discrepancies: list[Discrepancy]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InMemorySink(DocumentSink):
+    """
+    Keeps everything, so it's meant for tests and small directories.
+    """
+
+    def __init__(self):
+        self.table_documents: list[TableDocument] = []
+        self.discrepancies: list[Discrepancy] = []
+
+    def write(self, table_document: TableDocument | None, discrepancies: list[Discrepancy]):
+        if table_document:
+            self.table_documents.append(table_document)
+        self.discrepancies.extend(discrepancies)
+
+
+class JsonlSink(DocumentSink):
+    """
+    Writes a line per file: {"document": ..., "discrepancies": [...]}
+    """
+
+    def __init__(self, path: str | Path):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, table_document: TableDocument | None, discrepancies: list[Discrepancy]):
+        line = {'document': table_document.model_dump(mode='json') if table_document else None,
+                'discrepancies': [discrepancy.dict() for discrepancy in discrepancies]}
+        self.file.write(json.dumps(line, default=str) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class MongoSink(DocumentSink):
+    """
+    Upserts the documents and the discrepancies in bulk writes, see `BatchWriter`.
+    """
+
+    def __init__(self, tables_connector: MongoDBTablesConnector, discrepancies_connector: DiscrepancyDBConnector,
+                 batch_size: int | None = None):
+        self.tables_writer = tables_connector.batch_writer(batch_size)
+        self.discrepancies_writer = discrepancies_connector.batch_writer(batch_size)
+
+    def write(self, table_document: TableDocument | None, discrepancies: list[Discrepancy]):
+        if table_document:
+            self.tables_writer.upsert(table_document)
+        for discrepancy in discrepancies:
+            self.discrepancies_writer.upsert(discrepancy)
+
+    def replace_file_discrepancies(self, file_name: str):
+        self.discrepancies_writer.replace_file_discrepancies(file_name)
+
+    @property
+    def write_errors(self) -> list[dict]:
+        return self.tables_writer.write_errors + self.discrepancies_writer.write_errors
+
+    def close(self):
+        self.tables_writer.close()
+        self.discrepancies_writer.close()
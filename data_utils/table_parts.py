@@ -0,0 +1,47 @@
+from dataclasses import dataclass
+
+from bs4 import BeautifulSoup, Tag
+
+from data_utils.html_backends import LxmlTag
+from data_utils.parsing_config import TableParseTags
+
+TABLE_PART_TAGS = [TableParseTags.table, TableParseTags.caption, TableParseTags.table_head,
+                   TableParseTags.table_body, TableParseTags.table_footer]
+
+
+@dataclass
+class TableParts:
+    """
+    The parts of a single html table, collected in a single walk over the parsed tree.
+    Every `soup.find(...)` call walks the whole tree again, and the parser used to do it a few times per part,
+    so now the tree is visited once and all the `_get_*` helpers are fed from here.
+    Each part holds the first matching tag in the document (same as `soup.find` would), or None if it's missing.
+    The tags come from whichever html backend parsed the document, see `html_backends`.
+    """
+    table: Tag | LxmlTag | None = None
+    caption: Tag | LxmlTag | None = None
+    table_head: Tag | LxmlTag | None = None
+    table_body: Tag | LxmlTag | None = None
+    table_footer: Tag | LxmlTag | None = None
+
+    @classmethod
+    def from_soup(cls, soup: BeautifulSoup | LxmlTag) -> 'TableParts':
+        parts = cls()
+        # only the first tag of every part is kept, a part that's still None wasn't found yet
+        for tag in soup.find_all(TABLE_PART_TAGS):
+            if tag.name == TableParseTags.table and parts.table is None:
+                parts.table = tag
+            elif tag.name == TableParseTags.caption and parts.caption is None:
+                parts.caption = tag
+            elif tag.name == TableParseTags.table_head and parts.table_head is None:
+                parts.table_head = tag
+            elif tag.name == TableParseTags.table_body and parts.table_body is None:
+                parts.table_body = tag
+            elif tag.name == TableParseTags.table_footer and parts.table_footer is None:
+                parts.table_footer = tag
+        return parts
+
+    @classmethod
+    def of(cls, table: 'TableParts | BeautifulSoup | LxmlTag') -> 'TableParts':
+        # the helpers are also used directly with a soup (mostly in tests), so accept both
+        return table if isinstance(table, TableParts) else cls.from_soup(table)
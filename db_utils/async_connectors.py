@@ -0,0 +1,156 @@
+import inspect
+
+from loguru import logger
+from pymongo.errors import BulkWriteError
+
+from data_classes.discrepancy import Discrepancy
+from data_classes.table_document import TableDocument
+from db_utils.batch_writer import BaseBatchWriter
+from db_utils.client_registry import load_client_options
+from db_utils.config_loader import load_env_flag, load_local_env_config
+from db_utils.discrepancy_db_connector import DiscrepancyDBConnector
+from db_utils.mongo_db_tables_connector import MongoDBTablesConnector
+from monitoring.metrics import METRICS
+
+try:
+    # pymongo has its own async client since 4.10, motor is the async driver for the older versions
+    from pymongo import AsyncMongoClient
+except ImportError:
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient as AsyncMongoClient
+    except ImportError:  # the async connectors are optional, only the async pipeline needs them
+        AsyncMongoClient = None
+
+
+class AsyncBaseMongoDBConnector:
+    """
+    The async counterpart of `BaseMongoDBConnector`, for the async ingest pipeline.
+    Unlike the sync connectors, these aren't singletons, and their clients aren't shared (see `client_registry`),
+    since an async client belongs to the event loop it was first used in. They use the same client options though.
+    """
+    INDEXES = []
+
+    def __init__(self, host=None, port=None, db_name=None, collection_name=None, username=None, password=None):
+        if AsyncMongoClient is None:
+            raise ImportError('The async connectors require pymongo>=4.10 or motor to be installed')
+        self.client = AsyncMongoClient(host, port, username=username, password=password, **load_client_options())
+        self.db = self.client[db_name]
+        self.collection = self.db[collection_name]
+        self.indexes_ensured = False
+
+    async def find_one(self, query: dict, projection: dict | list[str] | None = None):
+        return await self.collection.find_one(query, projection)
+
+    async def delete_many(self, query: dict) -> int:
+        return (await self.collection.delete_many(query)).deleted_count
+
+    async def ensure_indexes(self, force: bool = False):
+        if not self.INDEXES or (self.indexes_ensured and not force):
+            return
+        created_indexes = await self.collection.create_indexes(self.INDEXES)
+        logger.debug(f'Indexes of {self.collection.name}: {created_indexes}')
+        self.indexes_ensured = True
+
+    async def close(self):
+        # pymongo's async client is closed asynchronously, motor's isn't
+        if inspect.isawaitable(closed := self.client.close()):
+            await closed
+
+
+class AsyncMongoDBTablesConnector(AsyncBaseMongoDBConnector):
+    INDEXES = MongoDBTablesConnector.INDEXES
+
+    def __init__(self, host=None, port=None, db_name=None, collection_name=None, username=None, password=None):
+        super().__init__(host, port, db_name, collection_name, username, password)
+        self.compact_storage = load_env_flag('COMPACT_TABLE_STORAGE')
+
+    @staticmethod
+    def get_local_connector():
+        local_env_conf = load_local_env_config()
+        return AsyncMongoDBTablesConnector(host=local_env_conf['HOST'],
+                                           port=int(local_env_conf['PORT']),
+                                           db_name=local_env_conf['TABLES_DB_NAME'],
+                                           collection_name=local_env_conf['TABLES_COLLECTION_NAME'])
+
+    async def upsert(self, table_document: TableDocument):
+        await self.collection.replace_one({'document_id': table_document.document_id},
+                                          table_document.to_mongo(self.compact_storage), upsert=True)
+
+    def batch_writer(self, batch_size: int | None = None,
+                     max_batch_bytes: int | None = None) -> 'AsyncTablesBatchWriter':
+        return AsyncTablesBatchWriter(self.collection, batch_size, max_batch_bytes, compact=self.compact_storage)
+
+
+class AsyncDiscrepancyDBConnector(AsyncBaseMongoDBConnector):
+    INDEXES = DiscrepancyDBConnector.INDEXES
+
+    @staticmethod
+    def get_local_connector():
+        local_env_conf = load_local_env_config()
+        return AsyncDiscrepancyDBConnector(host=local_env_conf['HOST'],
+                                           port=int(local_env_conf['PORT']),
+                                           db_name=local_env_conf['TABLES_DB_NAME'],
+                                           collection_name=local_env_conf['DISCREPANCIES_COLLECTION_NAME'])
+
+    async def upsert(self, discrepancy: Discrepancy):
+        discrepancy_dict = discrepancy.dict()
+        await self.collection.replace_one(DiscrepancyDBConnector._identity_query(discrepancy_dict), discrepancy_dict,
+                                          upsert=True)
+
+    def batch_writer(self, batch_size: int | None = None,
+                     max_batch_bytes: int | None = None) -> 'AsyncDiscrepanciesBatchWriter':
+        return AsyncDiscrepanciesBatchWriter(self.collection, batch_size, max_batch_bytes)
+
+
+class AsyncBatchWriter(BaseBatchWriter):
+    """
+    `BatchWriter` with async writes: the batches are buffered and counted the same way,
+    but a full batch is awaited, so whatever else runs in the event loop (e.g. reading the next files) goes on.
+    It's used with `async with` only, a sync `with` couldn't await the last batch.
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def add(self, operation, size: int = 0):
+        if self._overflows(size):
+            await self.flush()
+        if self._append(operation, size):
+            await self.flush()
+
+    async def replace(self, query: dict, document: dict):
+        await self.add(*self._replace_operation(query, document))
+
+    async def flush(self):
+        if not self.operations:
+            return
+        operations, batch_number = self._take_batch()
+        with METRICS.timer('db_operation_seconds', operation='bulk_write', collection=self.collection.name):
+            try:
+                result = await self.collection.bulk_write(operations, ordered=False)
+                details = result.bulk_api_result
+            except BulkWriteError as e:
+                details = e.details
+        self._record_batch(operations, batch_number, details)
+
+    async def close(self):
+        await self.flush()
+
+
+class AsyncTablesBatchWriter(AsyncBatchWriter):
+    def __init__(self, collection, batch_size: int | None = None, max_batch_bytes: int | None = None,
+                 compact: bool = False):
+        super().__init__(collection, batch_size, max_batch_bytes)
+        self.compact = compact
+
+    async def upsert(self, table_document: TableDocument):
+        await self.replace({'document_id': table_document.document_id}, table_document.to_mongo(self.compact))
+
+
+class AsyncDiscrepanciesBatchWriter(AsyncBatchWriter):
+    async def upsert(self, discrepancy: Discrepancy):
+        discrepancy_dict = discrepancy.dict()
+        await self.replace(DiscrepancyDBConnector._identity_query(discrepancy_dict), discrepancy_dict)
@@ -1,8 +1,31 @@
+from functools import wraps
+
 import pymongo
 from loguru import logger
+from pymongo import IndexModel
 
+from db_utils.client_registry import get_client, release_client
 from db_utils.default_db_config import DEFAULT_DB_CONFIG_REMOTE
+from monitoring.metrics import METRICS
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def timed_operation(method):
+    """
+    Times the connector's operation by its name and collection, when the metrics are enabled (see `Metrics`).
+    A finder that returns a cursor is timed only until the cursor is returned, the documents are fetched
+    only as it's iterated, so the time that takes isn't in it.
+    """
+
+    @wraps(method)
+    def timed_method(self, *args, **kwargs):
+        if not METRICS.enabled:
+            return method(self, *args, **kwargs)
+        with METRICS.timer('db_operation_seconds', operation=method.__name__, collection=self.collection.name):
+            return method(self, *args, **kwargs)
 
+    return timed_method
 
 
 class BaseMongoDBConnector:
@@ -14,6 +37,8 @@ class BaseMongoDBConnector:
     It is a singleton class, meaning that it will only create one instance of the class and share it across all instances of the class.
     """
     _shared_state = {}
+    # the indexes the collection should have, each connector declares its own
+    INDEXES: list[IndexModel] = []
 
     def __init__(self, host=None, port=None, db_name=None, collection_name=None, username=None, password=None):
         """
@@ -33,24 +58,85 @@ class BaseMongoDBConnector:
                 db_name = DEFAULT_DB_CONFIG_REMOTE['db_name']
                 collection_name = DEFAULT_DB_CONFIG_REMOTE['collection_name']
 
-            self.client = pymongo.MongoClient(host, port, username=username, password=password)
+            # the client (and its connection pool) is shared with the other connectors to the same server
+            self.client = get_client(host, port, username=username, password=password)
             self.db = self.client[db_name]
             self.collection = self.db[collection_name]
 
-    def find(self, query: dict):
-        return self.collection.find(query)
+    @timed_operation
+    def find(self, query: dict, projection: dict | list[str] | None = None):
+        """
+        :param projection: the fields to return (as pymongo takes them), all of them if None
+        """
+        return self.collection.find(query, projection)
+
+    @timed_operation
+    def find_one(self, query: dict, projection: dict | list[str] | None = None):
+        return self.collection.find_one(query, projection)
 
-    def find_one(self, query: dict):
-        return self.collection.find_one(query)
+    @timed_operation
+    def find_page(self, query: dict, projection: dict | list[str] | None = None, after_id=None,
+                  limit: int = DEFAULT_PAGE_SIZE) -> list[dict]:
+        """
+        A page of the documents matching the query, in `_id` order, starting after the given `_id`.
+        Paging by the last seen `_id` (rather than skip) costs the same for the last page as for the first one,
+        and a page can be resumed from, even by another process.
+        """
+        if after_id is not None:
+            query = {'$and': [query, {'_id': {'$gt': after_id}}]}
+        return list(self.collection.find(query, projection).sort('_id', pymongo.ASCENDING).limit(limit))
 
+    @timed_operation
     def update(self, query: dict, update: dict):
         self.collection.update_one(query, update)
 
+    @timed_operation
     def delete(self, query: dict):
         self.collection.delete_one(query)
 
+    @timed_operation
+    def delete_many(self, query: dict) -> int:
+        return self.collection.delete_many(query).deleted_count
+
+    def ensure_indexes(self, force: bool = False):
+        """
+        Creates the declared indexes, creating an existing index is a no-op, so it's safe to call anytime.
+        It's done once per connector (they're singletons), unless forced.
+        """
+        if not self.INDEXES or (self.__dict__.get('indexes_ensured') and not force):
+            return
+        created_indexes = self.collection.create_indexes(self.INDEXES)
+        logger.debug(f'Indexes of {self.collection.name}: {created_indexes}')
+        self.indexes_ensured = True
+
+    def is_collection_scan(self, query: dict) -> bool:
+        """
+        Explains the query, and warns if its winning plan scans the whole collection, i.e. an index is missing.
+        """
+        plan = self.collection.find(query).explain()
+        collection_scan = 'COLLSCAN' in self._plan_stages(plan.get('queryPlanner', {}).get('winningPlan', {}))
+        if collection_scan:
+            logger.warning(f'Query {query} on {self.collection.name} scans the whole collection')
+        return collection_scan
+
+    @classmethod
+    def _plan_stages(cls, plan: dict) -> list[str]:
+        stages = [plan['stage']] if 'stage' in plan else []
+        for child_key in ['inputStage', 'queryPlan']:
+            if child_key in plan:
+                stages += cls._plan_stages(plan[child_key])
+        for child_plan in plan.get('inputStages', []):
+            stages += cls._plan_stages(child_plan)
+        return stages
+
     def drop_collection(self):
         self.db.drop_collection(self.collection.name)
+        self.indexes_ensured = False
 
     def close(self):
-        self.client.close()
+        # the client is closed only when none of the connectors use it anymore,
+        # and the singleton's state is cleared, so the next connector gets a client of its own again
+        # rather than the one that may have been closed
+        if 'client' in self.__dict__:
+            release_client(self.client)
+        self.__dict__.clear()
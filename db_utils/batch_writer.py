@@ -0,0 +1,115 @@
+from typing import Any
+
+import bson
+from loguru import logger
+from pymongo import ReplaceOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+
+from db_utils.config_loader import load_local_env_config
+from monitoring.metrics import METRICS
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_MAX_BATCH_BYTES = 8 * 1024 * 1024  # well below the 48MB message limit, so the driver won't split a batch
+
+
+class BaseBatchWriter:
+    """
+    The batching and the bookkeeping of the sync and the async batch writers, which only differ in how they write
+    (see `BatchWriter` and `AsyncBatchWriter`), so each of them has its own (sync or async) context manager.
+    """
+
+    def __init__(self, collection: Collection, batch_size: int | None = None, max_batch_bytes: int | None = None):
+        if batch_size is None or max_batch_bytes is None:
+            local_env_conf = load_local_env_config()
+            batch_size = batch_size or int(local_env_conf.get('BULK_WRITE_BATCH_SIZE', DEFAULT_BATCH_SIZE))
+            max_batch_bytes = max_batch_bytes or int(
+                local_env_conf.get('BULK_WRITE_MAX_BATCH_BYTES', DEFAULT_MAX_BATCH_BYTES))
+        self.collection = collection
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+
+        self.operations = []
+        self.batch_bytes = 0
+        self.batches_written = 0
+        self.inserted_count = 0
+        self.upserted_count = 0
+        self.matched_count = 0
+        self.modified_count = 0
+        self.write_errors: list[dict[str, Any]] = []
+
+    def _overflows(self, size: int) -> bool:
+        # the batch is flushed before an operation that would make it too big, unless it's the only one
+        return bool(self.operations) and self.batch_bytes + size > self.max_batch_bytes
+
+    def _append(self, operation, size: int) -> bool:
+        """
+        :return: whether the batch is full, so it should be flushed
+        """
+        self.operations.append(operation)
+        self.batch_bytes += size
+        return len(self.operations) >= self.batch_size
+
+    @staticmethod
+    def _replace_operation(query: dict, document: dict) -> tuple[ReplaceOne, int]:
+        return ReplaceOne(query, document, upsert=True), len(bson.encode(document))
+
+    def _take_batch(self) -> tuple[list, int]:
+        operations, self.operations, self.batch_bytes = self.operations, [], 0
+        batch_number = self.batches_written
+        self.batches_written += 1
+        return operations, batch_number
+
+    def _record_batch(self, operations: list, batch_number: int, details: dict):
+        if write_errors := details.get('writeErrors', []):
+            for error in write_errors:
+                self.write_errors.append({'batch': batch_number, **error})
+            logger.error(f'Batch {batch_number} of {self.collection.name}: '
+                         f'{len(write_errors)} of {len(operations)} writes failed')
+        self.inserted_count += details.get('nInserted', 0)
+        self.upserted_count += details.get('nUpserted', 0)
+        self.matched_count += details.get('nMatched', 0)
+        self.modified_count += details.get('nModified', 0)
+        METRICS.increment('db_operations_written_total', len(operations), collection=self.collection.name)
+        METRICS.increment('db_write_errors_total', len(write_errors), collection=self.collection.name)
+        logger.debug(f'Batch {batch_number} of {self.collection.name}: {len(operations)} operations written')
+
+
+class BatchWriter(BaseBatchWriter):
+    """
+    Buffers write operations and sends them to the collection as unordered `bulk_write` batches.
+    A batch is flushed when it reaches `batch_size` operations or `max_batch_bytes` of encoded documents,
+    and whatever is left is flushed when the writer is closed (or leaves its `with` block).
+    A failing write doesn't stop the rest of its batch (or the next batches), the errors are logged and kept
+    in `write_errors` so the caller can decide what to do with them.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def add(self, operation, size: int = 0):
+        if self._overflows(size):
+            self.flush()
+        if self._append(operation, size):
+            self.flush()
+
+    def replace(self, query: dict, document: dict):
+        self.add(*self._replace_operation(query, document))
+
+    def flush(self):
+        if not self.operations:
+            return
+        operations, batch_number = self._take_batch()
+        with METRICS.timer('db_operation_seconds', operation='bulk_write', collection=self.collection.name):
+            try:
+                result = self.collection.bulk_write(operations, ordered=False)
+                details = result.bulk_api_result
+            except BulkWriteError as e:
+                details = e.details
+        self._record_batch(operations, batch_number, details)
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,112 @@
+import os
+import threading
+
+import pymongo
+from loguru import logger
+
+from db_utils.config_loader import load_local_env_config
+from db_utils.memory_storage import InMemoryClient
+
+
+def _write_concern(value: str) -> int | str:
+    # a number of nodes, or a tag like 'majority'
+    return int(value) if value.isdigit() else value
+
+
+# the client options that can be set in the env, as (option name, how it's read)
+CLIENT_OPTIONS_FROM_ENV = {
+    'MONGO_MAX_POOL_SIZE': ('maxPoolSize', int),
+    'MONGO_MIN_POOL_SIZE': ('minPoolSize', int),
+    'MONGO_MAX_IDLE_TIME_MS': ('maxIdleTimeMS', int),
+    'MONGO_CONNECT_TIMEOUT_MS': ('connectTimeoutMS', int),
+    'MONGO_SOCKET_TIMEOUT_MS': ('socketTimeoutMS', int),
+    'MONGO_SERVER_SELECTION_TIMEOUT_MS': ('serverSelectionTimeoutMS', int),
+    'MONGO_WAIT_QUEUE_TIMEOUT_MS': ('waitQueueTimeoutMS', int),
+    'MONGO_COMPRESSORS': ('compressors', str),
+    'MONGO_WRITE_CONCERN': ('w', _write_concern),
+}
+
+# 'memory' keeps the collections in this process rather than in a server, see `memory_storage`
+STORAGE_BACKENDS = ('mongo', 'memory')
+DEFAULT_STORAGE_BACKEND = 'mongo'
+
+_clients: dict[tuple, pymongo.MongoClient | InMemoryClient] = {}
+_client_users: dict[int, int] = {}
+_lock = threading.Lock()
+
+
+def load_client_options() -> dict:
+    local_env_conf = load_local_env_config()
+    options = {}
+    for env_name, (option_name, read) in CLIENT_OPTIONS_FROM_ENV.items():
+        if value := local_env_conf.get(env_name):
+            options[option_name] = read(value)
+    return options
+
+
+def load_storage_backend() -> str:
+    storage_backend = load_local_env_config().get('STORAGE_BACKEND') or DEFAULT_STORAGE_BACKEND
+    if storage_backend not in STORAGE_BACKENDS:
+        raise ValueError(f'Unknown storage backend: {storage_backend}, expected one of {STORAGE_BACKENDS}')
+    return storage_backend
+
+
+def get_client(host=None, port=None, username=None, password=None,
+               **options) -> pymongo.MongoClient | InMemoryClient:
+    """
+    Every connector used to open its own client, i.e. its own connection pool, even when they all connected to
+    the same server. Now the clients are shared: connecting with the same host/uri, credentials and options
+    returns the client that's already open.
+    The options (pool size, timeouts, compression, write concern) are read from the env, see
+    `CLIENT_OPTIONS_FROM_ENV`, and the given options override them.
+    Every `get_client` should be matched by a `release_client`, the client is closed when nothing uses it.
+    With STORAGE_BACKEND=memory, it's an `InMemoryClient` (which has no options), shared and released the same way.
+    """
+    storage_backend = load_storage_backend()
+    options = {**load_client_options(), **options} if storage_backend == 'mongo' else {}
+    key = (storage_backend, host, port, username, password, tuple(sorted(options.items())))
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            logger.debug(f'Opening a {storage_backend} client to {host}:{port} with {options}')
+            if storage_backend == 'memory':
+                client = InMemoryClient(host, port)
+            else:
+                client = pymongo.MongoClient(host, port, username=username, password=password, **options)
+            _clients[key] = client
+        _client_users[id(client)] = _client_users.get(id(client), 0) + 1
+        return client
+
+
+def release_client(client: pymongo.MongoClient | InMemoryClient):
+    with _lock:
+        users = _client_users.get(id(client), 0) - 1
+        if users > 0:
+            _client_users[id(client)] = users
+            return
+        _client_users.pop(id(client), None)
+        for key, registered_client in list(_clients.items()):
+            if registered_client is client:
+                del _clients[key]
+    client.close()
+
+
+def close_all_clients():
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _client_users.clear()
+    for client in clients:
+        client.close()
+
+
+def _forget_clients():
+    # a client can't be used across a fork, a child process opens its own ones
+    global _lock
+    _lock = threading.Lock()
+    _clients.clear()
+    _client_users.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_clients)
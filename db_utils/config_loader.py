@@ -11,3 +11,13 @@ def load_local_env_config():
         **os.environ
     }
     return local_env_conf
+
+
+def load_env_flag(name: str, default: bool = False) -> bool:
+    """
+    A yes/no setting of the env, 'true', '1' and 'yes' (in any case) are yes, anything else is no.
+    """
+    value = load_local_env_config().get(name)
+    if not value:
+        return default
+    return value.lower() in ('true', '1', 'yes')
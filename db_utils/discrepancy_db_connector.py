@@ -1,20 +1,31 @@
 from typing import List, Any
 
 import pymongo
+from pymongo import IndexModel
 
 from data_classes.discrepancy import Discrepancy
-from db_utils.base_mongo_db_connector import BaseMongoDBConnector
+from db_utils.base_mongo_db_connector import BaseMongoDBConnector, timed_operation
+from db_utils.batch_writer import BatchWriter
+from db_utils.client_registry import get_client
 from db_utils.config_loader import load_local_env_config
 
+# a file may have several discrepancies, so a discrepancy is identified by its file, type and location
+DISCREPANCY_IDENTITY_FIELDS = ('file_name', 'discrepancy_type', 'location')
+
 
 class DiscrepancyDBConnector(BaseMongoDBConnector):
     _shared_state: dict[Any, Any] = {}
+    INDEXES = [
+        IndexModel([(field, pymongo.ASCENDING) for field in DISCREPANCY_IDENTITY_FIELDS], name='discrepancy_identity'),
+        # the validator fetches the saved discrepancies by their category, i.e. by type
+        IndexModel([('discrepancy_type', pymongo.ASCENDING)], name='discrepancy_type'),
+    ]
 
     def __init__(self, host=None, port=None, db_name=None,
                  collection_name=None, username=None, password=None):
         self.__dict__ = self._shared_state
         if not self._shared_state:
-            self.client = pymongo.MongoClient(host, port, username=username, password=password)
+            self.client = get_client(host, port, username=username, password=password)
             self.db = self.client[db_name]
             self.collection = self.db[collection_name]
 
@@ -26,16 +37,59 @@ class DiscrepancyDBConnector(BaseMongoDBConnector):
                                       db_name=local_env_conf['TABLES_DB_NAME'],
                                       collection_name=local_env_conf['DISCREPANCIES_COLLECTION_NAME'])
 
+    @timed_operation
     def insert(self, discrepancy: Discrepancy):
         self.collection.insert_one(discrepancy.dict())
 
+    @timed_operation
     def insert_many(self, discrepancies: List[Discrepancy]):
         self.collection.insert_many([discrepancy.dict() for discrepancy in discrepancies])
 
+    @timed_operation
+    def upsert(self, discrepancy: Discrepancy):
+        discrepancy_dict = discrepancy.dict()
+        self.collection.replace_one(self._identity_query(discrepancy_dict), discrepancy_dict, upsert=True)
+
+    @timed_operation
+    def upsert_many(self, discrepancies: List[Discrepancy], batch_size: int | None = None) -> dict[str, int]:
+        """
+        Upserts all the given discrepancies (a file's or a whole run's) in as few bulk writes as the batch size allows.
+        :return: the number of newly inserted discrepancies and of the ones that already existed
+        """
+        with self.batch_writer(batch_size) as writer:
+            for discrepancy in discrepancies:
+                writer.upsert(discrepancy)
+        return {'inserted': writer.upserted_count, 'matched': writer.matched_count}
+
+    def batch_writer(self, batch_size: int | None = None,
+                     max_batch_bytes: int | None = None) -> 'DiscrepanciesBatchWriter':
+        return DiscrepanciesBatchWriter(self.collection, batch_size, max_batch_bytes)
+
+    @staticmethod
+    def _identity_query(discrepancy_dict: dict) -> dict:
+        return {field: discrepancy_dict[field] for field in DISCREPANCY_IDENTITY_FIELDS}
+
+
+class DiscrepanciesBatchWriter(BatchWriter):
+    def __init__(self, collection, batch_size: int | None = None, max_batch_bytes: int | None = None):
+        super().__init__(collection, batch_size, max_batch_bytes)
+        self.replaced_file_names = []
+
     def upsert(self, discrepancy: Discrepancy):
-        self.collection.replace_one({'file_name': discrepancy.file_name},
-                                    discrepancy.dict(), upsert=True)
+        discrepancy_dict = discrepancy.dict()
+        self.replace(DiscrepancyDBConnector._identity_query(discrepancy_dict), discrepancy_dict)
+
+    def replace_file_discrepancies(self, file_name: str):
+        """
+        The saved discrepancies of the file are deleted before the next batch is written,
+        so only the ones upserted from now on are left (the file may not have any discrepancies anymore).
+        """
+        self.replaced_file_names.append(file_name)
+        if len(self.replaced_file_names) >= self.batch_size:
+            self.flush()
 
-    def upsert_many(self, discrepancies: List[Discrepancy]):
-        for discrepancy in discrepancies:
-            self.upsert(discrepancy)
+    def flush(self):
+        if self.replaced_file_names:
+            replaced_file_names, self.replaced_file_names = self.replaced_file_names, []
+            self.collection.delete_many({'file_name': {'$in': replaced_file_names}})
+        super().flush()
@@ -0,0 +1,730 @@
+"""
+An in-process stand-in for the mongo client, selected with STORAGE_BACKEND=memory (see `client_registry`),
+so the parse -> validate pipeline (and its tests and benchmarks) can run without a database.
+It has the subset of pymongo's api the connectors, the batch writers and the migrations use:
+the query operators, projections, sort/skip/limit, the updates and bulk writes (with upserts),
+and the indexes, which are optional, as they are in mongo.
+"""
+import datetime
+import operator
+import threading
+from typing import Any, Iterable, Iterator
+
+from bson import ObjectId
+from pymongo import ASCENDING, DeleteMany, DeleteOne, IndexModel, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+# the comparisons of the queries and of the aggregation expressions
+COMPARISON_OPERATORS = {'$gt': operator.gt, '$gte': operator.ge, '$lt': operator.lt, '$lte': operator.le}
+
+# the $type aliases that are supported, by the python types they stand for
+TYPE_ALIASES = {'string': (str,), 'int': (int,), 'long': (int,), 'double': (float,), 'number': (int, float),
+                'bool': (bool,), 'date': (datetime.datetime,), 'null': (type(None),), 'object': (dict,),
+                'array': (list,), 'objectId': (ObjectId,)}
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+# the servers' databases by their (host, port), so the data outlives the clients, as it would on a server
+_servers: dict[tuple, dict[str, 'InMemoryDatabase']] = {}
+_servers_lock = threading.Lock()
+
+
+def clear_memory_storage():
+    """
+    Drops everything that was stored in memory, by all the clients.
+    """
+    with _servers_lock:
+        _servers.clear()
+
+
+def _type_order(value) -> int:
+    # mongo compares values of different types by the order of their types (and never by their values)
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 1
+    if isinstance(value, str):
+        return 2
+    if isinstance(value, dict):
+        return 3
+    if isinstance(value, list):
+        return 4
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime.datetime):
+        return 9
+    return 10
+
+
+def _sort_key(value) -> tuple:
+    if isinstance(value, dict):
+        return 3, tuple((key, _sort_key(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return 4, tuple(_sort_key(item) for item in value)
+    return _type_order(value), 0 if value is None else value
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return tuple((key, _hashable(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    return _type_order(value), value
+
+
+def _copy(value):
+    # the documents are only ever dicts, lists and scalars, so this is much cheaper than deepcopy
+    # (and tuples are stored as lists, as bson stores them)
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _values_at(document, path: list[str]) -> list:
+    """
+    The values at a dotted path, there may be several of them if it goes through a list of documents,
+    and none if it's missing.
+    """
+    if not path:
+        return [document]
+    key, rest = path[0], path[1:]
+    if isinstance(document, dict):
+        return _values_at(document[key], rest) if key in document else []
+    if isinstance(document, list):
+        values = []
+        if key.isdigit() and int(key) < len(document):
+            values += _values_at(document[int(key)], rest)
+        for item in document:
+            if isinstance(item, dict):
+                values += _values_at(item, path)
+        return values
+    return []
+
+
+def _candidates(values: list) -> Iterator:
+    # a list matches a condition if it matches as a whole, or if any of its items does
+    for value in values:
+        yield value
+        if isinstance(value, list):
+            yield from value
+
+
+def _equal(value, other) -> bool:
+    return _type_order(value) == _type_order(other) and value == other
+
+
+def _match_operator(values: list, operator_name: str, argument) -> bool:
+    if operator_name == '$eq':
+        if argument is None:
+            return not values or any(candidate is None for candidate in _candidates(values))
+        return any(_equal(candidate, argument) for candidate in _candidates(values))
+    if operator_name == '$ne':
+        return not _match_operator(values, '$eq', argument)
+    if operator_name in COMPARISON_OPERATORS:
+        compare = COMPARISON_OPERATORS[operator_name]
+        return any(_type_order(candidate) == _type_order(argument) and compare(candidate, argument)
+                   for candidate in _candidates(values) if candidate is not None)
+    if operator_name == '$in':
+        return any(_match_operator(values, '$eq', item) for item in argument)
+    if operator_name == '$nin':
+        return not _match_operator(values, '$in', argument)
+    if operator_name == '$exists':
+        return bool(values) == bool(argument)
+    if operator_name == '$type':
+        aliases = argument if isinstance(argument, list) else [argument]
+        if unknown_aliases := [alias for alias in aliases if alias not in TYPE_ALIASES]:
+            raise OperationFailure(f'Unsupported $type: {unknown_aliases}')
+        return any(isinstance(candidate, TYPE_ALIASES[alias]) and not (alias != 'bool' and isinstance(candidate, bool))
+                   for candidate in _candidates(values) for alias in aliases)
+    if operator_name == '$not':
+        return not _match_condition(values, argument)
+    raise OperationFailure(f'Unsupported query operator: {operator_name}')
+
+
+def _is_operator_condition(condition) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(key.startswith('$') for key in condition)
+
+
+def _match_condition(values: list, condition) -> bool:
+    if _is_operator_condition(condition):
+        return all(_match_operator(values, operator_name, argument) for operator_name, argument in condition.items())
+    return _match_operator(values, '$eq', condition)
+
+
+def matches(document: dict, query: dict | None) -> bool:
+    """
+    Whether the document matches the query, the way mongo matches it.
+    """
+    for key, condition in (query or {}).items():
+        if key == '$and':
+            matched = all(matches(document, sub_query) for sub_query in condition)
+        elif key == '$or':
+            matched = any(matches(document, sub_query) for sub_query in condition)
+        elif key == '$nor':
+            matched = not any(matches(document, sub_query) for sub_query in condition)
+        elif key == '$expr':
+            matched = _truthy(evaluate(condition, document))
+        elif key.startswith('$'):
+            raise OperationFailure(f'Unsupported query operator: {key}')
+        else:
+            matched = _match_condition(_values_at(document, key.split('.')), condition)
+        if not matched:
+            return False
+    return True
+
+
+def _truthy(value) -> bool:
+    return value not in (None, False, 0)
+
+
+def evaluate(expression, document: dict):
+    """
+    The value of an aggregation expression (as in $expr), only the operators the connectors use are supported.
+    """
+    if isinstance(expression, str) and expression.startswith('$'):
+        values = _values_at(document, expression[1:].split('.'))
+        return values[0] if values else None
+    if isinstance(expression, list):
+        return [evaluate(item, document) for item in expression]
+    if not isinstance(expression, dict):
+        return expression
+    if not _is_operator_condition(expression):
+        return {key: evaluate(item, document) for key, item in expression.items()}
+    if len(expression) != 1:
+        raise OperationFailure(f'An expression must have a single operator: {expression}')
+    (operator_name, arguments), = expression.items()
+
+    if operator_name == '$sum':
+        # a single array is summed, as are the operands, whatever isn't a number is skipped
+        values = evaluate(arguments, document)
+        if not isinstance(arguments, list) and not isinstance(values, list):
+            values = [values]
+        return sum(value for value in values if _type_order(value) == 1)
+    arguments = evaluate(arguments if isinstance(arguments, list) else [arguments], document)
+    if operator_name in COMPARISON_OPERATORS:
+        return COMPARISON_OPERATORS[operator_name](_sort_key(arguments[0]), _sort_key(arguments[1]))
+    if operator_name == '$eq':
+        return _sort_key(arguments[0]) == _sort_key(arguments[1])
+    if operator_name == '$ne':
+        return _sort_key(arguments[0]) != _sort_key(arguments[1])
+    if operator_name == '$ifNull':
+        return next((argument for argument in arguments[:-1] if argument is not None), arguments[-1])
+    if operator_name == '$arrayElemAt':
+        array, index = arguments
+        if array is None or not -len(array) <= index < len(array):
+            return None
+        return array[index]
+    if operator_name == '$slice':
+        array, *bounds = arguments
+        if array is None:
+            return None
+        if len(bounds) == 1:
+            return array[:bounds[0]] if bounds[0] >= 0 else array[bounds[0]:]
+        position, count = bounds
+        return array[position:position + count]
+    if operator_name == '$size':
+        return len(arguments[0])
+    if operator_name == '$add':
+        return sum(arguments)
+    if operator_name == '$and':
+        return all(_truthy(argument) for argument in arguments)
+    if operator_name == '$or':
+        return any(_truthy(argument) for argument in arguments)
+    raise OperationFailure(f'Unsupported expression operator: {operator_name}')
+
+
+def project(document: dict, projection: dict | list[str] | None) -> dict:
+    """
+    A copy of the document with the projected fields, the projection is either the fields to include
+    or the fields to exclude, as pymongo takes it, the _id is included unless it's excluded.
+    """
+    if projection is None:
+        return _copy(document)
+    if not isinstance(projection, dict):
+        projection = dict.fromkeys(projection, 1)
+    include_id = bool(projection.get('_id', 1))
+    fields = {field: included for field, included in projection.items() if field != '_id'}
+    if fields and all(fields.values()):
+        projected = {'_id': document['_id']} if include_id and '_id' in document else {}
+        for field in fields:
+            _copy_path(document, projected, field.split('.'))
+        return projected
+    projected = _copy(document)
+    for field in fields:
+        _unset_path(projected, field.split('.'))
+    if not include_id:
+        projected.pop('_id', None)
+    return projected
+
+
+def _copy_path(source: dict, target: dict, path: list[str]):
+    key = path[0]
+    if key not in source:
+        return
+    if len(path) == 1:
+        target[key] = _copy(source[key])
+    elif isinstance(source[key], dict):
+        _copy_path(source[key], target.setdefault(key, {}), path[1:])
+
+
+def _set_path(document: dict, path: list[str], value):
+    for key in path[:-1]:
+        document = document.setdefault(key, {})
+    document[path[-1]] = value
+
+
+def _unset_path(document: dict, path: list[str]):
+    for key in path[:-1]:
+        document = document.get(key)
+        if not isinstance(document, dict):
+            return
+    document.pop(path[-1], None)
+
+
+def apply_update(document: dict, update: dict):
+    """
+    Applies the update operators to the document, in place.
+    """
+    if not _is_operator_condition(update):
+        raise ValueError('update only works with $ operators')
+    for operator_name, fields in update.items():
+        for field, value in fields.items():
+            path = field.split('.')
+            if operator_name == '$set':
+                _set_path(document, path, _copy(value))
+            elif operator_name == '$unset':
+                _unset_path(document, path)
+            elif operator_name == '$inc':
+                current = _values_at(document, path)
+                _set_path(document, path, (current[0] if current else 0) + value)
+            else:
+                raise OperationFailure(f'Unsupported update operator: {operator_name}')
+
+
+def _upserted_document(query: dict) -> dict:
+    # the upserted document starts with the query's equality conditions, as it does in mongo
+    document = {}
+    for key, condition in query.items():
+        if not key.startswith('$') and not _is_operator_condition(condition):
+            _set_path(document, key.split('.'), _copy(condition))
+    return document
+
+
+class _Index:
+    """
+    An index is kept as a hash of its keys, so it's used for the equality lookups (e.g. the upserts by document id)
+    and to enforce uniqueness. Ranges are matched by a scan, which is fast enough in memory,
+    but they're still explained as index scans when there's an index for them, as mongo would run them.
+    """
+
+    def __init__(self, index_document: dict):
+        self.name: str = index_document['name']
+        self.fields: list[str] = list(index_document['key'])
+        self.unique: bool = index_document.get('unique', False)
+        self.partial_filter: dict | None = index_document.get('partialFilterExpression')
+        self.wildcard_prefixes = [field[:-len('$**')] for field in self.fields if field.endswith('$**')]
+        self.document = index_document
+        # a list value is indexed by each of its items in mongo, these aren't used for lookups then
+        self.multikey = False
+        self.entries: dict[tuple, dict[Any, None]] = {}
+
+    def key(self, document: dict) -> tuple | None:
+        if self.wildcard_prefixes or (self.partial_filter and not matches(document, self.partial_filter)):
+            return None
+        key = []
+        for field in self.fields:
+            values = _values_at(document, field.split('.'))
+            value = values[0] if values else None
+            if isinstance(value, list):
+                self.multikey = True
+            key.append(_hashable(value))
+        return tuple(key)
+
+    def add(self, document: dict):
+        if (key := self.key(document)) is not None:
+            self.entries.setdefault(key, {})[document['_id']] = None
+
+    def remove(self, document: dict):
+        if (key := self.key(document)) is not None and key in self.entries:
+            self.entries[key].pop(document['_id'], None)
+            if not self.entries[key]:
+                del self.entries[key]
+
+    def covers(self, field: str) -> bool:
+        if self.wildcard_prefixes:
+            return any(field.startswith(prefix) for prefix in self.wildcard_prefixes)
+        return self.fields[0] == field
+
+    def lookup(self, query: dict) -> dict[Any, None] | None:
+        """
+        The ids of the documents that may match the query, if all of the index's fields are equalities in it,
+        None if the index can't be used for it.
+        """
+        if self.wildcard_prefixes or self.multikey:
+            return None
+        key = []
+        for field in self.fields:
+            condition = query.get(field)
+            if _is_operator_condition(condition):
+                condition = condition.get('$eq') if list(condition) == ['$eq'] else None
+            if condition is None or isinstance(condition, (dict, list)):
+                return None
+            key.append(_hashable(condition))
+        if self.partial_filter and not matches(_upserted_document(query), self.partial_filter):
+            return None
+        return self.entries.get(tuple(key), {})
+
+
+class InMemoryCursor:
+    def __init__(self, collection: 'InMemoryCollection', query: dict | None, projection: dict | list[str] | None):
+        self.collection = collection
+        self.query = query or {}
+        self.projection = projection
+        self._sort: list[tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._documents: Iterator[dict] | None = None
+
+    def sort(self, key_or_list: str | list[tuple[str, int]], direction: int = ASCENDING) -> 'InMemoryCursor':
+        self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+    def skip(self, skip: int) -> 'InMemoryCursor':
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> 'InMemoryCursor':
+        self._limit = limit
+        return self
+
+    def explain(self) -> dict:
+        return self.collection._explain(self.query)
+
+    def __iter__(self) -> 'InMemoryCursor':
+        return self
+
+    def __next__(self) -> dict:
+        if self._documents is None:
+            self._documents = self._run()
+        return next(self._documents)
+
+    next = __next__
+
+    def _run(self) -> Iterator[dict]:
+        documents = self.collection._matching_documents(self.query)
+        # sorted by the last key first, the sort is stable so the first key ends up the most significant
+        for field, direction in reversed(self._sort):
+            documents.sort(key=lambda document: _sort_key(next(iter(_values_at(document, field.split('.'))), None)),
+                           reverse=direction < 0)
+        documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        for document in documents:
+            yield project(document, self.projection)
+
+
+class InMemoryCollection:
+    def __init__(self, database: 'InMemoryDatabase', name: str):
+        self.database = database
+        self.name = name
+        self.full_name = f'{database.name}.{name}'
+        # by _id, in the order they were inserted, which is their natural order
+        self._documents: dict[Any, dict] = {}
+        self._indexes: dict[str, _Index] = {}
+        self._lock = threading.RLock()
+
+    def find(self, filter: dict | None = None, projection: dict | list[str] | None = None) -> InMemoryCursor:
+        return InMemoryCursor(self, filter, projection)
+
+    def find_one(self, filter: dict | None = None, projection: dict | list[str] | None = None) -> dict | None:
+        return next(iter(self.find(filter, projection).limit(1)), None)
+
+    def count_documents(self, filter: dict, **kwargs) -> int:
+        return len(self._matching_documents(filter))
+
+    def estimated_document_count(self, **kwargs) -> int:
+        return len(self._documents)
+
+    def insert_one(self, document: dict, **kwargs) -> InsertOneResult:
+        with self._lock:
+            self._insert(document)
+        return InsertOneResult(document['_id'], True)
+
+    def insert_many(self, documents: Iterable[dict], ordered: bool = True, **kwargs) -> InsertManyResult:
+        documents = list(documents)
+        self.bulk_write([InsertOne(document) for document in documents], ordered=ordered)
+        return InsertManyResult([document['_id'] for document in documents], True)
+
+    def replace_one(self, filter: dict, replacement: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        if _is_operator_condition(replacement):
+            raise ValueError('replacement can not include $ operators')
+        with self._lock:
+            return UpdateResult(self._update(filter, upsert, lambda document: _copy(replacement), many=False), True)
+
+    def update_one(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        with self._lock:
+            return UpdateResult(self._update(filter, upsert, self._updater(update), many=False), True)
+
+    def update_many(self, filter: dict, update: dict, upsert: bool = False, **kwargs) -> UpdateResult:
+        with self._lock:
+            return UpdateResult(self._update(filter, upsert, self._updater(update), many=True), True)
+
+    def delete_one(self, filter: dict, **kwargs) -> DeleteResult:
+        with self._lock:
+            return DeleteResult({'n': self._delete(filter, many=False)}, True)
+
+    def delete_many(self, filter: dict, **kwargs) -> DeleteResult:
+        with self._lock:
+            return DeleteResult({'n': self._delete(filter, many=True)}, True)
+
+    def bulk_write(self, requests: list, ordered: bool = True, **kwargs) -> BulkWriteResult:
+        """
+        Runs the operations one by one, and like mongo, an unordered bulk write goes on after a failed write,
+        and raises the failed ones in a `BulkWriteError` at the end.
+        """
+        details = {'writeErrors': [], 'writeConcernErrors': [], 'nInserted': 0, 'nUpserted': 0, 'nMatched': 0,
+                   'nModified': 0, 'nRemoved': 0, 'upserted': []}
+        with self._lock:
+            for index, request in enumerate(requests):
+                try:
+                    self._bulk_operation(request, index, details)
+                except DuplicateKeyError as e:
+                    details['writeErrors'].append({'index': index, 'code': e.code, 'errmsg': str(e),
+                                                   'op': getattr(request, '_doc', None)})
+                    if ordered:
+                        break
+        if details['writeErrors']:
+            raise BulkWriteError(details)
+        return BulkWriteResult(details, True)
+
+    def _bulk_operation(self, request, index: int, details: dict):
+        if isinstance(request, InsertOne):
+            self._insert(request._doc)
+            details['nInserted'] += 1
+            return
+        if isinstance(request, (DeleteOne, DeleteMany)):
+            details['nRemoved'] += self._delete(request._filter, many=isinstance(request, DeleteMany))
+            return
+        if isinstance(request, ReplaceOne):
+            result = self._update(request._filter, request._upsert, lambda document: _copy(request._doc), many=False)
+        elif isinstance(request, (UpdateOne, UpdateMany)):
+            result = self._update(request._filter, request._upsert, self._updater(request._doc),
+                                  many=isinstance(request, UpdateMany))
+        else:
+            raise OperationFailure(f'Unsupported bulk write operation: {type(request).__name__}')
+        if 'upserted' in result:
+            details['nUpserted'] += 1
+            details['upserted'].append({'index': index, '_id': result['upserted']})
+        else:
+            details['nMatched'] += result['n']
+            details['nModified'] += result['nModified']
+
+    def create_indexes(self, indexes: list[IndexModel], **kwargs) -> list[str]:
+        with self._lock:
+            for index_model in indexes:
+                index = _Index(index_model.document)
+                if index.name in self._indexes:
+                    continue
+                for document in self._documents.values():
+                    self._check_unique(index, document)
+                    index.add(document)
+                self._indexes[index.name] = index
+        return [index_model.document['name'] for index_model in indexes]
+
+    def create_index(self, keys, **kwargs) -> str:
+        return self.create_indexes([IndexModel(keys, **kwargs)])[0]
+
+    def index_information(self) -> dict[str, dict]:
+        information = {'_id_': {'key': [('_id', ASCENDING)]}}
+        for name, index in self._indexes.items():
+            information[name] = {key: value for key, value in index.document.items() if key != 'name'}
+            information[name]['key'] = list(index.document['key'].items())
+        return information
+
+    def drop_indexes(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def drop(self):
+        self.database.drop_collection(self.name)
+
+    def _clear(self):
+        # the collection objects are handles in pymongo, which can still be used after the collection was dropped,
+        # so a dropped collection is emptied rather than replaced
+        with self._lock:
+            self._documents.clear()
+            self._indexes.clear()
+
+    @staticmethod
+    def _updater(update: dict):
+        def updated(document: dict) -> dict:
+            document = _copy(document)
+            apply_update(document, update)
+            return document
+
+        return updated
+
+    def _insert(self, document: dict):
+        # like pymongo, the inserted document gets its _id
+        document.setdefault('_id', ObjectId())
+        if document['_id'] in self._documents:
+            raise DuplicateKeyError(f'E11000 duplicate key error collection: {self.full_name} index: _id_',
+                                    DUPLICATE_KEY_ERROR_CODE)
+        self._put(_copy(document))
+
+    def _update(self, query: dict, upsert: bool, updated, many: bool) -> dict:
+        documents = self._matching_documents(query)
+        if not documents:
+            if not upsert:
+                return {'n': 0, 'nModified': 0}
+            base_document = _upserted_document(query)
+            document = updated(base_document)
+            # a replacement doesn't take the query's fields, but it does take its _id
+            document.setdefault('_id', base_document.get('_id') or ObjectId())
+            self._put(document)
+            return {'n': 1, 'nModified': 0, 'upserted': document['_id']}
+        modified = 0
+        for document in documents if many else documents[:1]:
+            new_document = updated(document)
+            new_document['_id'] = document['_id']
+            if new_document != document:
+                self._put(new_document, replaced=document)
+                modified += 1
+        return {'n': len(documents) if many else 1, 'nModified': modified}
+
+    def _delete(self, query: dict, many: bool) -> int:
+        documents = self._matching_documents(query)
+        for document in documents if many else documents[:1]:
+            del self._documents[document['_id']]
+            for index in self._indexes.values():
+                index.remove(document)
+        return len(documents) if many else min(len(documents), 1)
+
+    def _put(self, document: dict, replaced: dict | None = None):
+        if replaced is not None:
+            for index in self._indexes.values():
+                index.remove(replaced)
+        try:
+            for index in self._indexes.values():
+                self._check_unique(index, document)
+        except DuplicateKeyError:
+            if replaced is not None:
+                for index in self._indexes.values():
+                    index.add(replaced)
+            raise
+        self._documents[document['_id']] = document
+        for index in self._indexes.values():
+            index.add(document)
+
+    def _check_unique(self, index: _Index, document: dict):
+        if not index.unique or (key := index.key(document)) is None:
+            return
+        if any(document_id != document['_id'] for document_id in index.entries.get(key, {})):
+            duplicate_key = project(document, {**dict.fromkeys(index.fields, 1), '_id': 0})
+            raise DuplicateKeyError(f'E11000 duplicate key error collection: {self.full_name} index: {index.name} '
+                                    f'dup key: {duplicate_key}', DUPLICATE_KEY_ERROR_CODE)
+
+    def _matching_documents(self, query: dict | None) -> list[dict]:
+        query = query or {}
+        with self._lock:
+            document_ids = self._lookup(query)
+            if document_ids is None:
+                documents = list(self._documents.values())
+            else:
+                documents = [self._documents[document_id] for document_id in document_ids
+                             if document_id in self._documents]
+        return [document for document in documents if matches(document, query)]
+
+    def _lookup(self, query: dict) -> Iterable | None:
+        if '_id' in query and not isinstance(query['_id'], (dict, list)):
+            return [query['_id']]
+        for index in self._indexes.values():
+            if (document_ids := index.lookup(query)) is not None:
+                return list(document_ids)
+        return None
+
+    def _index_name(self, query: dict) -> str | None:
+        """
+        The index mongo would use for the query, if any: one that has the query's first field (or field prefix),
+        and for an $or, every one of its branches has to have one.
+        """
+        if list(query) == ['$or']:
+            names = [self._index_name(sub_query) for sub_query in query['$or']]
+            return names[0] if all(names) else None
+        for field, condition in query.items():
+            if field == '$and':
+                names = [self._index_name(sub_query) for sub_query in condition]
+                return next((name for name in names if name), None)
+            if field == '_id':
+                return '_id_'
+            for index in self._indexes.values():
+                if index.covers(field):
+                    return index.name
+        return None
+
+    def _explain(self, query: dict) -> dict:
+        if index_name := self._index_name(query):
+            winning_plan = {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': index_name}}
+        else:
+            winning_plan = {'stage': 'COLLSCAN', 'filter': query}
+        return {'queryPlanner': {'namespace': self.full_name, 'winningPlan': winning_plan}}
+
+
+class InMemoryDatabase:
+    def __init__(self, client: 'InMemoryClient', name: str):
+        self.client = client
+        self.name = name
+        self._collections: dict[str, InMemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(self, name)
+        return self._collections[name]
+
+    def get_collection(self, name: str, **kwargs) -> InMemoryCollection:
+        return self[name]
+
+    def list_collection_names(self) -> list[str]:
+        return [name for name, collection in self._collections.items()
+                if collection._documents or collection._indexes]
+
+    def drop_collection(self, name_or_collection: str | InMemoryCollection):
+        name = getattr(name_or_collection, 'name', name_or_collection)
+        if name in self._collections:
+            self._collections[name]._clear()
+
+
+class InMemoryClient:
+    """
+    The counterpart of `pymongo.MongoClient`, the clients to the same (host, port) see the same databases.
+    """
+
+    def __init__(self, host=None, port=None, **options):
+        self.address = (host, port)
+        with _servers_lock:
+            self._databases = _servers.setdefault(self.address, {})
+
+    def __getitem__(self, name: str) -> InMemoryDatabase:
+        with _servers_lock:
+            if name not in self._databases:
+                self._databases[name] = InMemoryDatabase(self, name)
+            return self._databases[name]
+
+    def get_database(self, name: str, **kwargs) -> InMemoryDatabase:
+        return self[name]
+
+    def list_database_names(self) -> list[str]:
+        return list(self._databases)
+
+    def drop_database(self, name: str):
+        with _servers_lock:
+            self._databases.pop(name, None)
+
+    def close(self):
+        # there's no connection to close, and the data stays, as it would on the server
+        pass
@@ -0,0 +1,151 @@
+import argparse
+
+from loguru import logger
+from pymongo import UpdateOne
+
+from data_classes.compact_table_body import CompactTableBody
+from data_classes.table_document import TableDocument, get_headers_length
+from data_classes.table_stats import TableStats
+from data_utils.cell_parser import parse_cell, sum_of_first_row
+from db_utils.base_mongo_db_connector import BaseMongoDBConnector
+from db_utils.batch_writer import BatchWriter
+from db_utils.discrepancy_db_connector import DiscrepancyDBConnector
+from db_utils.mongo_db_tables_connector import MongoDBTablesConnector
+from db_utils.validation_connector import ValidationConnector
+
+
+# the fields that are calculated by a backfill for the documents ingested before they were calculated at ingest
+BACKFILLED_FIELDS = ('headers_length', 'stats')
+
+
+def _rewritten(document: dict, table_document: TableDocument, compact: bool) -> dict:
+    # a rewrite shouldn't store the backfilled fields the document doesn't have yet as null,
+    # they're left out, the same as they were, for their backfills to find them
+    rewritten_document = table_document.to_mongo(compact)
+    for field in BACKFILLED_FIELDS:
+        if field not in document and rewritten_document.get(field) is None:
+            rewritten_document.pop(field, None)
+    return rewritten_document
+
+
+def backfill_headers_length(tables_connector: MongoDBTablesConnector, batch_size: int | None = None) -> int:
+    """
+    Stores `headers_length` in the documents that were ingested before it was calculated at ingest,
+    and creates its index.
+    :return: the number of updated documents
+    """
+    tables_connector.ensure_indexes()
+    # None matches both the documents without the field and the ones where it's null
+    # (e.g. the ones rewritten by another migration before this one)
+    documents = tables_connector.collection.find({'headers_length': None}, {'headers': 1})
+    with BatchWriter(tables_connector.collection, batch_size) as writer:
+        for document in documents:
+            writer.add(UpdateOne({'_id': document['_id']},
+                                 {'$set': {'headers_length': get_headers_length(document.get('headers'))}}))
+    logger.info(f'Backfilled headers_length in {writer.modified_count} documents')
+    return writer.modified_count
+
+
+def convert_tables_schema(tables_connector: MongoDBTablesConnector, compact: bool,
+                          batch_size: int | None = None) -> int:
+    """
+    Rewrites the tables stored in the other schema in the given one (see `CompactTableBody`).
+    The connector's `compact_storage` (COMPACT_TABLE_STORAGE in the env) should be set to match, or the new documents
+    will be written in the other schema.
+    :return: the number of converted documents
+    """
+    query = {'rows_list': {'$exists': True}} if compact else {'body': {'$exists': True}}
+    with BatchWriter(tables_connector.collection, batch_size) as writer:
+        for document in tables_connector.collection.find(query):
+            writer.replace({'_id': document['_id']}, _rewritten(document, TableDocument.from_mongo(document), compact))
+    logger.info(f'Converted {writer.modified_count} documents to the {"compact" if compact else "full"} schema')
+    return writer.modified_count
+
+
+def type_table_cells(tables_connector: MongoDBTablesConnector, batch_size: int | None = None) -> int:
+    """
+    Types the cells of the tables that were ingested before the cells were typed at ingest (see `parse_cell`),
+    the documents are kept in the schema they're stored in.
+    The numbers calculated from the cells (`stats`, `sum_of_first_row`) are calculated again from the typed ones,
+    so it doesn't matter whether the stats were backfilled before or after.
+    :return: the number of updated documents
+    """
+    with BatchWriter(tables_connector.collection, batch_size) as writer:
+        for document in tables_connector.collection.find({}):
+            table_document = TableDocument.from_mongo(document)
+            body = table_document.compact_body()
+            if body is None:
+                continue
+            typed_body = CompactTableBody(body.columns, body.row_labels,
+                                          [[parse_cell(cell) if isinstance(cell, str) else cell for cell in row]
+                                           for row in body.rows])
+            if typed_body.rows == body.rows:
+                continue
+            rows_list = typed_body.rows_list
+            table_document = table_document.model_copy(update={
+                'body': typed_body,
+                'body_by_columns': typed_body.body_by_columns,
+                'body_by_rows': typed_body.body_by_rows,
+                'rows_list': rows_list,
+                'sum_of_first_row': sum_of_first_row(rows_list[0]) if rows_list else None,
+                'stats': TableStats.from_body(typed_body, table_document.headers)})
+            writer.replace({'_id': document['_id']}, _rewritten(document, table_document, compact='body' in document))
+    logger.info(f'Typed the cells of {writer.modified_count} documents')
+    return writer.modified_count
+
+
+def backfill_table_stats(tables_connector: MongoDBTablesConnector, batch_size: int | None = None) -> int:
+    """
+    Stores the `stats` of the tables that were ingested before they were calculated at ingest, and creates their index.
+    :return: the number of updated documents
+    """
+    tables_connector.ensure_indexes()
+    with BatchWriter(tables_connector.collection, batch_size) as writer:
+        # None matches both the documents without the stats and the ones where they're null
+        for document in tables_connector.collection.find({'stats': None}):
+            table_document = TableDocument.from_mongo(document)
+            body = table_document.compact_body()
+            stats = TableStats.from_body(body, table_document.headers).model_dump() if body else None
+            writer.add(UpdateOne({'_id': document['_id']}, {'$set': {'stats': stats}}))
+    logger.info(f'Backfilled stats in {writer.modified_count} documents')
+    return writer.modified_count
+
+
+def create_indexes(connectors: list[BaseMongoDBConnector]):
+    """
+    Creates the declared indexes of the given connectors' collections (existing indexes are left as they are).
+    """
+    for connector in connectors:
+        connector.ensure_indexes(force=True)
+
+
+def check_query_plans(validation_connector: ValidationConnector) -> list[dict]:
+    collection_scans = validation_connector.check_query_plans()
+    if collection_scans:
+        logger.warning(f'{len(collection_scans)} of the validation queries scan the whole collection')
+    else:
+        logger.info('All the validation queries use an index')
+    return collection_scans
+
+
+MIGRATIONS = {
+    'backfill_headers_length': lambda args: backfill_headers_length(MongoDBTablesConnector.get_local_connector(),
+                                                                    args.batch_size),
+    'compact_tables': lambda args: convert_tables_schema(MongoDBTablesConnector.get_local_connector(), compact=True,
+                                                         batch_size=args.batch_size),
+    'expand_tables': lambda args: convert_tables_schema(MongoDBTablesConnector.get_local_connector(), compact=False,
+                                                        batch_size=args.batch_size),
+    'type_table_cells': lambda args: type_table_cells(MongoDBTablesConnector.get_local_connector(), args.batch_size),
+    'backfill_table_stats': lambda args: backfill_table_stats(MongoDBTablesConnector.get_local_connector(),
+                                                              args.batch_size),
+    'create_indexes': lambda args: create_indexes([MongoDBTablesConnector.get_local_connector(),
+                                                   DiscrepancyDBConnector.get_local_connector()]),
+    'check_query_plans': lambda args: check_query_plans(ValidationConnector.get_local_connector()),
+}
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Migrates the collections of the local db')
+    arg_parser.add_argument('migration', choices=list(MIGRATIONS))
+    arg_parser.add_argument('--batch-size', type=int, default=None)
+    args = arg_parser.parse_args()
+    MIGRATIONS[args.migration](args)
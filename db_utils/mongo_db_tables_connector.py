@@ -1,11 +1,13 @@
-from typing import List, Any
+from typing import Any, Iterator, List
 
 import pymongo
 from loguru import logger
+from pymongo import IndexModel
 
 from data_classes.table_document import TableDocument
-from db_utils.base_mongo_db_connector import BaseMongoDBConnector
-from db_utils.config_loader import load_local_env_config
+from db_utils.base_mongo_db_connector import BaseMongoDBConnector, timed_operation
+from db_utils.batch_writer import BatchWriter
+from db_utils.config_loader import load_env_flag, load_local_env_config
 from db_utils.default_db_config import DEFAULT_DB_CONFIG_REMOTE
 
 
@@ -18,12 +20,29 @@ class MongoDBTablesConnector(BaseMongoDBConnector):
     It is a singleton class, meaning that it will only create one instance of the class and share it across all instances of the class.
     """
     _shared_state: dict[Any, Any] = {}
+    INDEXES = [
+        # documents without an id are kept, but they can't be told apart, so only the actual ids are unique
+        IndexModel([('document_id', pymongo.ASCENDING)], name='document_id_unique', unique=True,
+                   partialFilterExpression={'document_id': {'$type': 'string'}}),
+        # the validator's range queries, with the document id so it can be projected from the index alone
+        IndexModel([('headers_length', pymongo.ASCENDING), ('document_id', pymongo.ASCENDING)],
+                   name='headers_length_document_id'),
+        IndexModel([('date_of_creation', pymongo.ASCENDING), ('document_id', pymongo.ASCENDING)],
+                   name='date_of_creation_document_id'),
+        IndexModel([('sum_of_first_row', pymongo.ASCENDING), ('document_id', pymongo.ASCENDING)],
+                   name='sum_of_first_row_document_id'),
+        IndexModel([('file_name', pymongo.ASCENDING)], name='file_name'),
+        # a single wildcard index covers every one of the stats (and the ones that will be added later)
+        IndexModel([('stats.$**', pymongo.ASCENDING)], name='stats_wildcard'),
+    ]
 
     def __init__(self, host=None, port=None, db_name=None, collection_name=None, username=None, password=None):
         # simple singleton implementation
         self.__dict__ = self._shared_state
         if not self._shared_state:
             super().__init__(host, port, db_name, collection_name, username, password)
+            # the compact schema stores the table's body once, rather than its three views, see `CompactTableBody`
+            self.compact_storage = load_env_flag('COMPACT_TABLE_STORAGE')
 
     @staticmethod
     def get_local_connector():
@@ -33,14 +52,47 @@ class MongoDBTablesConnector(BaseMongoDBConnector):
                                       db_name=local_env_conf['TABLES_DB_NAME'],
                                       collection_name=local_env_conf['TABLES_COLLECTION_NAME'])
 
+    @timed_operation
     def insert(self, table_document: TableDocument):
-        self.collection.insert_one(table_document.dict())
+        self.collection.insert_one(table_document.to_mongo(self.compact_storage))
 
+    @timed_operation
     def insert_many(self, table_documents: List[TableDocument]):
-        self.collection.insert_many([table_document.dict() for table_document in table_documents])
+        self.collection.insert_many([table_document.to_mongo(self.compact_storage)
+                                     for table_document in table_documents])
 
+    @timed_operation
     def upsert(self, table_document: TableDocument):
         # I use replace_one instead of update_one, because In this case, I use it for insertion rather than updating.
         # I don't want to overwrite the 'insert', I want to 'insert if not exists'.
         # usually I'd use upsert for updating, but in this case, I use it for insertion.
-        self.collection.replace_one({'document_id': table_document.document_id}, table_document.dict(), upsert=True)
+        self.collection.replace_one({'document_id': table_document.document_id},
+                                    table_document.to_mongo(self.compact_storage), upsert=True)
+
+    def find_table_documents(self, query: dict) -> Iterator[TableDocument]:
+        """
+        The documents as `TableDocument`s, whichever schema they were stored in.
+        """
+        for document in self.collection.find(query):
+            yield TableDocument.from_mongo(document)
+
+    def batch_writer(self, batch_size: int | None = None, max_batch_bytes: int | None = None) -> 'TablesBatchWriter':
+        return TablesBatchWriter(self.collection, batch_size, max_batch_bytes, compact=self.compact_storage)
+
+    @timed_operation
+    def upsert_many(self, table_documents: List[TableDocument], batch_size: int | None = None) -> 'TablesBatchWriter':
+        with self.batch_writer(batch_size) as writer:
+            for table_document in table_documents:
+                writer.upsert(table_document)
+        return writer
+
+
+class TablesBatchWriter(BatchWriter):
+    def __init__(self, collection, batch_size: int | None = None, max_batch_bytes: int | None = None,
+                 compact: bool = False):
+        super().__init__(collection, batch_size, max_batch_bytes)
+        self.compact = compact
+
+    def upsert(self, table_document: TableDocument):
+        # same as `MongoDBTablesConnector.upsert`, but buffered
+        self.replace({'document_id': table_document.document_id}, table_document.to_mongo(self.compact))
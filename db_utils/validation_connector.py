@@ -1,9 +1,18 @@
+import operator
+
 from dateutil.parser import parse
 
+from data_classes.table_stats import STAT_FIELDS
+from db_utils.base_mongo_db_connector import timed_operation
 from db_utils.config_loader import load_local_env_config
 from db_utils.mongo_db_tables_connector import MongoDBTablesConnector
 
 
+# the comparisons a stat can be queried by, and how they're done in python
+STAT_OPERATORS = {'$gt': operator.gt, '$gte': operator.ge, '$lt': operator.lt, '$lte': operator.le,
+                  '$eq': operator.eq, '$ne': operator.ne}
+
+
 class ValidationConnector(MongoDBTablesConnector):
     _shared_state = {}
 
@@ -20,38 +29,97 @@ class ValidationConnector(MongoDBTablesConnector):
                                    db_name=local_env_conf['TABLES_DB_NAME'],
                                    collection_name=local_env_conf['TABLES_COLLECTION_NAME'])
 
-    def find_short_headers(self, length: int):
+    # the finders take an optional projection (as pymongo takes it), the tables' bodies are much bigger than
+    # the fields the validation looks at, so there's no point in sending them over if they're not needed
+
+    @timed_operation
+    def find_short_headers(self, length: int, projection: dict | list[str] | None = None):
         '''
         find the tables were the headers are shorter than a given length
+        The length of the serialized headers is stored at ingest (see `get_headers_length`), so it's an indexed range
+        query rather than `{"$where": "JSON.stringify(this.headers).length < length"}`, which ran js on every document.
+        Documents ingested before that need `migrations.py backfill_headers_length`.
         :param length:
+        :param projection:
         :return:
         '''
-        query = {"$where": f"JSON.stringify(this.headers).length < {length}"}
-        return self.collection.find(query)
+        return self.collection.find(self.short_headers_query(length), projection)
+
+    @timed_operation
+    def find_late_date_of_creation(self, date_str: str, projection: dict | list[str] | None = None):
+        return self.collection.find(self.late_date_of_creation_query(date_str), projection)
+
+    @timed_operation
+    def find_high_sum_by_precalculated_value(self, given_sum: int, projection: dict | list[str] | None = None):
+        return self.collection.find(self.high_sum_by_precalculated_value_query(given_sum), projection)
+
+    @timed_operation
+    def find_by_stat(self, stat: str, operator_name: str, value: int | float,
+                     projection: dict | list[str] | None = None):
+        """
+        find the tables by one of their precalculated stats (see `TableStats`), e.g. ('max_value', '$gt', 1000)
+        For the stats that are lists (e.g. 'row_sums'), a table matches if any of the items does.
+        """
+        return self.collection.find(self.stat_query(stat, operator_name, value), projection)
+
+    @timed_operation
+    def find_any(self, queries: list[dict], projection: dict | list[str] | None = None):
+        """
+        finds the tables that match any of the given queries, in a single pass
+        (each of the queries can still use its own index)
+        """
+        query = queries[0] if len(queries) == 1 else {"$or": queries}
+        return self.collection.find(query, projection)
 
-    def find_late_date_of_creation(self, date_str: str):
+    @staticmethod
+    def short_headers_query(length: int) -> dict:
+        return {"headers_length": {"$lt": length}}
+
+    @staticmethod
+    def late_date_of_creation_query(date_str: str) -> dict:
         date = parse(date_str)
-        query = {"date_of_creation": {"$gt": date}}
-        return self.collection.find(query)
+        return {"date_of_creation": {"$gt": date}}
+
+    @staticmethod
+    def high_sum_by_precalculated_value_query(given_sum: int) -> dict:
+        return {"sum_of_first_row": {"$gt": given_sum}}
+
+    @staticmethod
+    def stat_query(stat: str, operator_name: str, value: int | float) -> dict:
+        if stat not in STAT_FIELDS:
+            raise ValueError(f'Unknown stat: {stat}, expected one of {STAT_FIELDS}')
+        if operator_name not in STAT_OPERATORS:
+            raise ValueError(f'Unknown operator: {operator_name}, expected one of {list(STAT_OPERATORS)}')
+        return {f"stats.{stat}": {operator_name: value}}
 
-    def find_high_sum_by_precalculated_value(self, given_sum: int):
-        query = {"sum_of_first_row": {"$gt": given_sum}}
-        return self.collection.find(query)
+    def check_query_plans(self) -> list[dict]:
+        """
+        Explains the validator's queries (with arbitrary values) and warns about the ones that scan the whole collection.
+        :return: the queries that scan the whole collection
+        """
+        queries = [self.short_headers_query(0),
+                   self.late_date_of_creation_query('2000-01-01'),
+                   self.high_sum_by_precalculated_value_query(0),
+                   self.stat_query('max_value', '$gt', 0)]
+        return [query for query in queries if self.is_collection_scan(query)]
 
-    def find_high_sum_by_query(self, given_sum: int):
+    @timed_operation
+    def find_high_sum_by_query(self, given_sum: int, projection: dict | list[str] | None = None):
+        # the cells are stored typed (see `parse_cell`), so they're summed as they are, `$sum` skips the non-numbers
         query = {
             "$expr": {
                 "$gt": [
                     {
                         "$sum": {
-                            "$map": {
-                                "input": {"$slice": [{"$arrayElemAt": ["$rows_list", 0]}, 1, 111111]},
-                                "in": {"$toInt": "$$this"}
-                            }
+                            # the first row's values, in either of the storage schemas
+                            "$ifNull": [
+                                {"$slice": [{"$arrayElemAt": ["$rows_list", 0]}, 1, 111111]},
+                                {"$arrayElemAt": ["$body.rows", 0]}
+                            ]
                         }
                     },
                     given_sum
                 ]
             }
         }
-        return self.collection.find(query)
+        return self.collection.find(query, projection)
@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+
+from db_utils.config_loader import load_env_flag, load_local_env_config
+
+# a single shared no-op context, so a disabled timer costs an attribute check and nothing else
+_DISABLED_TIMER = nullcontext()
+
+
+def _labels_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _prometheus_name(name: str, labels_key: tuple) -> str:
+    if not labels_key:
+        return name
+    labels = ','.join(f'{label}="{_escape_label_value(value)}"' for label, value in labels_key)
+    return f'{name}{{{labels}}}'
+
+
+class Metrics:
+    """
+    Counters, gauges and timers of the ingest and the db operations, each with optional labels (e.g. the stage).
+    When it's disabled, which is the default, nothing is recorded, and the timers and counters return right away.
+    The timers keep a count, a sum and a max, which is what's needed to tell where the time goes
+    (and is a Prometheus summary without quantiles).
+    Every process has its own metrics, so the stages parsed in worker processes aren't timed here,
+    the documents and discrepancies are counted in the parent though.
+    """
+
+    def __init__(self, enabled: bool = False, output_path: str | Path | None = None):
+        self.enabled = enabled
+        self.output_path = Path(output_path) if output_path else None
+        self._lock = threading.Lock()
+        self.reset()
+
+    @classmethod
+    def from_env(cls) -> 'Metrics':
+        return cls(enabled=load_env_flag('METRICS_ENABLED'),
+                   output_path=load_local_env_config().get('METRICS_OUTPUT') or None)
+
+    def reset(self):
+        self.counters: dict[str, dict[tuple, float]] = defaultdict(lambda: defaultdict(float))
+        self.gauges: dict[str, dict[tuple, float]] = defaultdict(dict)
+        # count, sum and max of the seconds
+        self.timers: dict[str, dict[tuple, list[float]]] = defaultdict(lambda: defaultdict(lambda: [0, 0., 0.]))
+
+    def increment(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name][_labels_key(labels)] += value
+
+    def set(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.gauges[name][_labels_key(labels)] = value
+
+    def observe(self, name: str, seconds: float, **labels):
+        with self._lock:
+            timer = self.timers[name][_labels_key(labels)]
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+
+    def timer(self, name: str, **labels):
+        """
+        with metrics.timer('parser_stage_seconds', stage='parse_html'):
+            ...
+        """
+        if not self.enabled:
+            return _DISABLED_TIMER
+        return self._timer(name, labels)
+
+    @contextmanager
+    def _timer(self, name: str, labels: dict):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels):
+        """
+        A decorator that times every call of the function, it's checked whether the metrics are enabled on every call,
+        so they can be enabled after the function was decorated.
+        """
+
+        def decorator(function):
+            @wraps(function)
+            def timed_function(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - start, **labels)
+
+            return timed_function
+
+        return decorator
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                'counters': {name: [{'labels': dict(key), 'value': value} for key, value in values.items()]
+                             for name, values in self.counters.items()},
+                'gauges': {name: [{'labels': dict(key), 'value': value} for key, value in values.items()]
+                           for name, values in self.gauges.items()},
+                'timers': {name: [{'labels': dict(key), 'count': count, 'sum_seconds': total, 'max_seconds': maximum}
+                                  for key, (count, total, maximum) in values.items()]
+                           for name, values in self.timers.items()},
+            }
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, values in sorted(self.counters.items()):
+                lines.append(f'# TYPE {name} counter')
+                lines += [f'{_prometheus_name(name, key)} {value}' for key, value in values.items()]
+            for name, values in sorted(self.gauges.items()):
+                lines.append(f'# TYPE {name} gauge')
+                lines += [f'{_prometheus_name(name, key)} {value}' for key, value in values.items()]
+            for name, values in sorted(self.timers.items()):
+                lines.append(f'# TYPE {name} summary')
+                for key, (count, total, _) in values.items():
+                    lines.append(f'{_prometheus_name(name + "_count", key)} {count}')
+                    lines.append(f'{_prometheus_name(name + "_sum", key)} {total}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str | Path | None = None) -> Path | None:
+        """
+        Writes the metrics as json if the file is a .json one, and in Prometheus' text format otherwise
+        (e.g. a .prom file for the node exporter's textfile collector).
+        :param path: defaults to METRICS_OUTPUT in the env, nothing is written if there's neither
+        """
+        path = Path(path) if path else self.output_path
+        if not path or not self.enabled:
+            return None
+        content = json.dumps(self.to_dict(), indent=2) if path.suffix == '.json' else self.to_prometheus()
+        path.write_text(content, encoding='utf-8')
+        return path
+
+
+METRICS = Metrics.from_env()
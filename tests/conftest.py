@@ -0,0 +1,49 @@
+from contextlib import contextmanager
+
+import pytest
+
+from data_utils.parser import Parser
+from db_utils.base_mongo_db_connector import BaseMongoDBConnector
+from db_utils.client_registry import load_storage_backend
+from db_utils.discrepancy_db_connector import DiscrepancyDBConnector
+from db_utils.mongo_db_tables_connector import MongoDBTablesConnector
+from db_utils.validation_connector import ValidationConnector
+
+CONNECTOR_CLASSES = [BaseMongoDBConnector, MongoDBTablesConnector, ValidationConnector, DiscrepancyDBConnector]
+
+
+@contextmanager
+def isolated_connectors():
+    """
+    The connectors are singletons, so the ones the other tests already connected (e.g. to the test collections)
+    are put aside, and put back after.
+    """
+    shared_states = {cls: dict(cls._shared_state) for cls in CONNECTOR_CLASSES}
+    for cls in CONNECTOR_CLASSES:
+        cls._shared_state.clear()
+    try:
+        yield
+    finally:
+        for cls, shared_state in shared_states.items():
+            cls._shared_state.clear()
+            cls._shared_state.update(shared_state)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def ingested_documents():
+    """
+    The db tests assume the documents were ingested into the local db, so with STORAGE_BACKEND=memory,
+    where the db starts empty, they're ingested here, once for all the tests.
+    """
+    if load_storage_backend() == 'memory':
+        with isolated_connectors():
+            Parser().parse('../documents')
+    yield
+
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    # the connectors connected from within the test use the in-memory storage, whatever the env says
+    monkeypatch.setenv('STORAGE_BACKEND', 'memory')
+    with isolated_connectors():
+        yield
@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pymongo import InsertOne
+
+from data_classes.discrepancy import Discrepancy, DiscrepancyType
+from data_utils.async_pipeline import AsyncMongoSink
+from data_utils.parser import Parser
+from db_utils.async_connectors import AsyncBatchWriter, AsyncDiscrepanciesBatchWriter, AsyncTablesBatchWriter
+
+
+class FakeAsyncCollection:
+    """
+    Keeps the batches it was sent, the way an async client's collection is awaited.
+    """
+
+    def __init__(self, name: str = 'test_collection'):
+        self.name = name
+        self.batches = []
+
+    async def bulk_write(self, operations: list, ordered: bool = True):
+        await asyncio.sleep(0)
+        self.batches.append(operations)
+        return SimpleNamespace(bulk_api_result={'nInserted': len(operations), 'nUpserted': 0,
+                                                'nMatched': 0, 'nModified': 0, 'writeErrors': []})
+
+
+class FakeAsyncConnector:
+    def __init__(self, writer_class: type[AsyncBatchWriter]):
+        self.collection = FakeAsyncCollection()
+        self.writer_class = writer_class
+
+    def batch_writer(self, batch_size: int | None = None) -> AsyncBatchWriter:
+        return self.writer_class(self.collection, batch_size, max_batch_bytes=1024 * 1024)
+
+
+class TestAsyncBatchWriter:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.collection = FakeAsyncCollection()
+        self.writer = AsyncBatchWriter(self.collection, batch_size=2, max_batch_bytes=1024)
+
+    def test_add_flush_close(self):
+        async def write():
+            for number in range(3):
+                await self.writer.add(InsertOne({'number': number}))
+            assert len(self.collection.batches) == 1
+            await self.writer.flush()
+            await self.writer.add(InsertOne({'number': 3}))
+            await self.writer.close()
+
+        asyncio.run(write())
+        assert [len(batch) for batch in self.collection.batches] == [2, 1, 1]
+        assert (self.writer.batches_written, self.writer.inserted_count) == (3, 4)
+        assert self.writer.operations == []
+
+    def test_batch_bytes(self):
+        async def write():
+            await self.writer.add(InsertOne({'number': 0}), size=600)
+            await self.writer.add(InsertOne({'number': 1}), size=600)
+
+        asyncio.run(write())
+        # the second operation would have made the batch too big, so the first one was sent alone
+        assert [len(batch) for batch in self.collection.batches] == [1]
+        assert len(self.writer.operations) == 1
+
+    def test_async_with_flushes_the_last_batch(self):
+        async def write():
+            async with self.writer as writer:
+                await writer.add(InsertOne({'number': 0}))
+
+        asyncio.run(write())
+        assert [len(batch) for batch in self.collection.batches] == [1]
+
+    def test_no_sync_with(self):
+        # a sync `with` couldn't await the last batch, so it's not supported rather than losing it
+        with pytest.raises(TypeError):
+            with self.writer:
+                pass
+
+
+class TestAsyncMongoSink:
+    def test_write_and_close(self):
+        tables_connector = FakeAsyncConnector(AsyncTablesBatchWriter)
+        discrepancies_connector = FakeAsyncConnector(AsyncDiscrepanciesBatchWriter)
+        table_documents = [table_document for table_document, _ in
+                           Parser(connect_to_db=False).iter_parse("../documents")]
+        discrepancy = Discrepancy(DiscrepancyType.INVALID_SUM, description="First row doesn't contain only numbers")
+
+        async def write():
+            async with AsyncMongoSink(tables_connector, discrepancies_connector, batch_size=50) as sink:
+                for table_document in table_documents:
+                    await sink.write(table_document, [])
+                await sink.write(None, [discrepancy])
+            return sink
+
+        sink = asyncio.run(write())
+        assert [len(batch) for batch in tables_connector.collection.batches] == [50, len(table_documents) - 50]
+        assert [len(batch) for batch in discrepancies_connector.collection.batches] == [1]
+        assert sink.write_errors == []
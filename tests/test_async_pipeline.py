@@ -0,0 +1,45 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from data_utils.async_pipeline import AsyncDocumentSink, parse_to_async_sink
+from data_utils.parser import Parser
+
+
+class CollectingSink(AsyncDocumentSink):
+    def __init__(self):
+        self.table_documents = []
+        self.discrepancies = []
+        self.closed = False
+
+    async def write(self, table_document, discrepancies):
+        await asyncio.sleep(0)  # like a db write, lets the reading go on meanwhile
+        self.table_documents.append(table_document)
+        self.discrepancies.extend(discrepancies)
+
+    async def close(self):
+        self.closed = True
+
+
+class TestAsyncPipeline:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.parser = Parser(connect_to_db=False)
+        self.files = list(self.parser._get_valid_files(Path("../documents")))
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_parse_to_async_sink(self, workers):
+        sink = CollectingSink()
+        files_written = asyncio.run(parse_to_async_sink(self.parser, self.files, sink, workers=workers, queue_size=3))
+        assert files_written == 67
+        assert sink.closed
+        # the files are written in their order, whichever of them was parsed first
+        assert [table_document.file_name for table_document in sink.table_documents] == [f.name for f in self.files]
+        assert len(sink.discrepancies) == 7
+
+    def test_same_as_sync_parse(self):
+        sink = CollectingSink()
+        asyncio.run(parse_to_async_sink(self.parser, self.files, sink))
+        sync_documents = [table_document for table_document, _ in self.parser.iter_parse("../documents")]
+        assert [d.model_dump() for d in sink.table_documents] == [d.model_dump() for d in sync_documents]
@@ -0,0 +1,15 @@
+import pytest
+
+from data_utils.cell_parser import parse_cell
+
+
+class TestCellParser:
+    @pytest.mark.parametrize("cell_text, expected", [('1060', 1060), ('-37', -37), ('+5', 5), ('12.5', 12.5),
+                                                     ('.5', 0.5), ('1e3', '1e3'), ('1.5e3', 1500.0),
+                                                     ('', None), ('846%', '846%'), ('1,060', '1,060'),
+                                                     ('nan', 'nan'), ('inf', 'inf'),
+                                                     ('9' * 20, '9' * 20)])
+    def test_parse_cell(self, cell_text, expected):
+        parsed = parse_cell(cell_text)
+        assert parsed == expected
+        assert type(parsed) is type(expected)
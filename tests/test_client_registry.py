@@ -0,0 +1,63 @@
+import pytest
+
+from db_utils import client_registry
+from db_utils.client_registry import get_client, load_client_options, release_client
+from db_utils.memory_storage import InMemoryClient
+from db_utils.mongo_db_tables_connector import MongoDBTablesConnector
+from tests.conftest import isolated_connectors
+
+
+class TestClientRegistry:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        # the clients connect lazily, so no server is needed to share them
+        monkeypatch.setenv('STORAGE_BACKEND', 'mongo')
+        yield
+        client_registry.close_all_clients()
+
+    def test_same_server_shares_client(self):
+        client = get_client('localhost', 27017)
+        assert get_client('localhost', 27017) is client
+        assert get_client('localhost', 27017, username='user', password='password') is not client
+        assert get_client('localhost', 27017, maxPoolSize=5) is not client
+
+    def test_client_closed_when_released_by_all(self):
+        client = get_client('localhost', 27017)
+        get_client('localhost', 27017)
+        release_client(client)
+        assert get_client('localhost', 27017) is client
+        release_client(client)
+        release_client(client)
+        assert get_client('localhost', 27017) is not client
+
+    def test_options_from_env(self, monkeypatch):
+        monkeypatch.setenv('MONGO_MAX_POOL_SIZE', '7')
+        monkeypatch.setenv('MONGO_WRITE_CONCERN', 'majority')
+        options = load_client_options()
+        assert options['maxPoolSize'] == 7
+        assert options['w'] == 'majority'
+        client = get_client('localhost', 27017)
+        assert client.options.pool_options.max_pool_size == 7
+        assert client.write_concern.document == {'w': 'majority'}
+
+    def test_memory_clients_are_shared(self, monkeypatch):
+        monkeypatch.setenv('STORAGE_BACKEND', 'memory')
+        client = get_client('localhost', 27017)
+        assert isinstance(client, InMemoryClient)
+        assert get_client('localhost', 27017) is client
+        release_client(client)
+        assert get_client('localhost', 27017) is client
+        release_client(client)
+        release_client(client)
+        assert get_client('localhost', 27017) is not client
+
+    def test_closed_connector_gets_a_new_client(self):
+        with isolated_connectors():
+            connector = MongoDBTablesConnector.get_local_connector()
+            client = connector.client
+            connector.close()
+            connector.close()
+            assert MongoDBTablesConnector.get_local_connector().client is not client
+            # the closed client can't be used anymore, the new one can
+            MongoDBTablesConnector.get_local_connector().collection.find({})
+            MongoDBTablesConnector.get_local_connector().close()
@@ -0,0 +1,29 @@
+from benchmarks.corpus import CorpusConfig, generate_corpus
+from data_classes.discrepancy import DiscrepancyType
+from data_utils.sinks import InMemorySink
+from data_utils.parser import Parser
+
+
+class TestCorpus:
+    def test_generated_tables_parse(self, tmp_path):
+        generate_corpus(tmp_path, CorpusConfig(files=20, rows=3, columns=4, missing_caption_rate=0,
+                                               missing_tfoot_rate=0, missing_date_rate=0, non_numeric_cell_rate=0))
+        sink = InMemorySink()
+        Parser(connect_to_db=False).parse_to_sink(str(tmp_path), sink)
+        assert len(sink.table_documents) == 20
+        assert not sink.discrepancies
+        assert all(len(table_document.rows_list) == 3 for table_document in sink.table_documents)
+        assert all(table_document.date_of_creation for table_document in sink.table_documents)
+
+    def test_defect_rates(self, tmp_path):
+        generate_corpus(tmp_path, CorpusConfig(files=10, missing_caption_rate=1, missing_tfoot_rate=1))
+        sink = InMemorySink()
+        Parser(connect_to_db=False).parse_to_sink(str(tmp_path), sink)
+        discrepancy_types = [discrepancy.discrepancy_type for discrepancy in sink.discrepancies]
+        assert discrepancy_types.count(DiscrepancyType.MISSING_TITLE) == 10
+        assert discrepancy_types.count(DiscrepancyType.MISSING_FOOTER) == 10
+
+    def test_same_seed_same_corpus(self, tmp_path):
+        first_files = generate_corpus(tmp_path / 'first', CorpusConfig(files=5))
+        second_files = generate_corpus(tmp_path / 'second', CorpusConfig(files=5))
+        assert [f.read_text() for f in first_files] == [f.read_text() for f in second_files]
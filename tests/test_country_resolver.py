@@ -0,0 +1,56 @@
+import pytest
+
+from data_utils import parser
+from data_utils.country_resolver import CountryResolver
+
+
+class TestCountryResolver:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.resolver = CountryResolver(max_size=2)
+
+    @pytest.mark.parametrize("country_str, expected",
+                             [("Chad", "Chad"),
+                              ("  bosnia   and herzegovina ", "Bosnia and Herzegovina"),
+                              ("Bolivia", "Bolivia, Plurinational State of"),
+                              ("Republic of Chad", "Chad"),
+                              ("Niger", "Niger"),
+                              ("Herzegovina", "Bosnia and Herzegovina"),
+                              ("Netherlands Antilles", None)])
+    def test_resolve(self, country_str, expected):
+        assert self.resolver.resolve(country_str) == expected
+
+    def test_cache_hits_and_misses(self):
+        self.resolver.resolve("Chad")
+        self.resolver.resolve("chad")
+        self.resolver.resolve("Netherlands Antilles")
+        self.resolver.resolve("Netherlands Antilles")
+        assert (self.resolver.hits, self.resolver.misses) == (2, 2)
+
+    def test_cache_is_bounded(self):
+        for country_str in ["Chad", "Estonia", "Tokelau"]:
+            self.resolver.resolve(country_str)
+        assert list(self.resolver.cache) == ["estonia", "tokelau"]
+
+    def test_persisted_cache(self, tmp_path):
+        cache_path = tmp_path / "countries.json"
+        resolver = CountryResolver(cache_path=cache_path)
+        resolver.resolve("Chad")
+        resolver.resolve("Netherlands Antilles")
+        resolver.save()
+        loaded_resolver = CountryResolver(cache_path=cache_path)
+        assert loaded_resolver.resolve("Chad") == "Chad"
+        assert loaded_resolver.resolve("Netherlands Antilles") is None
+        assert loaded_resolver.hits == 2
+
+    def test_workers_load_the_persisted_cache(self, tmp_path, monkeypatch):
+        cache_path = tmp_path / "countries.json"
+        resolver = CountryResolver(cache_path=cache_path)
+        resolver.resolve("Chad")
+        resolver.save()
+        # the worker's parser is put back after the test, so it doesn't leak into the other tests
+        monkeypatch.setattr(parser, '_worker_parser', None)
+        parser._init_worker('lxml', cache_path)
+        worker_resolver = parser._worker_parser.country_resolver
+        assert worker_resolver.resolve("Chad") == "Chad"
+        assert worker_resolver.hits == 1
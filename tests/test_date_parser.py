@@ -0,0 +1,25 @@
+from datetime import datetime
+
+import pytest
+
+from data_utils.date_parser import parse_footer_date
+
+
+class TestDateParser:
+    @pytest.mark.parametrize("date_str, expected",
+                             [("3Feb2013", datetime(2013, 2, 3)),
+                              ("31Aug2022", datetime(2022, 8, 31)),
+                              ("07september1999", datetime(1999, 9, 7)),
+                              ("12SEPT2020", datetime(2020, 9, 12)),
+                              ("1Jan0001", datetime(2001, 1, 1)),
+                              ("5Mar99", datetime(1999, 3, 5)),
+                              ("30Feb2021", None),
+                              ("3Febr2013", None)])
+    def test_parse_footer_date(self, date_str, expected):
+        assert parse_footer_date(date_str) == expected
+
+    def test_parse_footer_date_is_cached(self):
+        parse_footer_date.cache_clear()
+        parse_footer_date("3Feb2013")
+        parse_footer_date("3Feb2013")
+        assert parse_footer_date.cache_info().hits == 1
@@ -39,6 +39,29 @@ class TestDiscrepanciesDBConnector:
         self.connector.upsert(self.discrepancy)
         assert self.connector.collection.count_documents({}) == 1
 
+    def test_upsert_same_file(self):
+        another_discrepancy = Discrepancy(
+            file_name='test_file_name.html',
+            discrepancy_type=DiscrepancyType.MISSING_TITLE,
+            description='Another test discrepancy'
+        )
+        self.connector.upsert(self.discrepancy)
+        self.connector.upsert(another_discrepancy)
+        assert self.connector.collection.count_documents({"file_name": "test_file_name.html"}) == 2
+
+    def test_upsert_many(self):
+        another_discrepancy = Discrepancy(
+            file_name='test_file_name.html',
+            discrepancy_type=DiscrepancyType.MISSING_FOOTER,
+            description='Another test discrepancy',
+            location=3
+        )
+        counts = self.connector.upsert_many([self.discrepancy, another_discrepancy])
+        assert counts == {'inserted': 2, 'matched': 0}
+        counts = self.connector.upsert_many([self.discrepancy, another_discrepancy])
+        assert counts == {'inserted': 0, 'matched': 2}
+        assert self.connector.collection.count_documents({}) == 2
+
     def test_insert_many(self):
         another_discrepancy = Discrepancy(
             file_name='another_file_name.html',
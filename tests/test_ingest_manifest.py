@@ -0,0 +1,99 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from data_utils.ingest_manifest import IngestManifest
+from data_utils.parser import Parser
+from db_utils.mongo_db_tables_connector import MongoDBTablesConnector
+
+
+class TestIngestManifest:
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path):
+        self.documents_dir = tmp_path / 'documents'
+        self.documents_dir.mkdir()
+        self.manifest_path = tmp_path / 'manifest.json'
+        self.first_file = self.documents_dir / '0_table.html'
+        self.second_file = self.documents_dir / '1_table.html'
+        self.first_file.write_text('<table id="first"></table>', encoding='utf-8')
+        self.second_file.write_text('<table id="second"></table>', encoding='utf-8')
+
+    def ingest(self) -> list[str]:
+        manifest = IngestManifest(self.manifest_path)
+        changed_files = list(manifest.changed_files(sorted(self.documents_dir.iterdir())))
+        for file_path in changed_files:
+            manifest.record(file_path, file_path.stem)
+        self.removed = manifest.pop_removed()
+        manifest.save()
+        return [file_path.name for file_path in changed_files]
+
+    def test_first_run_parses_everything(self):
+        assert self.ingest() == ['0_table.html', '1_table.html']
+
+    def test_unchanged_files_are_skipped(self):
+        self.ingest()
+        assert self.ingest() == []
+
+    def test_touched_file_is_skipped(self):
+        self.ingest()
+        stat = self.first_file.stat()
+        os.utime(self.first_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert self.ingest() == []
+
+    def test_changed_file_is_parsed(self):
+        self.ingest()
+        self.second_file.write_text('<table id="second_changed"></table>', encoding='utf-8')
+        assert self.ingest() == ['1_table.html']
+
+    def test_removed_file(self):
+        self.ingest()
+        self.first_file.unlink()
+        assert self.ingest() == []
+        assert list(self.removed) == ['0_table.html']
+        assert self.removed['0_table.html']['document_id'] == '0_table'
+
+    def test_record_returns_replaced_document_id(self):
+        manifest = IngestManifest(self.manifest_path)
+        assert manifest.record(self.first_file, 'first') is None
+        assert manifest.record(self.first_file, 'first') is None
+        assert manifest.record(self.first_file, 'renamed') == 'first'
+
+
+class TestIncrementalParse:
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path, memory_backend):
+        self.documents_dir = tmp_path / 'documents'
+        self.documents_dir.mkdir()
+        for file_name in ['0_table.html', '36_table.html', '64_table.html']:
+            (self.documents_dir / file_name).write_text((Path('../documents') / file_name).read_text(encoding='utf-8'),
+                                                        encoding='utf-8')
+        self.manifest_path = tmp_path / 'manifest.json'
+        self.tables_connector = MongoDBTablesConnector.get_local_connector()
+        self.tables_connector.drop_collection()
+
+        yield
+
+        self.tables_connector.drop_collection()
+
+    def parse(self) -> list[str | None]:
+        Parser().parse(str(self.documents_dir), incremental=True, manifest_path=str(self.manifest_path))
+        return sorted(document['document_id'] or '' for document in self.tables_connector.find({}))
+
+    def test_renamed_file_keeps_its_document(self):
+        document_ids = self.parse()
+        assert len(document_ids) == 3
+        (self.documents_dir / '36_table.html').rename(self.documents_dir / '99_table.html')
+        assert self.parse() == document_ids
+
+    def test_document_id_moved_to_another_file(self):
+        document_ids = self.parse()
+        # 36's id now belongs to 0, and 36 has a new one, so only 0's old id is stale
+        first_file, second_file = self.documents_dir / '0_table.html', self.documents_dir / '36_table.html'
+        first_id = self.tables_connector.find_one({'file_name': '0_table.html'})['document_id']
+        second_id = self.tables_connector.find_one({'file_name': '36_table.html'})['document_id']
+        first_file.write_text(first_file.read_text(encoding='utf-8').replace(first_id, second_id), encoding='utf-8')
+        second_file.write_text(second_file.read_text(encoding='utf-8').replace(second_id, 'Table36Renamed'),
+                               encoding='utf-8')
+        assert self.parse() == sorted(set(document_ids) - {first_id} | {'Table36Renamed'})
+
@@ -0,0 +1,154 @@
+from datetime import datetime
+
+import pymongo
+import pytest
+from pymongo import IndexModel, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+from data_classes.validation_status import ValidationStatus
+from data_utils.document_validator import DocumentValidator
+from data_utils.parser import Parser
+from db_utils import client_registry
+from db_utils.memory_storage import InMemoryClient
+from db_utils.mongo_db_tables_connector import MongoDBTablesConnector
+
+
+class TestInMemoryCollection:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.collection = InMemoryClient('memory', 1)['test_db']['test_collection']
+        self.collection.insert_many([
+            {'document_id': 'a', 'headers_length': 15, 'date_of_creation': datetime(2022, 1, 20),
+             'stats': {'row_sums': [10, 9000], 'max_value': 9000}, 'rows_list': [['Roberts LLC', 1, 2, '3%']]},
+            {'document_id': 'b', 'headers_length': 40, 'date_of_creation': datetime(2019, 5, 1),
+             'stats': {'row_sums': [5], 'max_value': None}, 'rows_list': [['Wade Inc', 500, 700]]},
+            {'document_id': None, 'headers_length': 22, 'title': 'no id'},
+        ])
+
+        yield
+
+        self.collection.database.client.drop_database('test_db')
+
+    def find_ids(self, query: dict) -> list:
+        return [document['document_id'] for document in self.collection.find(query)]
+
+    def test_query_operators(self):
+        assert self.find_ids({'headers_length': {'$lt': 22}}) == ['a']
+        assert self.find_ids({'headers_length': {'$gte': 22, '$lte': 40}}) == ['b', None]
+        assert self.find_ids({'date_of_creation': {'$gt': datetime(2020, 1, 1)}}) == ['a']
+        assert self.find_ids({'document_id': {'$in': ['b', 'c']}}) == ['b']
+        assert self.find_ids({'document_id': {'$nin': ['b', None]}}) == ['a']
+        assert self.find_ids({'title': {'$exists': True}}) == [None]
+        assert self.find_ids({'title': None}) == ['a', 'b']
+        assert self.find_ids({'document_id': {'$type': 'string'}}) == ['a', 'b']
+        assert self.find_ids({'$or': [{'headers_length': {'$lt': 20}}, {'document_id': 'b'}]}) == ['a', 'b']
+        assert self.find_ids({'$and': [{'headers_length': {'$gt': 10}}, {'document_id': {'$ne': 'a'}}]}) == ['b', None]
+
+    def test_dotted_paths_and_arrays(self):
+        # a list matches if any of its items does, and a string is never greater than a number
+        assert self.find_ids({'stats.row_sums': {'$gt': 8000}}) == ['a']
+        assert self.find_ids({'stats.max_value': {'$gt': 0}}) == ['a']
+        assert self.find_ids({'stats.max_value': {'$ne': 5}}) == ['a', 'b', None]
+        assert self.find_ids({'rows_list.0': {'$exists': True}}) == ['a', 'b']
+
+    def test_expr(self):
+        first_row_sum = {'$sum': {'$slice': [{'$arrayElemAt': ['$rows_list', 0]}, 1, 111111]}}
+        assert self.find_ids({'$expr': {'$gt': [first_row_sum, 2]}}) == ['a', 'b']
+        assert self.find_ids({'$expr': {'$gt': [first_row_sum, 1000]}}) == ['b']
+
+    def test_unsupported_operator(self):
+        with pytest.raises(OperationFailure):
+            list(self.collection.find({'$where': 'this.headers_length < 20'}))
+
+    def test_projection_sort_and_limit(self):
+        documents = list(self.collection.find({'document_id': {'$type': 'string'}}, ['document_id', 'stats.max_value'])
+                         .sort('headers_length', pymongo.DESCENDING).limit(1))
+        assert documents == [{'_id': documents[0]['_id'], 'document_id': 'b', 'stats': {'max_value': None}}]
+        document = self.collection.find_one({'document_id': 'a'}, {'rows_list': 0, 'stats': 0, '_id': 0})
+        assert document == {'document_id': 'a', 'headers_length': 15, 'date_of_creation': datetime(2022, 1, 20)}
+
+    def test_returned_documents_are_copies(self):
+        document = self.collection.find_one({'document_id': 'a'})
+        document['stats']['max_value'] = 0
+        assert self.collection.find_one({'document_id': 'a'})['stats']['max_value'] == 9000
+
+    def test_updates(self):
+        result = self.collection.update_one({'document_id': 'a'}, {'$set': {'stats.max_value': 1, 'title': 'new'}})
+        assert (result.matched_count, result.modified_count) == (1, 1)
+        assert self.collection.find_one({'document_id': 'a'}, ['title', 'stats'])['stats']['max_value'] == 1
+        result = self.collection.replace_one({'document_id': 'c'}, {'document_id': 'c', 'title': 'c'}, upsert=True)
+        assert result.upserted_id is not None
+        assert self.collection.count_documents({}) == 4
+        assert self.collection.delete_many({'document_id': {'$in': ['a', 'c']}}).deleted_count == 2
+        assert self.collection.count_documents({}) == 2
+
+    def test_bulk_upserts(self):
+        result = self.collection.bulk_write([ReplaceOne({'document_id': 'a'}, {'document_id': 'a', 'title': 'a'},
+                                                        upsert=True),
+                                             ReplaceOne({'document_id': 'd'}, {'document_id': 'd'}, upsert=True),
+                                             UpdateOne({'document_id': 'e'}, {'$set': {'title': 'e'}}, upsert=True)],
+                                            ordered=False)
+        assert result.bulk_api_result['nMatched'] == 1
+        assert result.bulk_api_result['nUpserted'] == 2
+        assert self.collection.find_one({'document_id': 'a'}, {'_id': 0}) == {'document_id': 'a', 'title': 'a'}
+        assert self.collection.find_one({'document_id': 'e'}, {'_id': 0}) == {'document_id': 'e', 'title': 'e'}
+
+    def test_unique_index(self):
+        self.collection.create_indexes([IndexModel([('document_id', pymongo.ASCENDING)], name='document_id_unique',
+                                                   unique=True,
+                                                   partialFilterExpression={'document_id': {'$type': 'string'}})])
+        with pytest.raises(DuplicateKeyError):
+            self.collection.insert_one({'document_id': 'a'})
+        # the documents without an id aren't in the partial index
+        self.collection.insert_one({'document_id': None})
+        with pytest.raises(BulkWriteError) as e:
+            self.collection.bulk_write([ReplaceOne({'document_id': 'b'}, {'document_id': 'a'}),
+                                        ReplaceOne({'document_id': 'f'}, {'document_id': 'f'}, upsert=True)],
+                                       ordered=False)
+        assert [error['index'] for error in e.value.details['writeErrors']] == [0]
+        assert e.value.details['nUpserted'] == 1
+        assert self.find_ids({'document_id': 'b'}) == ['b']
+
+    def test_explain(self):
+        self.collection.create_indexes([IndexModel([('headers_length', pymongo.ASCENDING)], name='headers_length'),
+                                        IndexModel([('stats.$**', pymongo.ASCENDING)], name='stats_wildcard')])
+        plan = self.collection.find({'headers_length': {'$lt': 20}}).explain()['queryPlanner']['winningPlan']
+        assert plan['inputStage']['indexName'] == 'headers_length'
+        plan = self.collection.find({'stats.max_value': {'$gt': 20}}).explain()['queryPlanner']['winningPlan']
+        assert plan['inputStage']['indexName'] == 'stats_wildcard'
+        plan = self.collection.find({'$or': [{'headers_length': 1}, {'title': 'a'}]}).explain()
+        assert plan['queryPlanner']['winningPlan']['stage'] == 'COLLSCAN'
+
+    def test_clients_share_data(self):
+        assert InMemoryClient('memory', 1)['test_db']['test_collection'].count_documents({}) == 3
+        assert InMemoryClient('memory', 2)['test_db']['test_collection'].count_documents({}) == 0
+
+
+@pytest.mark.usefixtures('memory_backend')
+class TestMemoryStorageBackend:
+    def test_unknown_backend(self, monkeypatch):
+        monkeypatch.setenv('STORAGE_BACKEND', 'sqlite')
+        with pytest.raises(ValueError):
+            client_registry.get_client('localhost', 27017)
+
+    def test_parse_and_validate(self):
+        Parser().parse('../documents')
+        tables_connector = MongoDBTablesConnector.get_local_connector()
+        assert isinstance(tables_connector.client, InMemoryClient)
+        assert tables_connector.collection.count_documents({}) == 67
+
+        document_validator = DocumentValidator(max_headers_length=22, late_date='2022-01-01', high_sum=8000)
+        assert document_validator.validation_connector.check_query_plans() == []
+        document_validator.validate()
+        discrepancies_by_rule = {rule: [details for _, details in discrepancies]
+                                 for rule, discrepancies in document_validator.discrepancies_by_rule.items()}
+        assert sorted(details['length'] for details in discrepancies_by_rule['short_headers']) == [15, 16, 16]
+        assert sorted(details['date_of_creation'] for details in discrepancies_by_rule['late_date']) == [
+            datetime(2022, 1, 20), datetime(2022, 1, 21), datetime(2022, 8, 31), datetime(2022, 10, 12)]
+        assert sorted(details['sum_of_first_row'] for details in discrepancies_by_rule['high_sum']) == [
+            8246, 8462, 9689]
+        saved_discrepancies = [discrepancy for status, discrepancy in document_validator.all_discrepancies
+                               if status == ValidationStatus.NOT_FOUND]
+        assert saved_discrepancies
+        # the same findings, streamed a page at a time
+        assert len(list(document_validator.iter_validate(batch_size=5))) == len(document_validator.all_discrepancies)
@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from data_classes.discrepancy import DiscrepancyType
+from data_utils.parser import Parser
+from data_utils.sinks import InMemorySink
+from monitoring.metrics import METRICS, Metrics
+
+
+class TestMetrics:
+    def test_disabled_records_nothing(self, tmp_path):
+        metrics = Metrics(enabled=False)
+        metrics.increment('files_total')
+        metrics.set('queue_size', 3)
+        with metrics.timer('stage_seconds', stage='title'):
+            pass
+        assert metrics.to_dict() == {'counters': {}, 'gauges': {}, 'timers': {}}
+        assert metrics.write(tmp_path / 'metrics.prom') is None
+
+    @pytest.mark.parametrize("value, expected", [("true", True), ("Yes", True), ("1", True),
+                                                 ("false", False), ("0", False), ("", False)])
+    def test_enabled_from_env(self, monkeypatch, value, expected):
+        monkeypatch.setenv('METRICS_ENABLED', value)
+        assert Metrics.from_env().enabled == expected
+
+    def test_counters_gauges_and_timers(self):
+        metrics = Metrics(enabled=True)
+        metrics.increment('discrepancies_total', type='MISSING_TITLE')
+        metrics.increment('discrepancies_total', 2, type='MISSING_TITLE')
+        metrics.set('cache_hits', 5, cache='country')
+        metrics.set('cache_hits', 7, cache='country')
+
+        @metrics.timed('stage_seconds', stage='title')
+        def title():
+            return 'title'
+
+        assert title() == 'title'
+        with metrics.timer('stage_seconds', stage='title'):
+            pass
+        assert metrics.counters['discrepancies_total'][(('type', 'MISSING_TITLE'),)] == 3
+        assert metrics.gauges['cache_hits'][(('cache', 'country'),)] == 7
+        count, total, maximum = metrics.timers['stage_seconds'][(('stage', 'title'),)]
+        assert count == 2
+        assert 0 <= maximum <= total
+
+    def test_timer_records_failures(self):
+        metrics = Metrics(enabled=True)
+        with pytest.raises(ValueError):
+            with metrics.timer('db_operation_seconds', operation='find'):
+                raise ValueError
+        assert metrics.timers['db_operation_seconds'][(('operation', 'find'),)][0] == 1
+
+    def test_write(self, tmp_path):
+        metrics = Metrics(enabled=True)
+        metrics.increment('documents_parsed_total', 3)
+        metrics.observe('db_operation_seconds', 0.5, operation='bulk_write', collection='tables')
+
+        prometheus_text = metrics.write(tmp_path / 'metrics.prom').read_text(encoding='utf-8')
+        assert '# TYPE documents_parsed_total counter\ndocuments_parsed_total 3' in prometheus_text
+        assert 'db_operation_seconds_count{collection="tables",operation="bulk_write"} 1' in prometheus_text
+        assert 'db_operation_seconds_sum{collection="tables",operation="bulk_write"} 0.5' in prometheus_text
+
+        metrics_dict = json.loads(metrics.write(tmp_path / 'metrics.json').read_text(encoding='utf-8'))
+        assert metrics_dict['counters']['documents_parsed_total'] == [{'labels': {}, 'value': 3}]
+        assert metrics_dict['timers']['db_operation_seconds'][0]['max_seconds'] == 0.5
+
+
+class TestParserMetrics:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        METRICS.enabled = True
+        METRICS.reset()
+        yield
+        METRICS.enabled = False
+        METRICS.reset()
+
+    def test_parse_counts_documents_and_discrepancies(self):
+        sink = InMemorySink()
+        Parser(connect_to_db=False).parse_to_sink('../documents', sink)
+        assert METRICS.counters['documents_parsed_total'][()] == 67
+        discrepancies_by_type = {dict(key)['type']: count
+                                 for key, count in METRICS.counters['discrepancies_total'].items()}
+        assert sum(discrepancies_by_type.values()) == len(sink.discrepancies)
+        assert discrepancies_by_type[DiscrepancyType.MISSING_TITLE.value] == \
+               len([d for d in sink.discrepancies if d.discrepancy_type == DiscrepancyType.MISSING_TITLE])
+        stage_timers = METRICS.timers['parser_stage_seconds']
+        assert stage_timers[(('stage', 'title'),)][0] == 67
+        assert stage_timers[(('stage', 'parse_html'),)][0] == 67
+        # the country cache is reported the same way as the date ones
+        for cache_name in ('parse_footer_date', 'footer_date_str', 'country'):
+            assert (('cache', cache_name),) in METRICS.gauges['cache_hits']
+            assert (('cache', cache_name),) in METRICS.gauges['cache_misses']
+        assert 'cache_lookups_total' not in METRICS.counters
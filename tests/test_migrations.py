@@ -0,0 +1,121 @@
+from itertools import islice
+
+import pytest
+
+from data_utils.parser import Parser
+from db_utils import migrations
+from db_utils.default_db_config import DEFAULT_DB_CONFIG_LOCAL
+from db_utils.mongo_db_tables_connector import MongoDBTablesConnector
+from db_utils.validation_connector import ValidationConnector
+
+
+class TestMigrations:
+    @pytest.fixture(autouse=True)
+    def setup(self, memory_backend):
+        connector_config = dict(host=DEFAULT_DB_CONFIG_LOCAL['host'], port=DEFAULT_DB_CONFIG_LOCAL['port'],
+                                db_name='test_db', collection_name='test_migrations')
+        self.tables_connector = MongoDBTablesConnector(**connector_config)
+        self.validation_connector = ValidationConnector(**connector_config)
+        self.table_documents = [table_document for table_document, _ in
+                                islice(Parser(connect_to_db=False).iter_parse('../documents'), 10)]
+
+        yield
+
+        self.tables_connector.client.drop_database('test_db')
+        self.validation_connector.close()
+        self.tables_connector.close()
+
+    def insert_legacy_documents(self, *missing_fields: str, null_fields: tuple[str, ...] = ()):
+        # the documents the way they were stored before the given fields were calculated at ingest
+        for table_document in self.table_documents:
+            document = table_document.to_mongo()
+            for field in missing_fields:
+                document.pop(field)
+            for field in null_fields:
+                document[field] = None
+            self.tables_connector.collection.insert_one(document)
+
+    @staticmethod
+    def untyped(document: dict) -> dict:
+        # the cells the way they were stored before they were typed, as their text
+        def cell_text(cell) -> str:
+            return '' if cell is None else str(cell)
+
+        document['rows_list'] = [[label, *map(cell_text, cells)] for label, *cells in document['rows_list']]
+        for view in ('body_by_columns', 'body_by_rows'):
+            document[view] = {key: {inner_key: cell_text(cell) for inner_key, cell in cells.items()}
+                              for key, cells in document[view].items()}
+        return document
+
+    def find_document_ids(self, cursor) -> set[str]:
+        return {document['document_id'] for document in cursor}
+
+    def test_backfill_headers_length(self):
+        self.insert_legacy_documents('headers_length')
+        self.tables_connector.collection.update_one({'document_id': self.table_documents[0].document_id},
+                                                    {'$set': {'headers_length': None}})
+        length = sorted(table_document.headers_length for table_document in self.table_documents)[5]
+        short_headers_ids = {table_document.document_id for table_document in self.table_documents
+                             if table_document.headers_length < length}
+        assert short_headers_ids
+        assert not self.find_document_ids(self.validation_connector.find_short_headers(length))
+
+        assert migrations.backfill_headers_length(self.tables_connector) == len(self.table_documents)
+        assert self.find_document_ids(self.validation_connector.find_short_headers(length)) == short_headers_ids
+        assert migrations.backfill_headers_length(self.tables_connector) == 0
+
+    def test_convert_tables_schema(self):
+        self.insert_legacy_documents()
+        full_documents = list(self.tables_connector.collection.find({}, {'_id': 0}))
+
+        assert migrations.convert_tables_schema(self.tables_connector, compact=True) == len(self.table_documents)
+        compact_documents = list(self.tables_connector.collection.find({}, {'_id': 0}))
+        assert all('body' in document and 'rows_list' not in document for document in compact_documents)
+        assert [table_document.model_dump() for table_document in self.tables_connector.find_table_documents({})] \
+               == [table_document.model_dump() for table_document in self.table_documents]
+        assert migrations.convert_tables_schema(self.tables_connector, compact=True) == 0
+
+        assert migrations.convert_tables_schema(self.tables_connector, compact=False) == len(self.table_documents)
+        assert list(self.tables_connector.collection.find({}, {'_id': 0})) == full_documents
+
+    def test_convert_partly_migrated_tables(self):
+        # half of the tables are already compact, and none of them has its headers length backfilled yet
+        for index, table_document in enumerate(self.table_documents):
+            document = table_document.to_mongo(compact=index % 2 == 0)
+            document.pop('headers_length')
+            self.tables_connector.collection.insert_one(document)
+
+        assert migrations.convert_tables_schema(self.tables_connector, compact=True) == len(self.table_documents) // 2
+        assert self.tables_connector.collection.count_documents({'rows_list': {'$exists': True}}) == 0
+        assert self.tables_connector.collection.count_documents({'headers_length': {'$exists': True}}) == 0
+
+        assert migrations.backfill_headers_length(self.tables_connector) == len(self.table_documents)
+        length = max(table_document.headers_length for table_document in self.table_documents) + 1
+        assert self.find_document_ids(self.validation_connector.find_short_headers(length)) \
+               == {table_document.document_id for table_document in self.table_documents}
+
+    @pytest.mark.parametrize("migration_names", [('type_table_cells', 'backfill_table_stats'),
+                                                 ('backfill_table_stats', 'type_table_cells')])
+    def test_type_cells_and_backfill_stats(self, migration_names):
+        for table_document in self.table_documents:
+            document = self.untyped(table_document.to_mongo())
+            document.pop('stats')
+            self.tables_connector.collection.insert_one(document)
+
+        for migration_name in migration_names:
+            getattr(migrations, migration_name)(self.tables_connector)
+
+        stored_documents = list(self.tables_connector.find_table_documents({}))
+        assert [(document.stats, document.sum_of_first_row) for document in stored_documents] == \
+               [(document.stats, document.sum_of_first_row) for document in self.table_documents]
+        high_value_ids = {table_document.document_id for table_document in self.table_documents
+                          if table_document.stats.max_value > 1000}
+        assert high_value_ids
+        assert self.find_document_ids(self.validation_connector.find_by_stat('max_value', '$gt', 1000)) \
+               == high_value_ids
+
+    def test_backfill_null_stats(self):
+        self.insert_legacy_documents(null_fields=('stats',))
+        assert migrations.backfill_table_stats(self.tables_connector) == len(self.table_documents)
+        assert [document.stats for document in self.tables_connector.find_table_documents({})] == \
+               [document.stats for document in self.table_documents]
@@ -85,12 +85,45 @@ class TestMongoDBTablesConnector:
             assert self.connector.find_one({"document_id": self.table_document.document_id})['title'] == \
                    self.table_document.title
 
+        def test_upsert_many(self):
+            other_document = self.table_document.model_copy(update={'document_id': 'other_document_id'})
+            writer = self.connector.upsert_many([self.table_document, other_document, self.table_document])
+            assert self.connector.collection.count_documents({}) == 2
+            assert writer.upserted_count == 2
+            assert writer.matched_count == 1
+            assert writer.write_errors == []
+
+        def test_batch_writer_flushes_by_count(self):
+            with self.connector.batch_writer(batch_size=2) as writer:
+                for index in range(5):
+                    writer.upsert(self.table_document.model_copy(update={'document_id': f'document_{index}'}))
+                assert writer.batches_written == 2
+                assert self.connector.collection.count_documents({}) == 4
+            assert writer.batches_written == 3
+            assert self.connector.collection.count_documents({}) == 5
+
+        def test_batch_writer_flushes_by_size(self):
+            with self.connector.batch_writer(batch_size=100, max_batch_bytes=1) as writer:
+                for index in range(3):
+                    writer.upsert(self.table_document.model_copy(update={'document_id': f'document_{index}'}))
+                assert writer.batches_written == 2
+            assert writer.batches_written == 3
+            assert self.connector.collection.count_documents({}) == 3
+
         def test_delete(self):
             self.connector.insert(self.table_document)
             self.connector.delete({"document_id": "Table5999962Lossadjusterchartered"})
             res = self.connector.find_one({"document_id": "Table5999962Lossadjusterchartered"})
             assert res is None
 
+        def test_ensure_indexes(self):
+            self.connector.ensure_indexes(force=True)
+            index_names = self.connector.collection.index_information().keys()
+            assert {index.document['name'] for index in self.connector.INDEXES} <= index_names
+            self.connector.insert(self.table_document)
+            assert not self.connector.is_collection_scan({"document_id": self.table_document.document_id})
+            assert self.connector.is_collection_scan({"title": self.table_document.title})
+
         def test_drop_collection(self):
             self.connector.drop_collection()
             assert self.connector.collection.count_documents({}) == 0
@@ -4,6 +4,7 @@ from pathlib import Path
 import pytest
 from bs4 import BeautifulSoup
 
+from data_classes.discrepancy import DiscrepancyType
 from data_utils.parser import Parser
 
 
@@ -26,6 +27,16 @@ class TestParser:
             valid_files = list(self.parser._get_valid_files(Path(self.documents_dir)))
             assert len(valid_files) == 67
 
+        def test_iter_parsed_files_with_workers(self):
+            files = list(self.parser._get_valid_files(Path(self.documents_dir)))
+            sequential = list(self.parser._iter_parsed_files(files))
+            parallel = list(self.parser._iter_parsed_files(files, workers=2))
+            assert [file_path for file_path, _, _ in parallel] == files
+            assert [table_document for _, table_document, _ in parallel] == \
+                   [table_document for _, table_document, _ in sequential]
+            assert [file_discrepancies for _, _, file_discrepancies in parallel] == \
+                   [file_discrepancies for _, _, file_discrepancies in sequential]
+
         def test_get_document_id(self):
             document_id = self.parser._get_document_id(self.valid_soup)
             assert document_id == "Table5999962Lossadjusterchartered"
@@ -42,14 +53,19 @@ class TestParser:
             headers_66 = self.parser._get_headers(soup_66)
             assert headers_66 == ['Kenneth Decker', 'Benjamin Newman', 'Susan Miller']
 
+        def test_headers_length(self):
+            table_document = self.parser.parse_file(Path(self.documents_dir) / "0_table.html")
+            assert table_document.headers_length == len(
+                '["Daniel Brown","Shane Barnes DDS","Nicole Carpenter","Kristin Duarte"]')
+
         def test_get_body(self):
-            expected_body_by_columns = {'Daniel Brown': {'Roberts LLC': '1060'},
-                                        'Kristin Duarte': {'Roberts LLC': '1364'},
-                                        'Nicole Carpenter': {'Roberts LLC': '1593'},
-                                        'Shane Barnes DDS': {'Roberts LLC': '37'}}
-            expected_body_by_rows = {'Roberts LLC': {'Daniel Brown': '1060', 'Kristin Duarte': '1364',
-                                                     'Nicole Carpenter': '1593', 'Shane Barnes DDS': '37'}}
-            expected_rows_list = [['Roberts LLC', '1060', '37', '1593', '1364']]
+            expected_body_by_columns = {'Daniel Brown': {'Roberts LLC': 1060},
+                                        'Kristin Duarte': {'Roberts LLC': 1364},
+                                        'Nicole Carpenter': {'Roberts LLC': 1593},
+                                        'Shane Barnes DDS': {'Roberts LLC': 37}}
+            expected_body_by_rows = {'Roberts LLC': {'Daniel Brown': 1060, 'Kristin Duarte': 1364,
+                                                     'Nicole Carpenter': 1593, 'Shane Barnes DDS': 37}}
+            expected_rows_list = [['Roberts LLC', 1060, 37, 1593, 1364]]
             body_by_columns, body_by_rows, rows_list = self.parser._get_body(self.valid_soup)
             assert body_by_columns == expected_body_by_columns
             assert body_by_rows == expected_body_by_rows
@@ -60,36 +76,36 @@ class TestParser:
                 soup_66 = BeautifulSoup(file_66, "html.parser")
             body_by_columns, body_by_rows, rows_list = self.parser._get_body(soup_66, fill_missing_headers=True)
             expected_body_by_columns = {
-                'Kenneth Decker': {'Reeves-George': '699', 'Atkinson and Sons': '846%', 'Hudson-Diaz': '25%',
-                                   'Simpson PLC': '1015%', 'Richmond, Garcia and Gonzales': '1202',
+                'Kenneth Decker': {'Reeves-George': 699, 'Atkinson and Sons': '846%', 'Hudson-Diaz': '25%',
+                                   'Simpson PLC': '1015%', 'Richmond, Garcia and Gonzales': 1202,
                                    'Washington-Riley': '23%'},
-                'Benjamin Newman': {'Reeves-George': '1465', 'Atkinson and Sons': '356',
-                                    'Hudson-Diaz': '482', 'Simpson PLC': '774%',
-                                    'Richmond, Garcia and Gonzales': '1092', 'Washington-Riley': '1518%'},
-                'Susan Miller': {'Reeves-George': '1281', 'Atkinson and Sons': '850%', 'Hudson-Diaz': '368%',
-                                 'Simpson PLC': '372', 'Richmond, Garcia and Gonzales': '1516%',
+                'Benjamin Newman': {'Reeves-George': 1465, 'Atkinson and Sons': 356,
+                                    'Hudson-Diaz': 482, 'Simpson PLC': '774%',
+                                    'Richmond, Garcia and Gonzales': 1092, 'Washington-Riley': '1518%'},
+                'Susan Miller': {'Reeves-George': 1281, 'Atkinson and Sons': '850%', 'Hudson-Diaz': '368%',
+                                 'Simpson PLC': 372, 'Richmond, Garcia and Gonzales': '1516%',
                                  'Washington-Riley': '930%'},
-                'empty_header_0': {'Reeves-George': '587', 'Atkinson and Sons': '1060',
-                                   'Hudson-Diaz': '1143', 'Simpson PLC': '1370',
-                                   'Richmond, Garcia and Gonzales': '611', 'Washington-Riley': '474%'}}
+                'empty_header_0': {'Reeves-George': 587, 'Atkinson and Sons': 1060,
+                                   'Hudson-Diaz': 1143, 'Simpson PLC': 1370,
+                                   'Richmond, Garcia and Gonzales': 611, 'Washington-Riley': '474%'}}
             expected_body_by_rows = {
-                'Reeves-George': {'Kenneth Decker': '699', 'Benjamin Newman': '1465', 'Susan Miller': '1281',
-                                  'empty_header_0': '587'},
-                'Atkinson and Sons': {'Kenneth Decker': '846%', 'Benjamin Newman': '356', 'Susan Miller': '850%',
-                                      'empty_header_0': '1060'},
-                'Hudson-Diaz': {'Kenneth Decker': '25%', 'Benjamin Newman': '482', 'Susan Miller': '368%',
-                                'empty_header_0': '1143'},
-                'Simpson PLC': {'Kenneth Decker': '1015%', 'Benjamin Newman': '774%', 'Susan Miller': '372',
-                                'empty_header_0': '1370'},
-                'Richmond, Garcia and Gonzales': {'Kenneth Decker': '1202', 'Benjamin Newman': '1092',
-                                                  'Susan Miller': '1516%', 'empty_header_0': '611'},
+                'Reeves-George': {'Kenneth Decker': 699, 'Benjamin Newman': 1465, 'Susan Miller': 1281,
+                                  'empty_header_0': 587},
+                'Atkinson and Sons': {'Kenneth Decker': '846%', 'Benjamin Newman': 356, 'Susan Miller': '850%',
+                                      'empty_header_0': 1060},
+                'Hudson-Diaz': {'Kenneth Decker': '25%', 'Benjamin Newman': 482, 'Susan Miller': '368%',
+                                'empty_header_0': 1143},
+                'Simpson PLC': {'Kenneth Decker': '1015%', 'Benjamin Newman': '774%', 'Susan Miller': 372,
+                                'empty_header_0': 1370},
+                'Richmond, Garcia and Gonzales': {'Kenneth Decker': 1202, 'Benjamin Newman': 1092,
+                                                  'Susan Miller': '1516%', 'empty_header_0': 611},
                 'Washington-Riley': {'Kenneth Decker': '23%', 'Benjamin Newman': '1518%', 'Susan Miller': '930%',
                                      'empty_header_0': '474%'}}
-            expected_rows_list = [['Reeves-George', '699', '1465', '1281', '587'],
-                                  ['Atkinson and Sons', '846%', '356', '850%', '1060'],
-                                  ['Hudson-Diaz', '25%', '482', '368%', '1143'],
-                                  ['Simpson PLC', '1015%', '774%', '372', '1370'],
-                                  ['Richmond, Garcia and Gonzales', '1202', '1092', '1516%', '611'],
+            expected_rows_list = [['Reeves-George', 699, 1465, 1281, 587],
+                                  ['Atkinson and Sons', '846%', 356, '850%', 1060],
+                                  ['Hudson-Diaz', '25%', 482, '368%', 1143],
+                                  ['Simpson PLC', '1015%', '774%', 372, 1370],
+                                  ['Richmond, Garcia and Gonzales', 1202, 1092, '1516%', 611],
                                   ['Washington-Riley', '23%', '1518%', '930%', '474%']]
             assert body_by_columns == expected_body_by_columns
             assert body_by_rows == expected_body_by_rows
@@ -100,37 +116,58 @@ class TestParser:
                 soup_66 = BeautifulSoup(file_66, "html.parser")
             body_by_columns, body_by_rows, rows_list = self.parser._get_body(soup_66, fill_missing_headers=False)
             expected_body_by_columns = {
-                'Kenneth Decker': {'Reeves-George': '699', 'Atkinson and Sons': '846%', 'Hudson-Diaz': '25%',
-                                   'Simpson PLC': '1015%', 'Richmond, Garcia and Gonzales': '1202',
+                'Kenneth Decker': {'Reeves-George': 699, 'Atkinson and Sons': '846%', 'Hudson-Diaz': '25%',
+                                   'Simpson PLC': '1015%', 'Richmond, Garcia and Gonzales': 1202,
                                    'Washington-Riley': '23%'},
-                'Benjamin Newman': {'Reeves-George': '1465', 'Atkinson and Sons': '356',
-                                    'Hudson-Diaz': '482', 'Simpson PLC': '774%',
-                                    'Richmond, Garcia and Gonzales': '1092', 'Washington-Riley': '1518%'},
-                'Susan Miller': {'Reeves-George': '1281', 'Atkinson and Sons': '850%', 'Hudson-Diaz': '368%',
-                                 'Simpson PLC': '372', 'Richmond, Garcia and Gonzales': '1516%',
+                'Benjamin Newman': {'Reeves-George': 1465, 'Atkinson and Sons': 356,
+                                    'Hudson-Diaz': 482, 'Simpson PLC': '774%',
+                                    'Richmond, Garcia and Gonzales': 1092, 'Washington-Riley': '1518%'},
+                'Susan Miller': {'Reeves-George': 1281, 'Atkinson and Sons': '850%', 'Hudson-Diaz': '368%',
+                                 'Simpson PLC': 372, 'Richmond, Garcia and Gonzales': '1516%',
                                  'Washington-Riley': '930%'}}
             expected_body_by_rows = {
-                'Reeves-George': {'Kenneth Decker': '699', 'Benjamin Newman': '1465', 'Susan Miller': '1281'},
-                'Atkinson and Sons': {'Kenneth Decker': '846%', 'Benjamin Newman': '356', 'Susan Miller': '850%'},
-                'Hudson-Diaz': {'Kenneth Decker': '25%', 'Benjamin Newman': '482', 'Susan Miller': '368%'},
-                'Simpson PLC': {'Kenneth Decker': '1015%', 'Benjamin Newman': '774%', 'Susan Miller': '372'},
-                'Richmond, Garcia and Gonzales': {'Kenneth Decker': '1202', 'Benjamin Newman': '1092',
+                'Reeves-George': {'Kenneth Decker': 699, 'Benjamin Newman': 1465, 'Susan Miller': 1281},
+                'Atkinson and Sons': {'Kenneth Decker': '846%', 'Benjamin Newman': 356, 'Susan Miller': '850%'},
+                'Hudson-Diaz': {'Kenneth Decker': '25%', 'Benjamin Newman': 482, 'Susan Miller': '368%'},
+                'Simpson PLC': {'Kenneth Decker': '1015%', 'Benjamin Newman': '774%', 'Susan Miller': 372},
+                'Richmond, Garcia and Gonzales': {'Kenneth Decker': 1202, 'Benjamin Newman': 1092,
                                                   'Susan Miller': '1516%'},
                 'Washington-Riley': {'Kenneth Decker': '23%', 'Benjamin Newman': '1518%', 'Susan Miller': '930%'}}
-            expected_rows_list = [['Reeves-George', '699', '1465', '1281', '587'],
-                                  ['Atkinson and Sons', '846%', '356', '850%', '1060'],
-                                  ['Hudson-Diaz', '25%', '482', '368%', '1143'],
-                                  ['Simpson PLC', '1015%', '774%', '372', '1370'],
-                                  ['Richmond, Garcia and Gonzales', '1202', '1092', '1516%', '611'],
+            expected_rows_list = [['Reeves-George', 699, 1465, 1281, 587],
+                                  ['Atkinson and Sons', '846%', 356, '850%', 1060],
+                                  ['Hudson-Diaz', '25%', 482, '368%', 1143],
+                                  ['Simpson PLC', '1015%', '774%', 372, 1370],
+                                  ['Richmond, Garcia and Gonzales', 1202, 1092, '1516%', 611],
                                   ['Washington-Riley', '23%', '1518%', '930%', '474%']]
             assert body_by_columns == expected_body_by_columns
             assert body_by_rows == expected_body_by_rows
             assert rows_list == expected_rows_list
 
+        @pytest.mark.parametrize("row, expected",
+                                 [(['Roberts LLC', 1060, 37], 1097),
+                                  # signed numbers are summed, the text check they replaced reported them
+                                  (['Roberts LLC', -5, 5, 3], 3),
+                                  (['Roberts LLC', 1060, '846%'], None),
+                                  (['Roberts LLC', 1060, 1.5], None),
+                                  (['Roberts LLC', 1060, None], None)])
+        def test_get_sum_of_first_row(self, row, expected):
+            assert self.parser._get_sum_of_first_row(row) == expected
+            assert [discrepancy.discrepancy_type for discrepancy in self.parser.file_discrepancies] == \
+                   ([] if expected is not None else [DiscrepancyType.INVALID_SUM])
+
         def test_get_footer(self):
             footer = self.parser._get_footer(self.valid_soup)
             assert footer == "Creation: 3Feb2013 Chad"
 
+        def test_get_missing_footer_discrepancies(self):
+            with open(Path(self.documents_dir) / "34_table.html", encoding="utf-8") as file_34:
+                soup_34 = BeautifulSoup(file_34, "html.parser")
+            assert self.parser._get_footer(soup_34) is None
+            assert self.parser.file_discrepancies == []
+            assert self.parser._get_footer(soup_34, report_discrepancies=True) is None
+            assert [discrepancy.discrepancy_type for discrepancy in self.parser.file_discrepancies] == \
+                   [DiscrepancyType.MISSING_FOOTER]
+
         @pytest.mark.parametrize("file_name, expected",
                                  [("0_table.html", "Chad"),
                                   ("50_table.html", "Bosnia and Herzegovina"),
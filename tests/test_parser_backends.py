@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pytest
+
+from data_utils.html_backends import HTML_BACKENDS, DEFAULT_HTML_BACKEND
+from data_utils.parser import Parser
+
+DOCUMENTS_DIR = Path(__file__).parent.parent / "documents"
+OTHER_BACKENDS = [backend for backend in HTML_BACKENDS if backend != DEFAULT_HTML_BACKEND]
+EMPTY_TAGS_TABLE = """<table id="Table1Empty">
+<caption></caption>
+<thead><tr><th> </th><th> Laurie Wade </th></tr></thead>
+<tbody><tr><td> Roberts LLC </td><td> 1060 </td></tr></tbody>
+<tfoot></tfoot>
+</table>
+"""
+
+
+class TestParserBackends:
+    """
+    Every html backend should parse the documents exactly like the default one,
+    including the locations (source lines) of the discrepancies.
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.default_parser = Parser(connect_to_db=False)
+
+    def assert_same_output(self, parser: Parser, markup: str, file_name: str):
+        expected_document, expected_discrepancies = self.default_parser._parse_markup(markup, file_name)
+        document, discrepancies = parser._parse_markup(markup, file_name)
+        assert document == expected_document, file_name
+        assert [(discrepancy.discrepancy_type, discrepancy.description, discrepancy.location, discrepancy.raw_data)
+                for discrepancy in discrepancies] == \
+               [(discrepancy.discrepancy_type, discrepancy.description, discrepancy.location, discrepancy.raw_data)
+                for discrepancy in expected_discrepancies], file_name
+
+    @pytest.mark.parametrize("backend", OTHER_BACKENDS)
+    def test_same_output_as_default_backend(self, backend):
+        pytest.importorskip(backend)
+        parser = Parser(connect_to_db=False, html_backend=backend)
+        for file_path in sorted(DOCUMENTS_DIR.glob("*.html")):
+            self.assert_same_output(parser, file_path.read_text(encoding="utf-8"), file_path.name)
+
+    @pytest.mark.parametrize("backend", OTHER_BACKENDS)
+    def test_empty_tags(self, backend):
+        # an empty tag is still there, so it's found (with its location) by every backend
+        pytest.importorskip(backend)
+        parser = Parser(connect_to_db=False, html_backend=backend)
+        markup = EMPTY_TAGS_TABLE
+        self.assert_same_output(parser, markup, "empty_tags.html")
+        _, discrepancies = parser._parse_markup(markup, "empty_tags.html")
+        assert {discrepancy.location for discrepancy in discrepancies} >= {2, 5}
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            Parser(connect_to_db=False, html_backend="no_such_backend")
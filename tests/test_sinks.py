@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from data_classes.discrepancy import DiscrepancyType
+from data_utils.parser import Parser
+from data_utils.sinks import InMemorySink, JsonlSink
+
+
+class TestSinks:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.parser = Parser()
+        self.documents_dir = "../documents"
+
+    def test_iter_parse(self):
+        parsed = list(self.parser.iter_parse(self.documents_dir))
+        assert len(parsed) == 67
+        assert parsed[0][0].document_id == "Table5999962Lossadjusterchartered"
+        assert not self.parser.all_discrepancies
+
+    def test_in_memory_sink(self):
+        sink = InMemorySink()
+        self.parser.parse_to_sink(self.documents_dir, sink)
+        assert len(sink.table_documents) == 67
+        assert {discrepancy.discrepancy_type for discrepancy in sink.discrepancies} == {
+            DiscrepancyType.MISSING_TITLE, DiscrepancyType.MISSING_FOOTER, DiscrepancyType.MISSING_CREATION_DATE}
+
+    def test_jsonl_sink(self, tmp_path):
+        output_path = tmp_path / "tables.jsonl"
+        self.parser.parse_to_sink(self.documents_dir, JsonlSink(output_path))
+        with open(output_path, encoding="utf-8") as output_file:
+            lines = [json.loads(line) for line in output_file]
+        assert len(lines) == 67
+        assert lines[0]['document']['date_of_creation'] == '2013-02-03T00:00:00'
+        assert sum(len(line['discrepancies']) for line in lines) == 7
@@ -0,0 +1,66 @@
+import bson
+import pytest
+
+from data_classes.compact_table_body import CompactTableBody
+from data_classes.table_document import TableDocument
+from data_classes.table_stats import TableStats
+from data_utils.parser import Parser
+
+
+class TestTableDocument:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.parser = Parser(connect_to_db=False)
+        self.table_documents = [table_document for table_document, _ in self.parser.iter_parse("../documents")]
+
+    def test_compact_body_views(self):
+        body = CompactTableBody.from_rows_list([['Roberts LLC', '1060', '37'], ['Smith Inc', '5']],
+                                               ['Laurie Wade', 'Kelly Thomas'])
+        assert body.rows_list == [['Roberts LLC', '1060', '37'], ['Smith Inc', '5']]
+        assert body.body_by_columns == {'Laurie Wade': {'Roberts LLC': '1060', 'Smith Inc': '5'},
+                                        'Kelly Thomas': {'Roberts LLC': '37'}}
+        assert body.body_by_rows == {'Roberts LLC': {'Laurie Wade': '1060', 'Kelly Thomas': '37'},
+                                     'Smith Inc': {'Laurie Wade': '5'}}
+
+    def test_compact_schema_round_trip(self):
+        for table_document in self.table_documents:
+            compact_document = table_document.to_mongo(compact=True)
+            assert 'rows_list' not in compact_document
+            assert TableDocument.from_mongo(compact_document).model_dump() == table_document.model_dump()
+
+    def test_full_schema_round_trip(self):
+        for table_document in self.table_documents:
+            full_document = table_document.to_mongo()
+            assert full_document == table_document.model_dump()
+            assert TableDocument.from_mongo(full_document).model_dump() == table_document.model_dump()
+
+    def test_compact_schema_is_smaller(self):
+        # the stats are stored the same way in both schemas, only the body is compacted
+        def size_without_stats(mongo_document: dict) -> int:
+            mongo_document.pop('stats', None)
+            return len(bson.encode(mongo_document))
+
+        full_size = sum(size_without_stats(doc.to_mongo()) for doc in self.table_documents)
+        compact_size = sum(size_without_stats(doc.to_mongo(compact=True)) for doc in self.table_documents)
+        assert compact_size < full_size / 2
+
+    def test_compact_body_without_parsing(self):
+        # a document that was read from the full schema has no compact body, it's built from its rows
+        full_document = self.table_documents[0].to_mongo()
+        table_document = TableDocument.from_mongo(full_document)
+        assert table_document.body is None
+        assert TableDocument.from_mongo(table_document.to_mongo(compact=True)).model_dump() == full_document
+
+    def test_table_stats(self):
+        body = CompactTableBody.from_rows_list([['Roberts LLC', 1060, 37, '846%'], ['Smith Inc', 5.5, None]],
+                                               ['Laurie Wade', 'Kelly Thomas', 'Matthew Hart'])
+        stats = TableStats.from_body(body, ['Laurie Wade', 'Kelly Thomas'])
+        assert stats == TableStats(row_count=2, column_count=3, row_sums=[1097, 5.5], column_sums=[1065.5, 37, 0],
+                                   min_value=5.5, max_value=1060, non_numeric_count=1, empty_count=1,
+                                   header_lengths=[11, 12])
+
+    def test_parsed_table_stats(self):
+        table_document = self.table_documents[0]
+        assert table_document.stats.row_sums[0] == table_document.sum_of_first_row
+        assert table_document.stats.row_count == len(table_document.rows_list)
+        assert TableDocument.from_mongo(table_document.to_mongo(compact=True)).stats == table_document.stats